@@ -0,0 +1,125 @@
+import functools
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(HERE, ".simulation_cache")
+
+MAX_BYTES = 256 * 1024 * 1024
+MAX_AGE = 30 * 24 * 3600
+
+
+@functools.lru_cache(maxsize=None)
+def code_version():
+    """Hash of every module next to this one, so results go stale when the code changes."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(HERE, "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as source:
+            digest.update(source.read())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Results of finished runs on disk, addressed by a hash of what produced them.
+
+    A key covers the run function, its parameters, the seed, the number of
+    steps and the code version. A result is a dict of scalars (metrics) and
+    arrays (series), stored as one .npz file. Files are written to a
+    temporary name and moved into place with os.replace, so concurrent
+    workers computing the same run never expose a partial file and the
+    last one to finish simply wins. Reading a result touches its file, and
+    evict() removes files unused for longer than max_age and then the least
+    recently used ones until the cache fits in max_bytes.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES, max_age=MAX_AGE):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, function, params, seed, steps):
+        description = {
+            "function": f"{function.__module__}.{function.__qualname__}",
+            "params": params,
+            "seed": seed,
+            "steps": steps,
+            "code": code_version(),
+        }
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".npz")
+
+    def get(self, key):
+        """Stored result for key, or None."""
+        path = self.path(key)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                result = {name: data[name].item() if data[name].ndim == 0 else data[name]
+                          for name in data.files}
+            os.utime(path)
+        except (FileNotFoundError, ValueError, OSError):
+            # Missing, evicted meanwhile or unreadable, treat all as a miss
+            return None
+        return result
+
+    def put(self, key, result):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as file:
+                np.savez(file, **{name: np.asarray(value) for name, value in result.items()})
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    def run(self, function, params, seed, steps):
+        """function(seed=seed, steps=steps, **params), computed at most once per key."""
+        if seed is None:
+            # Unseeded runs aren't reproducible, there is nothing to reuse
+            return function(seed=seed, steps=steps, **params)
+        key = self.key(function, params, seed, steps)
+        result = self.get(key)
+        if result is None:
+            result = function(seed=seed, steps=steps, **params)
+            self.put(key, result)
+        return result
+
+    def evict(self):
+        """Remove expired results, then the least recently used until under max_bytes."""
+        now = time.time()
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*", "*.npz")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            # Another worker evicted it first
+            pass
@@ -0,0 +1,119 @@
+import numpy as np
+
+CHUNK_SIZE = 16
+
+
+class ChunkedGrid:
+    """Per-cell counters over the columns [x0, x0 + width) of a grid, stored in chunks.
+
+    The grid is cut into chunk_size x chunk_size chunks that are allocated
+    the first time a cell inside them is written. A small table maps each
+    chunk to its slot in a shared pool, so reads and scatter-adds over many
+    cells stay vectorized, and whole-grid operations (nonzero, clear,
+    release_empty) only visit the allocated chunks. Cells in unallocated
+    chunks read as 0.
+    """
+
+    def __init__(self, width, height, x0=0, chunk_size=CHUNK_SIZE, dtype=np.int32):
+        self.width = width
+        self.height = height
+        self.x0 = x0
+        self.chunk_size = chunk_size
+        self.dtype = np.dtype(dtype)
+
+        # Pool slot of every chunk, -1 while it is not allocated
+        self.table = np.full((-(-width // chunk_size), -(-height // chunk_size)), -1, dtype=np.int32)
+        # Chunk stored in every pool slot (flat index into table), -1 for free slots
+        self.slot_chunk = np.zeros(0, dtype=np.int64)
+        self.pool = np.zeros((0, chunk_size, chunk_size), dtype=self.dtype)
+        self.free = []
+        self.total = 0
+
+    def _locate(self, x, y):
+        lx = np.asarray(x, dtype=np.int64) - self.x0
+        y = np.asarray(y, dtype=np.int64)
+        return lx // self.chunk_size, y // self.chunk_size, lx % self.chunk_size, y % self.chunk_size
+
+    def get(self, x, y):
+        cx, cy, ox, oy = self._locate(x, y)
+        slots = self.table[cx, cy]
+        values = np.zeros(slots.shape, dtype=self.dtype)
+        allocated = slots >= 0
+        values[allocated] = self.pool[slots[allocated], ox[allocated], oy[allocated]]
+        return values
+
+    def add(self, x, y, values=1):
+        """Scatter-add values to the cells (x, y), allocating the chunks they fall in."""
+        cx, cy, ox, oy = self._locate(x, y)
+        slots = self._allocate(cx, cy)
+        np.add.at(self.pool, (slots, ox, oy), values)
+        self.total += np.broadcast_to(values, slots.shape).sum()
+
+    def _allocate(self, cx, cy):
+        slots = self.table[cx, cy]
+        missing = slots < 0
+        if missing.any():
+            keys = np.unique(cx[missing] * self.table.shape[1] + cy[missing])
+            new_slots = self._take_slots(len(keys))
+            self.table.flat[keys] = new_slots
+            self.slot_chunk[new_slots] = keys
+            slots = self.table[cx, cy]
+        return slots
+
+    def _take_slots(self, count):
+        if len(self.free) < count:
+            # Grow the pool geometrically, new chunks start zeroed
+            start = len(self.pool)
+            grow = max(count - len(self.free), start)
+            self.pool = np.concatenate([
+                self.pool,
+                np.zeros((grow, self.chunk_size, self.chunk_size), dtype=self.dtype),
+            ])
+            self.slot_chunk = np.concatenate([self.slot_chunk, np.full(grow, -1, dtype=np.int64)])
+            self.free.extend(range(start, start + grow))
+        slots = self.free[:count]
+        del self.free[:count]
+        return slots
+
+    @property
+    def active_chunks(self):
+        return len(self.pool) - len(self.free)
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes + self.slot_chunk.nbytes + self.pool.nbytes
+
+    def sum(self):
+        return int(self.total)
+
+    def nonzero(self):
+        """Grid coordinates of every non-zero cell."""
+        # Free slots are all zeros, so only allocated chunks contribute
+        slots, ox, oy = np.nonzero(self.pool)
+        cx, cy = np.divmod(self.slot_chunk[slots], self.table.shape[1])
+        return cx * self.chunk_size + ox + self.x0, cy * self.chunk_size + oy
+
+    def clear(self):
+        self.pool[...] = 0
+        self.total = 0
+
+    def release_empty(self):
+        """Return chunks that hold only zeros to the pool."""
+        empty = np.flatnonzero((self.slot_chunk >= 0) & ~self.pool.any(axis=(1, 2)))
+        self.table.flat[self.slot_chunk[empty]] = -1
+        self.slot_chunk[empty] = -1
+        self.free.extend(empty.tolist())
+
+    def columns(self, x0, x1):
+        """Copy of the columns [x0, x1) as a grid of their own."""
+        part = ChunkedGrid(x1 - x0, self.height, x0, self.chunk_size, self.dtype)
+        x, y = self.nonzero()
+        inside = (x >= x0) & (x < x1)
+        part.add(x[inside], y[inside], self.get(x[inside], y[inside]))
+        return part
+
+    def to_dense(self):
+        dense = np.zeros((self.width, self.height), dtype=self.dtype)
+        x, y = self.nonzero()
+        dense[x - self.x0, y] = self.get(x, y)
+        return dense
@@ -0,0 +1,67 @@
+class SteadyStateDetector:
+    """Decides when a run has reached a steady state, counting in steps.
+
+    Every step the simulation reports its metrics (e.g. arrests made this step
+    and the current garbage level). They are averaged over windows of
+    `window` steps, and each window mean is compared with the previous one.
+    The run has converged once every metric moved by no more than
+    abs_tol + rel_tol * |previous mean| for `patience` windows in a row.
+    Tolerances are a number for all metrics or a dict keyed by metric name.
+    A run that never settles is stopped after max_steps.
+    """
+
+    def __init__(self, window=200, rel_tol=0.05, abs_tol=0.05, patience=3,
+                 min_steps=0, max_steps=None):
+        self.window = window
+        self.rel_tol = rel_tol
+        self.abs_tol = abs_tol
+        self.patience = patience
+        self.min_steps = min_steps
+        self.max_steps = max_steps
+        self.reset()
+
+    def reset(self):
+        self.steps = 0
+        self.converged = False
+        self.reason = None
+        self.stable_windows = 0
+        self.previous = None
+        self.means = None
+        self._sums = {}
+
+    def update(self, **metrics):
+        """Record one step of metrics and return True once the run should stop."""
+        self.steps += 1
+        for name, value in metrics.items():
+            self._sums[name] = self._sums.get(name, 0.0) + value
+
+        if self.steps % self.window == 0:
+            self.means = {name: total / self.window for name, total in self._sums.items()}
+            self._sums = {}
+            if self.previous is not None and self._within_tolerance(self.previous, self.means):
+                self.stable_windows += 1
+            else:
+                self.stable_windows = 0
+            self.previous = self.means
+
+            if self.stable_windows >= self.patience and self.steps >= self.min_steps:
+                self.converged = True
+                self.reason = "converged"
+
+        if not self.converged and self.max_steps is not None and self.steps >= self.max_steps:
+            self.converged = True
+            self.reason = "max_steps"
+        return self.converged
+
+    def _tolerance(self, tolerance, name):
+        if isinstance(tolerance, dict):
+            return tolerance.get(name, 0.0)
+        return tolerance
+
+    def _within_tolerance(self, previous, current):
+        for name, value in current.items():
+            old = previous.get(name, value)
+            limit = self._tolerance(self.abs_tol, name) + self._tolerance(self.rel_tol, name) * abs(old)
+            if abs(value - old) > limit:
+                return False
+        return True
@@ -0,0 +1,185 @@
+import numpy as np
+
+from rng import RandomStreams
+from vectorized import (BLOCK_SIZE, DEFAULT_COUNTS, DETECTION_RANGE, INITIAL_SCORES,
+                        is_disposal_area, rank_within_cell)
+
+
+class ReplicaPopulation:
+    """Positions and scores of one agent type across all replicas, shaped (replicas, agents)."""
+
+    def __init__(self, x, y, score):
+        self.x = x
+        self.y = y
+        self.score = score
+        self.alive = np.ones(x.shape, dtype=bool)
+
+
+class EnsembleSimulation:
+    """K independent replicas of GarbageSimulation advanced together.
+
+    Every state array carries a leading replica dimension, so one vectorized
+    step moves and resolves the agents of all replicas at once and the
+    per-step Python overhead is paid once per ensemble rather than once per
+    replica. Phases run in the same order as GarbageSimulation.step. Each
+    replica draws from its own streams, so replica k is the same run whatever
+    the ensemble size.
+    """
+
+    def __init__(self, replicas=16, width=100, height=60, seed=None, counts=None,
+                 detection_range=DETECTION_RANGE):
+        self.replicas = replicas
+        self.width = width
+        self.height = height
+        self.detection_range = detection_range
+        self.counts = dict(DEFAULT_COUNTS, **(counts or {}))
+
+        self.streams = RandomStreams(seed)
+        self.replica_streams = [self.streams.child(f"replica{k}") for k in range(replicas)]
+        # Broadcasts against (replicas, agents) arrays
+        self.replica_index = np.arange(replicas)[:, None]
+
+        # Simulation tracking, one entry per replica
+        self.step_count = 0
+        self.arrests = np.zeros(replicas, dtype=np.int64)
+        self.blackboard_size = np.zeros(replicas, dtype=np.int64)
+
+        self.create_agents()
+
+    def create_agents(self):
+        self.populations = {}
+        for name in ("normal", "disposer", "police", "collector", "camera"):
+            x, y = self._random_positions(self.counts[name])
+            score = np.full(x.shape, INITIAL_SCORES[name], dtype=np.int32)
+            self.populations[name] = ReplicaPopulation(x, y, score)
+
+        self.garbage = np.zeros((self.replicas, self.width, self.height), dtype=np.int32)
+        x, y = self._random_positions(self.counts["garbage"])
+        np.add.at(self.garbage, (np.broadcast_to(self.replica_index, x.shape), x, y), 1)
+
+    @property
+    def garbage_count(self):
+        return self.garbage.sum(axis=(1, 2))
+
+    def metrics(self):
+        """Per-replica metrics as arrays of length replicas."""
+        return {
+            "arrests": self.arrests.copy(),
+            "garbage": self.garbage_count,
+            "blackboard": self.blackboard_size.copy(),
+            "normal_agents": self.populations["normal"].alive.sum(axis=1),
+        }
+
+    def step(self):
+        # Move and process normal agents
+        normals = self._move("normal")
+        items = self.garbage[self.replica_index, normals.x, normals.y]
+        rolls = np.stack([s["normal"].random(normals.x.shape[1]) for s in self.replica_streams])
+        penalized = (normals.alive & (items > 0) & (rolls < 1 - 0.5 ** items)
+                     & ~is_disposal_area(normals.x, normals.y))
+        normals.score -= penalized
+        self.arrests += penalized.sum(axis=1)
+
+        # Move and process proper disposers, sharing a cell's items in agent order
+        disposers = self._move("disposer")
+        cells = self._cell_keys(disposers.x, disposers.y)
+        items = self.garbage.reshape(-1)[cells]
+        on_garbage = np.flatnonzero(items > 0)
+        rank = rank_within_cell(cells.reshape(-1)[on_garbage])
+        taken = on_garbage[rank < items.reshape(-1)[on_garbage]]
+        np.subtract.at(self.garbage.reshape(-1), cells.reshape(-1)[taken], 1)
+        disposers.score.reshape(-1)[taken] += 1
+
+        # Move and process police agents
+        police = self._move("police")
+        caught = (normals.alive & (normals.score <= 0)
+                  & np.isin(self._cell_keys(normals.x, normals.y),
+                            self._cell_keys(police.x, police.y)))
+        normals.alive &= ~caught
+        self.arrests += caught.sum(axis=1)
+
+        # Move and process garbage collectors
+        self._move("collector")
+        self._remove_garbage()
+
+        # Process cameras
+        self.blackboard_size += self._detect()
+
+        self.step_count += 1
+        return True
+
+    def run(self, steps):
+        for _ in range(steps):
+            self.step()
+
+    def _random_positions(self, count):
+        x = np.empty((self.replicas, count), dtype=np.int32)
+        y = np.empty((self.replicas, count), dtype=np.int32)
+        for k, streams in enumerate(self.replica_streams):
+            rng = streams["placement"]
+            x[k] = rng.integers(0, self.width, size=count)
+            y[k] = rng.integers(0, self.height, size=count)
+        return x, y
+
+    def _move(self, name):
+        pop = self.populations[name]
+        count = pop.x.shape[1]
+        delta = np.stack([s[name].integers(-1, 2, size=(2, count), dtype=np.int32)
+                          for s in self.replica_streams], axis=1)
+        pop.x = np.clip(pop.x + delta[0], 0, self.width - 1)
+        pop.y = np.clip(pop.y + delta[1], 0, self.height - 1)
+        return pop
+
+    def _cell_keys(self, x, y):
+        """Flat index of (replica, x, y) into the garbage array."""
+        return (self.replica_index * self.width + x.astype(np.int64)) * self.height + y
+
+    def _remove_garbage(self):
+        collectors = self.populations["collector"]
+        gk, gx, gy = np.nonzero(self.garbage)
+        if not len(gk) or not collectors.x.shape[1]:
+            return
+
+        # Pad each replica's garbage cells to a common length so all replicas
+        # pick their closest cell in one argmin
+        per_replica = np.bincount(gk, minlength=self.replicas)
+        slot = np.arange(len(gk)) - np.repeat(np.cumsum(per_replica) - per_replica, per_replica)
+        far = 4 * (self.width + self.height)
+        padded_x = np.full((self.replicas, per_replica.max()), far, dtype=np.int64)
+        padded_y = np.full((self.replicas, per_replica.max()), far, dtype=np.int64)
+        padded_x[gk, slot] = gx
+        padded_y[gk, slot] = gy
+
+        dx = collectors.x[:, :, None] - padded_x[:, None, :]
+        dy = collectors.y[:, :, None] - padded_y[:, None, :]
+        target = (dx * dx + dy * dy).argmin(axis=2)
+        tx = padded_x[self.replica_index, target]
+        ty = padded_y[self.replica_index, target]
+
+        # Replicas without garbage keep their collectors where they are
+        has_target = (per_replica > 0)[:, None]
+        collectors.x = np.where(has_target, collectors.x + np.sign(tx - collectors.x), collectors.x).astype(np.int32)
+        collectors.y = np.where(has_target, collectors.y + np.sign(ty - collectors.y), collectors.y).astype(np.int32)
+
+        reached = np.flatnonzero(has_target & (collectors.x == tx) & (collectors.y == ty))
+        cells = self._cell_keys(collectors.x, collectors.y).reshape(-1)[reached]
+        rank = rank_within_cell(cells)
+        removed = cells[rank < self.garbage.reshape(-1)[cells]]
+        np.subtract.at(self.garbage.reshape(-1), removed, 1)
+
+    def _detect(self):
+        normals = self.populations["normal"]
+        cameras = self.populations["camera"]
+        offenders = normals.alive & (normals.score <= 0)
+        detected = np.zeros(self.replicas, dtype=np.int64)
+        if not offenders.any() or not cameras.x.shape[1]:
+            return detected
+
+        limit = self.detection_range ** 2
+        for start in range(0, normals.x.shape[1], BLOCK_SIZE):
+            block = slice(start, start + BLOCK_SIZE)
+            dx = cameras.x[:, :, None] - normals.x[:, None, block]
+            dy = cameras.y[:, :, None] - normals.y[:, None, block]
+            in_range = (dx * dx + dy * dy <= limit) & offenders[:, None, block]
+            detected += in_range.sum(axis=(1, 2))
+        return detected
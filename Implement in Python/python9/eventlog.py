@@ -0,0 +1,249 @@
+import argparse
+from enum import IntEnum
+
+import numpy as np
+
+MAGIC = b"GSEV"
+VERSION = 1
+
+# File header followed by fixed-size little-endian event records
+HEADER_DTYPE = np.dtype([("magic", "S4"), ("version", "<u4"), ("width", "<u4"), ("height", "<u4")])
+EVENT_DTYPE = np.dtype([("step", "<u4"), ("type", "u1"), ("agent", "<i4"), ("x", "<i4"), ("y", "<i4")])
+
+
+class EventType(IntEnum):
+    # An entity enters the world, agent is its unique_id
+    ADD_NORMAL_AGENT = 1
+    ADD_PROPER_DISPOSER = 2
+    ADD_IMPROPER_DISPOSER = 3
+    ADD_POLICE_AGENT = 4
+    ADD_GARBAGE_COLLECTOR = 5
+    ADD_CAMERA = 6
+    ADD_GARBAGE = 7
+    ADD_DISPOSAL_AREA = 8
+    # An agent ends its move at (x, y)
+    MOVE = 10
+    # A normal agent is penalized for improper disposal
+    IMPROPER_DISPOSAL = 11
+    # A garbage item is taken by a proper disposer or removed by a collector
+    GARBAGE_COLLECTION = 12
+    GARBAGE_REMOVAL = 13
+    # An agent is arrested and leaves the world
+    ARREST = 14
+    # A camera sees an offender
+    CAMERA_DETECTION = 15
+
+
+ADD_EVENTS = [event for event in EventType if event.name.startswith("ADD_")]
+REMOVE_EVENTS = [EventType.GARBAGE_COLLECTION, EventType.GARBAGE_REMOVAL, EventType.ARREST]
+
+
+def to_records(step, event_type, entities):
+    """Event records of a list of entities (anything with unique_id, x and y)."""
+    records = np.empty(len(entities), dtype=EVENT_DTYPE)
+    records["step"] = step
+    records["type"] = event_type
+    records["agent"] = [entity.unique_id for entity in entities]
+    records["x"] = [entity.x for entity in entities]
+    records["y"] = [entity.y for entity in entities]
+    return records
+
+
+class EventLogWriter:
+    """Appends fixed-size event records to a binary file.
+
+    Records are queued during a step and written in one block by flush(),
+    so the cost per event is a few array assignments instead of formatting
+    a line of text.
+    """
+
+    def __init__(self, path, width, height, record_moves=True):
+        self.path = path
+        self.record_moves = record_moves
+        self.header = np.array([(MAGIC, VERSION, width, height)], dtype=HEADER_DTYPE)
+        self.file = open(path, "wb")
+        self.reset()
+
+    def reset(self):
+        """Drop everything recorded so far, e.g. when the simulation is set up again."""
+        self._batches = []
+        self.file.seek(0)
+        self.file.truncate()
+        self.header.tofile(self.file)
+
+    def record(self, step, event_type, entities):
+        """Queue one record per entity (anything with unique_id, x and y)."""
+        if not entities:
+            return
+        self._batches.append(to_records(step, event_type, entities))
+
+    def record_move(self, step, agents):
+        if self.record_moves:
+            self.record(step, EventType.MOVE, agents)
+
+    def flush(self):
+        if self._batches:
+            np.concatenate(self._batches).tofile(self.file)
+            self._batches = []
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class EventLog:
+    """Read-only, memory-mapped view of an event file."""
+
+    def __init__(self, path):
+        header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header[0]["magic"] != MAGIC:
+            raise ValueError(f"{path} is not a simulation event log")
+        if header[0]["version"] != VERSION:
+            raise ValueError(f"Unsupported event log version {header[0]['version']}")
+        self.width = int(header[0]["width"])
+        self.height = int(header[0]["height"])
+
+        try:
+            self.events = np.memmap(path, dtype=EVENT_DTYPE, mode="r", offset=HEADER_DTYPE.itemsize)
+        except ValueError:
+            # Nothing recorded yet, memmap refuses empty files
+            self.events = np.empty(0, dtype=EVENT_DTYPE)
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def last_step(self):
+        return int(self.events["step"][-1]) if len(self.events) else 0
+
+    def of_type(self, event_type):
+        return self.events[self.events["type"] == event_type]
+
+    def counts(self):
+        """Number of records of each event type."""
+        counts = np.bincount(self.events["type"], minlength=max(EventType) + 1)
+        return {event: int(counts[event]) for event in EventType}
+
+    def per_step(self, event_type):
+        """Number of events of one type in every step, index is the step."""
+        steps = self.of_type(event_type)["step"]
+        return np.bincount(steps, minlength=self.last_step + 1)
+
+
+class Replay:
+    """Rebuilds the world step by step from an event log, without re-simulating."""
+
+    def __init__(self, log):
+        self.log = log
+        events = log.events
+        size = int(events["agent"].max()) + 1 if len(events) else 0
+        self.kind = np.zeros(size, dtype=np.uint8)
+        self.x = np.zeros(size, dtype=np.int32)
+        self.y = np.zeros(size, dtype=np.int32)
+        self.alive = np.zeros(size, dtype=bool)
+        # Records of step s are events[bounds[s]:bounds[s + 1]]
+        self.bounds = np.searchsorted(events["step"], np.arange(log.last_step + 2))
+        self.step = -1
+
+    def advance(self):
+        """Apply the events of the next step, returns False past the end of the log."""
+        if self.step + 1 > self.log.last_step:
+            return False
+        self.step += 1
+        chunk = self.log.events[self.bounds[self.step]:self.bounds[self.step + 1]]
+        types = chunk["type"]
+
+        added = np.isin(types, ADD_EVENTS)
+        ids = chunk["agent"][added]
+        self.kind[ids] = types[added]
+        self.alive[ids] = True
+        self.x[ids] = chunk["x"][added]
+        self.y[ids] = chunk["y"][added]
+
+        moved = types == EventType.MOVE
+        self.x[chunk["agent"][moved]] = chunk["x"][moved]
+        self.y[chunk["agent"][moved]] = chunk["y"][moved]
+
+        self.alive[chunk["agent"][np.isin(types, REMOVE_EVENTS)]] = False
+        return True
+
+    def seek(self, step):
+        """Replay from the start up to and including step."""
+        if step < self.step:
+            self.__init__(self.log)
+        while self.step < step and self.advance():
+            pass
+
+    def positions(self, add_event):
+        """Cells of the live entities that entered the world with add_event."""
+        mask = self.alive & (self.kind == add_event)
+        return self.x[mask], self.y[mask]
+
+
+def play(path, cell_size=10, fps=10):
+    """Show a recorded run in a pygame window."""
+    import pygame
+
+    log = EventLog(path)
+    replay = Replay(log)
+    colors = [
+        (EventType.ADD_DISPOSAL_AREA, (0, 255, 0)),
+        (EventType.ADD_GARBAGE, (165, 42, 42)),
+        (EventType.ADD_NORMAL_AGENT, (165, 42, 42)),
+        (EventType.ADD_PROPER_DISPOSER, (255, 0, 255)),
+        (EventType.ADD_IMPROPER_DISPOSER, (255, 0, 0)),
+        (EventType.ADD_POLICE_AGENT, (255, 255, 0)),
+        (EventType.ADD_GARBAGE_COLLECTOR, (0, 255, 0)),
+        (EventType.ADD_CAMERA, (255, 255, 255)),
+    ]
+
+    pygame.init()
+    screen = pygame.display.set_mode((log.width * cell_size, log.height * cell_size))
+    pygame.display.set_caption(f"Replay of {path}")
+    clock = pygame.time.Clock()
+    font = pygame.font.Font(None, 36)
+
+    running = True
+    paused = False
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                paused = not paused
+
+        if not paused:
+            replay.advance()
+
+        screen.fill((0, 0, 0))
+        for add_event, color in colors:
+            xs, ys = replay.positions(add_event)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                pygame.draw.rect(screen, color, (x * cell_size, y * cell_size, cell_size, cell_size))
+        step_text = font.render(f"Step: {replay.step} / {log.last_step}", True, (255, 255, 255))
+        screen.blit(step_text, (10, 10))
+
+        pygame.display.flip()
+        clock.tick(fps)
+
+    pygame.quit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or replay a binary simulation event log")
+    parser.add_argument("path")
+    parser.add_argument("--summary", action="store_true", help="print event counts instead of replaying")
+    args = parser.parse_args()
+
+    if args.summary:
+        log = EventLog(args.path)
+        print(f"World: {log.width} x {log.height}, steps: {log.last_step}, events: {len(log)}")
+        for event, count in log.counts().items():
+            print(f"{event.name}: {count}")
+    else:
+        play(args.path)
+
+
+if __name__ == "__main__":
+    main()
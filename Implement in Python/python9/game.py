@@ -1,9 +1,15 @@
-import random
-import pygame
-import numpy as np
 import logging
 from enum import Enum
 
+from eventlog import EventLogWriter, EventType
+from heatmap import Heatmaps
+from hooks import Hook, Hooks
+from intents import step_two_phase
+from rng import RandomStreams
+from scenario import make_scenario, paused_gc, place, spawn
+from scheduler import Scheduler
+from views import SIMULATION_LISTS, StateView
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -22,13 +28,20 @@ class SimulationState(Enum):
 
 class Button:
     def __init__(self, x, y, width, height, text, color, text_color=BLACK):
+        import pygame
+
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
         self.color = color
         self.text_color = text_color
-        self.font = pygame.font.Font(None, 36)
+        # Created on first draw, so building a button doesn't load fonts
+        self.font = None
 
     def draw(self, screen):
+        import pygame
+
+        if self.font is None:
+            self.font = pygame.font.Font(None, 36)
         pygame.draw.rect(screen, self.color, self.rect)
         text_surface = self.font.render(self.text, True, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
@@ -38,67 +51,80 @@ class Button:
         return self.rect.collidepoint(pos)
 
 class Agent:
-    def __init__(self, x, y, color):
+    # Slots instead of a per-instance __dict__; constants shared by a type
+    # (color, detection_range) live on the class
+    __slots__ = ('x', 'y', 'unique_id')
+    color = WHITE
+
+    def __init__(self, x, y, unique_id=None):
         self.x = x
         self.y = y
-        self.color = color
-        self.score = 5
+        self.unique_id = unique_id
 
-    def move(self, width, height):
-        # Random movement
-        dx = random.randint(-1, 1)
-        dy = random.randint(-1, 1)
-        
+    def move(self, width, height, dx, dy):
+        # Random movement, offsets are drawn in batches by the simulation
         new_x = max(0, min(width - 1, self.x + dx))
         new_y = max(0, min(height - 1, self.y + dy))
         
         self.x, self.y = new_x, new_y
 
 class NormalAgent(Agent):
-    def __init__(self, x, y):
-        super().__init__(x, y, BROWN)
-        self.score = 5
-
-    def check_improper_disposal(self, garbage_items, disposal_areas):
-        # Check if agent is on a garbage item
-        for garbage in garbage_items:
-            if self.x == garbage.x and self.y == garbage.y:
-                # 50% chance of improper disposal
-                if random.random() < 0.5:
-                    # Check if not in proper disposal area
-                    if not any((self.x == area.x and self.y == area.y) for area in disposal_areas):
-                        self.score -= 1
-                        return True
+    __slots__ = ('score',)
+    color = BROWN
+    initial_score = 5
+
+    def __init__(self, x, y, unique_id=None):
+        super().__init__(x, y, unique_id)
+        self.score = self.initial_score
+
+    def check_improper_disposal(self, garbage_items, disposal_areas, roll):
+        # Count garbage items on the agent's cell
+        items = sum(1 for garbage in garbage_items if self.x == garbage.x and self.y == garbage.y)
+
+        # 50% chance of improper disposal per item
+        if items and roll < 1 - 0.5 ** items:
+            # Check if not in proper disposal area
+            if not any((self.x == area.x and self.y == area.y) for area in disposal_areas):
+                self.score -= 1
+                return True
         return False
 
 class ProperDisposer(Agent):
-    def __init__(self, x, y):
-        super().__init__(x, y, MAGENTA)
+    __slots__ = ('score',)
+    color = MAGENTA
+
+    def __init__(self, x, y, unique_id=None):
+        super().__init__(x, y, unique_id)
         self.score = 0
 
     def collect_garbage(self, garbage_items):
+        # Returns the item collected, if any
         for garbage in garbage_items[:]:
             if self.x == garbage.x and self.y == garbage.y:
                 self.score += 1
                 garbage_items.remove(garbage)
-                return True
-        return False
+                return garbage
+        return None
 
 class PoliceAgent(Agent):
-    def __init__(self, x, y):
-        super().__init__(x, y, YELLOW)
+    __slots__ = ()
+    color = YELLOW
 
     def check_arrest(self, normal_agents):
-        arrests = 0
+        # Returns the agents arrested
+        arrested = []
         for agent in normal_agents[:]:
             if self.x == agent.x and self.y == agent.y and agent.score <= 0:
                 normal_agents.remove(agent)
-                arrests += 1
-        return arrests
+                arrested.append(agent)
+        return arrested
 
 class GarbageCollector(Agent):
-    def __init__(self, x, y):
-        super().__init__(x, y, GREEN)
+    __slots__ = ('target',)
+    color = GREEN
+
+    def __init__(self, x, y, unique_id=None):
+        super().__init__(x, y, unique_id)
         self.target = None
 
     def find_target(self, garbage_items):
@@ -117,15 +143,16 @@ class GarbageCollector(Agent):
 
     def move_to_target(self, target):
         if target:
-            dx = np.sign(target.x - self.x)
-            dy = np.sign(target.y - self.y)
+            # Plain ints, numpy scalars would be stored in x and y
+            dx = (target.x > self.x) - (target.x < self.x)
+            dy = (target.y > self.y) - (target.y < self.y)
             self.x += dx
             self.y += dy
 
 class Camera(Agent):
-    def __init__(self, x, y):
-        super().__init__(x, y, WHITE)
-        self.detection_range = 5
+    __slots__ = ()
+    color = WHITE
+    detection_range = 5
 
     def detect_illegal_disposal(self, normal_agents):
         detected = []
@@ -137,14 +164,20 @@ class Camera(Agent):
         return detected
 
 class GarbageItem:
-    def __init__(self, x, y):
+    __slots__ = ('x', 'y', 'unique_id')
+
+    def __init__(self, x, y, unique_id=None):
         self.x = x
         self.y = y
+        self.unique_id = unique_id
 
 class DisposalArea:
-    def __init__(self, x, y):
+    __slots__ = ('x', 'y', 'unique_id')
+
+    def __init__(self, x, y, unique_id=None):
         self.x = x
         self.y = y
+        self.unique_id = unique_id
 
 # [Rest of the previous code remains the same as in the last artifact]
 # (Includes the GarbageSimulation class and main() function from the previous submission)
@@ -153,10 +186,17 @@ class DisposalArea:
 # Existing Agent classes remain the same as in the previous version
 
 class GarbageSimulation:
-    def __init__(self, width=50, height=50):
+    def __init__(self, width=50, height=50, seed=None, event_log=None, log_file='simulation_log.txt',
+                 heatmaps=False, scenario=None, two_phase=False, scheduled_travel=False, hold_steps=None):
         # Simulation parameters
         self.width = width
         self.height = height
+
+        # Populations and where create_agents places them, see scenario.py
+        self.scenario = scenario if scenario is not None else make_scenario()
+
+        # One random stream per population, all derived from the seed
+        self.streams = RandomStreams(seed)
         
         # Initialize agents and items
         self.normal_agents = []
@@ -170,14 +210,46 @@ class GarbageSimulation:
         # Simulation tracking
         self.arrests = 0
         self.blackboard = []
+        self.step_count = 0
+        self.next_id = 0
+
+        # Arrays of the current state, built on demand by view()
+        self._view = None
+
+        # Optional binary event stream alongside the text log
+        self.events = EventLogWriter(event_log, width, height) if event_log else None
+
+        # Step in intent and resolve phases instead of agent by agent, see intents.py
+        if two_phase and scheduled_travel:
+            raise ValueError("scheduled_travel only applies to the agent-by-agent step, not two_phase")
+        self.two_phase = two_phase
+
+        # Timed events, run at the start of the step they are due
+        self.scheduler = Scheduler()
+        # Collectors sent to an item travel without being stepped until they
+        # arrive, see dispatch_collectors (agent-by-agent steps only)
+        self.scheduled_travel = scheduled_travel
+        self.trips = {}
+        self.claimed = {}
+        self.arrivals = []
+        # Arrested agents come back after this many steps, None keeps them out
+        self.hold_steps = hold_steps
+
+        # Observers of the events of every step, see hooks.Hooks
+        self.hooks = Hooks()
+
+        # Optional per-cell accumulators of visits and events, cameras don't move
+        self.heatmaps = (Heatmaps(width, height, [name for name, _ in SIMULATION_LISTS if name != "camera"])
+                         if heatmaps else None)
         
-        # Logging setup
+        # Logging setup, log_file=None leaves the text log off (e.g. for headless runs)
         self.logger = logging.getLogger('GarbageSimulation')
         self.logger.setLevel(logging.INFO)
-        file_handler = logging.FileHandler('simulation_log.txt', mode='w')
-        formatter = logging.Formatter('%(asctime)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        self.logger.addHandler(file_handler)
+        if log_file:
+            file_handler = logging.FileHandler(log_file, mode='w')
+            formatter = logging.Formatter('%(asctime)s - %(message)s')
+            file_handler.setFormatter(formatter)
+            self.logger.addHandler(file_handler)
         
         # State tracking
         self.state = SimulationState.SETUP
@@ -186,7 +258,35 @@ class GarbageSimulation:
         """Log messages between agents"""
         self.logger.info(message)
 
+    def random_offsets(self, population, count):
+        """Draw the (dx, dy) moves of a whole population in one batch."""
+        dx, dy = self.streams[population].integers(-1, 2, size=(2, count)).tolist()
+        return zip(dx, dy)
+
+    def get_rng_state(self):
+        """Random stream state, saved with a checkpoint so a restored run continues identically."""
+        return self.streams.get_state()
+
+    def set_rng_state(self, state):
+        self.streams.set_state(state)
+
+    def record_setup(self):
+        self.events.reset()
+        for event_type, entities in [
+            (EventType.ADD_DISPOSAL_AREA, self.disposal_areas),
+            (EventType.ADD_GARBAGE, self.garbage_items),
+            (EventType.ADD_NORMAL_AGENT, self.normal_agents),
+            (EventType.ADD_PROPER_DISPOSER, self.proper_disposers),
+            (EventType.ADD_POLICE_AGENT, self.police_agents),
+            (EventType.ADD_GARBAGE_COLLECTOR, self.garbage_collectors),
+            (EventType.ADD_CAMERA, self.cameras),
+        ]:
+            self.events.record(0, event_type, entities)
+        self.events.flush()
+
     def create_agents(self):
+        self._view = None
+
         # Clear existing agents
         self.normal_agents.clear()
         self.proper_disposers.clear()
@@ -195,47 +295,30 @@ class GarbageSimulation:
         self.cameras.clear()
         self.garbage_items.clear()
         self.disposal_areas.clear()
-
-        # Create normal agents
-        for _ in range(50):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.normal_agents.append(NormalAgent(x, y))
-        
-        # Create proper disposers
-        for _ in range(10):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.proper_disposers.append(ProperDisposer(x, y))
-        
-        # Create police agents
-        for _ in range(5):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.police_agents.append(PoliceAgent(x, y))
-        
-        # Create garbage collectors
-        for _ in range(5):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.garbage_collectors.append(GarbageCollector(x, y))
-        
-        # Create cameras
-        for _ in range(10):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.cameras.append(Camera(x, y))
-        
-        # Create garbage items
-        for _ in range(20):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.garbage_items.append(GarbageItem(x, y))
-
-        # Create disposal areas
-        for x in range(0, self.width, 10):
-            for y in range(0, self.height, 10):
-                self.disposal_areas.append(DisposalArea(x, y))
+        self.step_count = 0
+        self.next_id = 0
+        if self.heatmaps:
+            self.heatmaps.clear()
+        self.scheduler = Scheduler()
+        self.trips.clear()
+        self.claimed.clear()
+        self.arrivals.clear()
+
+        # Place every population in bulk, without the garbage collector
+        # running over the new objects every few hundred allocations
+        cells = place(self.scenario, self.width, self.height, self.streams["placement"])
+        with paused_gc():
+            for name, entities, cls in [
+                ("normal", self.normal_agents, NormalAgent),
+                ("disposer", self.proper_disposers, ProperDisposer),
+                ("police", self.police_agents, PoliceAgent),
+                ("collector", self.garbage_collectors, GarbageCollector),
+                ("camera", self.cameras, Camera),
+                ("garbage", self.garbage_items, GarbageItem),
+                ("disposal_area", self.disposal_areas, DisposalArea),
+            ]:
+                entities.extend(spawn(cls, *cells[name], self.next_id))
+                self.next_id += len(cells[name][0])
 
         # Log agent creation
         self.log_message(f"Simulation Setup: Created {len(self.normal_agents)} normal agents, "
@@ -245,51 +328,233 @@ class GarbageSimulation:
                          f"{len(self.cameras)} cameras, and "
                          f"{len(self.garbage_items)} garbage items")
 
+        if self.events:
+            self.record_setup()
+
+    def view(self):
+        """State as read-only NumPy arrays, built once and shared until the next step."""
+        if self._view is None:
+            self.sync_trips()
+            self._view = StateView.of_simulation(self)
+        return self._view
+
     def step(self):
         if self.state != SimulationState.RUNNING:
             return False
+        if self.two_phase:
+            return step_two_phase(self)
+        self.step_count += 1
+        self._view = None
+        events = self.events
+        heatmaps = self.heatmaps
+        hooks = self.hooks
+        hooks.emit(Hook.STEP_BEGIN, self)
+        self.scheduler.run_until(self.step_count)
 
         # Move and process normal agents
-        for agent in self.normal_agents[:]:
-            agent.move(self.width, self.height)
-            if agent.check_improper_disposal(self.garbage_items, self.disposal_areas):
+        moves = self.random_offsets("normal", len(self.normal_agents))
+        rolls = self.streams["normal"].random(len(self.normal_agents)).tolist()
+        penalized = []
+        for agent, (dx, dy), roll in zip(self.normal_agents[:], moves, rolls):
+            agent.move(self.width, self.height, dx, dy)
+            if agent.check_improper_disposal(self.garbage_items, self.disposal_areas, roll):
                 self.arrests += 1
+                penalized.append(agent)
                 self.log_message(f"Improper Disposal: Agent at ({agent.x}, {agent.y}) penalized")
+                if events:
+                    events.record(self.step_count, EventType.IMPROPER_DISPOSAL, [agent])
+        if events:
+            events.record_move(self.step_count, self.normal_agents)
+        if heatmaps:
+            heatmaps.add_entities("visits_normal", self.normal_agents)
+            heatmaps.add_entities("disposals", penalized)
+        hooks.emit(Hook.IMPROPER_DISPOSAL, self, penalized)
 
         # Move and process proper disposers
-        for disposer in self.proper_disposers:
-            disposer.move(self.width, self.height)
-            if disposer.collect_garbage(self.garbage_items):
+        moves = self.random_offsets("proper_disposer", len(self.proper_disposers))
+        collections = []
+        for disposer, (dx, dy) in zip(self.proper_disposers, moves):
+            disposer.move(self.width, self.height, dx, dy)
+            collected = disposer.collect_garbage(self.garbage_items)
+            if collected:
+                collections.append(collected)
                 self.log_message(f"Garbage Collection: Disposer at ({disposer.x}, {disposer.y}) collected garbage")
+                if events:
+                    events.record(self.step_count, EventType.GARBAGE_COLLECTION, [collected])
+        if events:
+            events.record_move(self.step_count, self.proper_disposers)
+        if heatmaps:
+            heatmaps.add_entities("visits_disposer", self.proper_disposers)
+        hooks.emit(Hook.GARBAGE_COLLECTION, self, collections)
 
         # Move and process police agents
-        for police in self.police_agents:
-            police.move(self.width, self.height)
-            new_arrests = police.check_arrest(self.normal_agents)
-            if new_arrests > 0:
-                self.arrests += new_arrests
-                self.log_message(f"Arrest: Police agent at ({police.x}, {police.y}) arrested {new_arrests} agents")
+        moves = self.random_offsets("police", len(self.police_agents))
+        arrests = []
+        for police, (dx, dy) in zip(self.police_agents, moves):
+            police.move(self.width, self.height, dx, dy)
+            arrested = police.check_arrest(self.normal_agents)
+            if arrested:
+                self.arrests += len(arrested)
+                arrests.extend(arrested)
+                self.log_message(f"Arrest: Police agent at ({police.x}, {police.y}) arrested {len(arrested)} agents")
+                if events:
+                    events.record(self.step_count, EventType.ARREST, arrested)
+        if events:
+            events.record_move(self.step_count, self.police_agents)
+        if heatmaps:
+            heatmaps.add_entities("visits_police", self.police_agents)
+            heatmaps.add_entities("arrests", arrests)
+        hooks.emit(Hook.ARREST, self, arrests)
+        self.hold(arrests)
 
         # Move and process garbage collectors
-        for collector in self.garbage_collectors:
-            collector.move(self.width, self.height)
-            target = collector.find_target(self.garbage_items)
-            if target:
-                collector.move_to_target(target)
-                if collector.x == target.x and collector.y == target.y:
-                    self.log_message(f"Garbage Removal: Collector at ({collector.x}, {collector.y}) removed garbage")
-                    self.garbage_items.remove(target)
+        if self.scheduled_travel:
+            removals = self.dispatch_collectors()
+            if events and removals:
+                events.record(self.step_count, EventType.GARBAGE_REMOVAL, removals)
+            if events or heatmaps:
+                self.sync_trips()
+        else:
+            moves = self.random_offsets("garbage_collector", len(self.garbage_collectors))
+            removals = []
+            for collector, (dx, dy) in zip(self.garbage_collectors, moves):
+                collector.move(self.width, self.height, dx, dy)
+                target = collector.find_target(self.garbage_items)
+                if target:
+                    collector.move_to_target(target)
+                    if collector.x == target.x and collector.y == target.y:
+                        self.log_message(f"Garbage Removal: Collector at ({collector.x}, {collector.y}) removed garbage")
+                        self.garbage_items.remove(target)
+                        removals.append(target)
+                        if events:
+                            events.record(self.step_count, EventType.GARBAGE_REMOVAL, [target])
+        if events:
+            events.record_move(self.step_count, self.garbage_collectors)
+        if heatmaps:
+            heatmaps.add_entities("visits_collector", self.garbage_collectors)
+            heatmaps.add_entities("collections", collections + removals)
+        hooks.emit(Hook.GARBAGE_REMOVAL, self, removals)
 
         # Process cameras
+        detections = []
         for camera in self.cameras:
             detected = camera.detect_illegal_disposal(self.normal_agents)
             if detected:
                 self.log_message(f"Camera Detection: {len(detected)} illegal disposal agents detected")
+                if events:
+                    events.record(self.step_count, EventType.CAMERA_DETECTION, detected)
             self.blackboard.extend(detected)
-        
+            detections.extend(detected)
+        hooks.emit(Hook.CAMERA_DETECTION, self, detections)
+
+        if heatmaps:
+            heatmaps.add_entities("dwell", self.garbage_items)
+        if events:
+            events.flush()
+        hooks.emit(Hook.STEP_END, self)
         return True
 
+    def dispatch_collectors(self):
+        """Send every idle collector to the nearest item it would reach first.
+
+        An idle collector takes its random move and picks the closest item
+        as in the agent-by-agent step, skipping items another collector will
+        reach sooner. If the item is within one cell it is removed now,
+        otherwise the collector sets off on a trip of one cell per step
+        (diagonals included) and its arrival is scheduled for the step after
+        it gets there. A collector whose item is taken over by a closer one
+        stops where it is and is dispatched again at the next step.
+        Travelling collectors are not stepped at all. Returns the items
+        removed this step, arrivals included.
+        """
+        removals = self.arrivals
+        self.arrivals = []
+        idle = [collector for collector in self.garbage_collectors if collector not in self.trips]
+        if not idle:
+            return removals
+
+        moves = self.random_offsets("garbage_collector", len(idle))
+        for collector, (dx, dy) in zip(idle, moves):
+            collector.move(self.width, self.height, dx, dy)
+            target = None
+            closest = float('inf')
+            for item in self.garbage_items:
+                dist = ((collector.x - item.x)**2 + (collector.y - item.y)**2)**0.5
+                if dist >= closest:
+                    continue
+                claimant = self.claimed.get(item)
+                steps = max(abs(item.x - collector.x), abs(item.y - collector.y))
+                if claimant is not None and self.step_count + steps >= self.trips[claimant][3][0]:
+                    continue
+                target, closest = item, dist
+            if not target:
+                continue
+
+            if target in self.claimed:
+                self.recall(self.claimed[target])
+            distance = max(abs(target.x - collector.x), abs(target.y - collector.y))
+            if distance <= 1:
+                collector.move_to_target(target)
+                self.log_message(f"Garbage Removal: Collector at ({collector.x}, {collector.y}) removed garbage")
+                self.garbage_items.remove(target)
+                removals.append(target)
+            else:
+                collector.target = target
+                self.claimed[target] = collector
+                arrival = self.scheduler.schedule(self.step_count + distance, self.arrive, collector)
+                self.trips[collector] = (self.step_count, collector.x, collector.y, arrival)
+        return removals
+
+    def recall(self, collector):
+        """Stop a collector's trip where it is now, leaving it idle."""
+        self.sync_trips([collector])
+        self.scheduler.cancel(self.trips.pop(collector)[3])
+        del self.claimed[collector.target]
+        collector.target = None
+
+    def arrive(self, collector):
+        """End a collector's trip, removing its target unless a disposer took it meanwhile."""
+        target = collector.target
+        del self.trips[collector]
+        del self.claimed[target]
+        collector.target = None
+        collector.x, collector.y = target.x, target.y
+        try:
+            self.garbage_items.remove(target)
+        except ValueError:
+            return
+        self.log_message(f"Garbage Removal: Collector at ({collector.x}, {collector.y}) removed garbage")
+        self.arrivals.append(target)
+
+    def sync_trips(self, collectors=None):
+        """Move travelling collectors to where they are along their trip, for views and drawing."""
+        for collector in self.trips if collectors is None else collectors:
+            departed, x, y, _ = self.trips[collector]
+            travelled = self.step_count - departed + 1
+            target = collector.target
+            collector.x = x + max(-travelled, min(travelled, target.x - x))
+            collector.y = y + max(-travelled, min(travelled, target.y - y))
+
+    def hold(self, agents):
+        """Schedule the release of arrested agents, when they are held for hold_steps."""
+        if self.hold_steps is None:
+            return
+        for agent in agents:
+            self.scheduler.schedule(self.step_count + self.hold_steps, self.release, agent)
+
+    def release(self, agent):
+        agent.score = agent.initial_score
+        self.normal_agents.append(agent)
+        self.log_message(f"Release: Agent back at ({agent.x}, {agent.y}) after {self.hold_steps} steps held")
+        if self.events:
+            self.events.record(self.step_count, EventType.ADD_NORMAL_AGENT, [agent])
+
 def main():
+    import pygame
+
+    from viewport import Viewport
+    from views import positions
+
     # Initialize Pygame
     pygame.init()
 
@@ -305,9 +570,14 @@ def main():
     # Create simulation
     simulation = GarbageSimulation(
         width=SCREEN_WIDTH // CELL_SIZE, 
-        height=SCREEN_HEIGHT // CELL_SIZE
+        height=SCREEN_HEIGHT // CELL_SIZE,
+        event_log='simulation_events.bin',
+        heatmaps=True
     )
 
+    # Pannable, zoomable view of the world
+    viewport = Viewport(simulation.width, simulation.height, SCREEN_WIDTH, SCREEN_HEIGHT, CELL_SIZE)
+
     # Create buttons
     setup_button = Button(SCREEN_WIDTH - 200, 50, 180, 50, "Setup", GREEN)
     start_button = Button(SCREEN_WIDTH - 200, 150, 180, 50, "Start", BLUE)
@@ -323,12 +593,15 @@ def main():
     running = True
     step_count = 0
     auto_step = False  # Flag for automatic stepping
+    # Heatmap drawn over the world, H cycles through the layers and off
+    overlays = [None] + list(simulation.heatmaps.layers)
+    overlay = 0
 
     while running:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
-            elif event.type == pygame.MOUSEBUTTONDOWN:
+            elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                 pos = pygame.mouse.get_pos()
                 
                 # Check button clicks
@@ -354,6 +627,10 @@ def main():
                     if simulation.state == SimulationState.RUNNING or simulation.state == SimulationState.STOPPED:
                         if simulation.step():
                             step_count += 1
+                elif event.key == pygame.K_h:
+                    overlay = (overlay + 1) % len(overlays)
+
+            viewport.handle_event(event)
 
         # Auto-step if in running state
         if auto_step and simulation.state == SimulationState.RUNNING:
@@ -364,22 +641,13 @@ def main():
         screen.fill(BLACK)
 
         # Draw disposal areas
-        for area in simulation.disposal_areas:
-            pygame.draw.rect(screen, GREEN, 
-                (area.x * CELL_SIZE, area.y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+        viewport.draw_cells(screen, *positions(simulation.disposal_areas), GREEN)
 
         # Draw garbage items as triangles
-        for item in simulation.garbage_items:
-            # Calculate triangle vertices
-            x, y = item.x * CELL_SIZE, item.y * CELL_SIZE
-            triangle_points = [
-                (x + CELL_SIZE // 2, y),  # Top point
-                (x, y + CELL_SIZE),        # Bottom left
-                (x + CELL_SIZE, y + CELL_SIZE)  # Bottom right
-            ]
-            pygame.draw.polygon(screen, BROWN, triangle_points)
-
-        # Draw agents
+        viewport.draw_cells(screen, *positions(simulation.garbage_items), BROWN, shape="triangle")
+
+        # Draw agents, travelling collectors where they are along their trip
+        simulation.sync_trips()
         for agent_list, color in [
             (simulation.normal_agents, BROWN),
             (simulation.proper_disposers, MAGENTA),
@@ -387,9 +655,13 @@ def main():
             (simulation.garbage_collectors, GREEN),
             (simulation.cameras, WHITE)
         ]:
-            for agent in agent_list:
-                pygame.draw.rect(screen, color, 
-                    (agent.x * CELL_SIZE, agent.y * CELL_SIZE, CELL_SIZE, CELL_SIZE))
+            viewport.draw_cells(screen, *positions(agent_list), color)
+
+        # Draw the selected heatmap over the world
+        if overlays[overlay]:
+            viewport.draw_heatmap(screen, simulation.heatmaps[overlays[overlay]].to_dense(), RED)
+            overlay_text = font.render(overlays[overlay], True, WHITE)
+            screen.blit(overlay_text, (10, 90))
 
         # Draw buttons
         setup_button.draw(screen)
@@ -415,6 +687,8 @@ def main():
         clock.tick(10)  # 10 FPS to make steps more visible
 
     # Quit Pygame
+    if simulation.events:
+        simulation.events.close()
     pygame.quit()
 
 if __name__ == "__main__":
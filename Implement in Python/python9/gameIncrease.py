@@ -1,9 +1,10 @@
-import random
-import pygame
 import numpy as np
 import logging
 from enum import Enum
-import time
+
+from convergence import SteadyStateDetector
+from eventlog import EventLogWriter, EventType
+from rng import RandomStreams
 
 # Colors
 WHITE = (255, 255, 255)
@@ -23,13 +24,20 @@ class SimulationState(Enum):
 
 class Button:
     def __init__(self, x, y, width, height, text, color, text_color=BLACK):
+        import pygame
+
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
         self.color = color
         self.text_color = text_color
-        self.font = pygame.font.Font(None, 36)
+        # Created on first draw, so building a button doesn't load fonts
+        self.font = None
 
     def draw(self, screen):
+        import pygame
+
+        if self.font is None:
+            self.font = pygame.font.Font(None, 36)
         pygame.draw.rect(screen, self.color, self.rect)
         text_surface = self.font.render(self.text, True, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
@@ -45,11 +53,8 @@ class Agent:
         self.color = color
         self.score = 5
 
-    def move(self, width, height):
-        # Random movement
-        dx = random.randint(-1, 1)
-        dy = random.randint(-1, 1)
-        
+    def move(self, width, height, dx, dy):
+        # Random movement, offsets are drawn in batches by the simulation
         new_x = max(0, min(width - 1, self.x + dx))
         new_y = max(0, min(height - 1, self.y + dy))
         
@@ -60,16 +65,16 @@ class NormalAgent(Agent):
         super().__init__(x, y, BROWN)
         self.score = 5
 
-    def check_improper_disposal(self, garbage_items, disposal_areas):
-        # Check if agent is on a garbage item
-        for garbage in garbage_items:
-            if self.x == garbage.x and self.y == garbage.y:
-                # 50% chance of improper disposal
-                if random.random() < 0.5:
-                    # Check if not in proper disposal area
-                    if not any((self.x == area.x and self.y == area.y) for area in disposal_areas):
-                        self.score -= 1
-                        return True
+    def check_improper_disposal(self, garbage_items, disposal_areas, roll):
+        # Count garbage items on the agent's cell
+        items = sum(1 for garbage in garbage_items if self.x == garbage.x and self.y == garbage.y)
+
+        # 50% chance of improper disposal per item
+        if items and roll < 1 - 0.5 ** items:
+            # Check if not in proper disposal area
+            if not any((self.x == area.x and self.y == area.y) for area in disposal_areas):
+                self.score -= 1
+                return True
         return False
 
 class ProperDisposer(Agent):
@@ -78,45 +83,46 @@ class ProperDisposer(Agent):
         self.score = 0
 
     def collect_garbage(self, garbage_items):
+        # Returns the item collected, if any
         for garbage in garbage_items[:]:
             if self.x == garbage.x and self.y == garbage.y:
                 self.score += 1
                 garbage_items.remove(garbage)
-                return True
-        return False
+                return garbage
+        return None
 
 class PoliceAgent:
     def __init__(self, x, y):
         self.x = x
         self.y = y
 
-    def move(self, width, height):
+    def move(self, width, height, dx, dy):
         """Move randomly within the simulation area."""
-        self.x = (self.x + random.choice([-1, 0, 1])) % width
-        self.y = (self.y + random.choice([-1, 0, 1])) % height
+        self.x = (self.x + dx) % width
+        self.y = (self.y + dy) % height
 
     def check_arrest(self, improper_disposers):
         """Check and arrest any ImproperDisposer agents within the same position."""
-        arrests = 0
+        arrested = []
         for disposer in improper_disposers[:]:
             if disposer.x == self.x and disposer.y == self.y:
                 improper_disposers.remove(disposer)
-                arrests += 1
-        return arrests
+                arrested.append(disposer)
+        return arrested
     
 class ImproperDisposer:
     def __init__(self, x, y):
         self.x = x
         self.y = y
 
-    def move(self, width, height):
+    def move(self, width, height, dx, dy):
         """Move randomly within the simulation area."""
-        self.x = (self.x + random.choice([-1, 0, 1])) % width
-        self.y = (self.y + random.choice([-1, 0, 1])) % height
+        self.x = (self.x + dx) % width
+        self.y = (self.y + dy) % height
 
-    def dispose_improperly(self, garbage_items):
-        """Dispose garbage improperly, leaving it in the environment."""
-        garbage_items.append(GarbageItem(self.x, self.y))
+    def dispose_improperly(self):
+        """Dispose garbage improperly, returning the item left in the environment."""
+        return GarbageItem(self.x, self.y)
 
 class GarbageCollector(Agent):
     def __init__(self, x, y):
@@ -170,10 +176,13 @@ class DisposalArea:
 
 
 class GarbageSimulation:
-    def __init__(self, width=50, height=50):
+    def __init__(self, width=50, height=50, seed=None, convergence=None, event_log=None):
         # Simulation parameters
         self.width = width
         self.height = height
+
+        # One random stream per population, all derived from the seed
+        self.streams = RandomStreams(seed)
         
         # Initialize agents and items
         self.normal_agents = []
@@ -188,7 +197,14 @@ class GarbageSimulation:
         # Simulation tracking
         self.arrests = 0
         self.last_arrest_count = 0
-        self.last_arrest_time = time.time()
+        self.step_count = 0
+        self.next_id = 0
+
+        # Optional binary event stream alongside the text log
+        self.events = EventLogWriter(event_log, width, height) if event_log else None
+
+        # Stop once arrest rate and garbage level settle, measured in steps
+        self.convergence = convergence if convergence is not None else SteadyStateDetector()
         
         # Logging setup
         self.logger = logging.getLogger('GarbageSimulation')
@@ -203,18 +219,65 @@ class GarbageSimulation:
     
     
     def check_arrest_activity(self):
-        current_time = time.time()
-        if self.arrests > self.last_arrest_count:
-            self.last_arrest_time = current_time
-            self.last_arrest_count = self.arrests
-        elif current_time - self.last_arrest_time > 30:
+        """Feed this step's metrics to the detector and stop once they have converged."""
+        new_arrests = self.arrests - self.last_arrest_count
+        self.last_arrest_count = self.arrests
+        if self.convergence.update(arrest_rate=new_arrests, garbage_level=len(self.garbage_items)):
             self.state = SimulationState.STOPPED
-            self.log_message("Simulation stopped due to inactivity in arrests.")
+            if self.convergence.reason == "max_steps":
+                self.log_message(f"Simulation stopped after {self.convergence.steps} steps without converging.")
+            else:
+                self.log_message(f"Simulation stopped: arrest rate and garbage level converged "
+                                 f"after {self.convergence.steps} steps.")
+
+    def reset_convergence(self):
+        self.last_arrest_count = self.arrests
+        self.convergence.reset()
 
     def log_message(self, message):
         """Log messages between agents"""
         self.logger.info(message)
 
+    def random_positions(self, count):
+        """Draw count uniformly random cells in one batch from the placement stream."""
+        rng = self.streams["placement"]
+        xs = rng.integers(0, self.width, size=count)
+        ys = rng.integers(0, self.height, size=count)
+        return zip(xs.tolist(), ys.tolist())
+
+    def random_offsets(self, population, count):
+        """Draw the (dx, dy) moves of a whole population in one batch."""
+        dx, dy = self.streams[population].integers(-1, 2, size=(2, count)).tolist()
+        return zip(dx, dy)
+
+    def get_rng_state(self):
+        """Random stream state, saved with a checkpoint so a restored run continues identically."""
+        return self.streams.get_state()
+
+    def set_rng_state(self, state):
+        self.streams.set_state(state)
+
+    def add(self, entities, entity):
+        """Give an agent or item its unique_id and add it to the simulation."""
+        entity.unique_id = self.next_id
+        self.next_id += 1
+        entities.append(entity)
+
+    def record_setup(self):
+        self.events.reset()
+        for event_type, entities in [
+            (EventType.ADD_DISPOSAL_AREA, self.disposal_areas),
+            (EventType.ADD_GARBAGE, self.garbage_items),
+            (EventType.ADD_NORMAL_AGENT, self.normal_agents),
+            (EventType.ADD_IMPROPER_DISPOSER, self.improper_disposers),
+            (EventType.ADD_PROPER_DISPOSER, self.proper_disposers),
+            (EventType.ADD_POLICE_AGENT, self.police_agents),
+            (EventType.ADD_GARBAGE_COLLECTOR, self.garbage_collectors),
+            (EventType.ADD_CAMERA, self.cameras),
+        ]:
+            self.events.record(0, event_type, entities)
+        self.events.flush()
+
     def create_agents(self):
         # Clear existing agents and items
         self.normal_agents.clear()
@@ -225,54 +288,42 @@ class GarbageSimulation:
         self.cameras.clear()
         self.garbage_items.clear()
         self.disposal_areas.clear()
+        self.step_count = 0
+        self.next_id = 0
 
         # Create normal agents
-        for _ in range(50):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.normal_agents.append(NormalAgent(x, y))
+        for x, y in self.random_positions(50):
+            self.add(self.normal_agents, NormalAgent(x, y))
             
             
         # Create improper disposers
-        for _ in range(15):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.improper_disposers.append(ImproperDisposer(x, y))
+        for x, y in self.random_positions(15):
+            self.add(self.improper_disposers, ImproperDisposer(x, y))
             
         # Create proper disposers
-        for _ in range(10):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.proper_disposers.append(ProperDisposer(x, y))
+        for x, y in self.random_positions(10):
+            self.add(self.proper_disposers, ProperDisposer(x, y))
         
         # Create police agents
-        for _ in range(30):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.police_agents.append(PoliceAgent(x, y))
+        for x, y in self.random_positions(30):
+            self.add(self.police_agents, PoliceAgent(x, y))
         
         # Create garbage collectors
-        for _ in range(50):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.garbage_collectors.append(GarbageCollector(x, y))
+        for x, y in self.random_positions(50):
+            self.add(self.garbage_collectors, GarbageCollector(x, y))
         
         # Create cameras
-        for _ in range(40):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.cameras.append(Camera(x, y))
+        for x, y in self.random_positions(40):
+            self.add(self.cameras, Camera(x, y))
         
         # Create garbage items
-        for _ in range(30):
-            x = random.randint(0, self.width - 1)
-            y = random.randint(0, self.height - 1)
-            self.garbage_items.append(GarbageItem(x, y))
+        for x, y in self.random_positions(30):
+            self.add(self.garbage_items, GarbageItem(x, y))
 
         # Create disposal areas
         for x in range(0, self.width, 10):
             for y in range(0, self.height, 10):
-                self.disposal_areas.append(DisposalArea(x, y))
+                self.add(self.disposal_areas, DisposalArea(x, y))
 
         # Log agent creation
         self.log_message(f"Simulation Setup: Created {len(self.normal_agents)} normal agents, "
@@ -282,46 +333,79 @@ class GarbageSimulation:
                          f"{len(self.cameras)} cameras, and "
                          f"{len(self.garbage_items)} garbage items")
 
+        if self.events:
+            self.record_setup()
+
     def step(self):
         if self.state != SimulationState.RUNNING:
             return False
-        
+        self.step_count += 1
+        events = self.events
+
         # Move and process improper disposers
-        for disposer in self.improper_disposers[:]:
-            disposer.move(self.width, self.height)
-            disposer.dispose_improperly(self.garbage_items)
+        moves = self.random_offsets("improper_disposer", len(self.improper_disposers))
+        for disposer, (dx, dy) in zip(self.improper_disposers[:], moves):
+            disposer.move(self.width, self.height, dx, dy)
+            garbage = disposer.dispose_improperly()
+            self.add(self.garbage_items, garbage)
             self.log_message(f"Improper Disposal: ImproperDisposer at ({disposer.x}, {disposer.y}) disposed garbage")
+            if events:
+                events.record(self.step_count, EventType.ADD_GARBAGE, [garbage])
+        if events:
+            events.record_move(self.step_count, self.improper_disposers)
         
         # Move and process normal agents
-        for agent in self.normal_agents[:]:
-            agent.move(self.width, self.height)
-            if agent.check_improper_disposal(self.garbage_items, self.disposal_areas):
+        moves = self.random_offsets("normal", len(self.normal_agents))
+        rolls = self.streams["normal"].random(len(self.normal_agents)).tolist()
+        for agent, (dx, dy), roll in zip(self.normal_agents[:], moves, rolls):
+            agent.move(self.width, self.height, dx, dy)
+            if agent.check_improper_disposal(self.garbage_items, self.disposal_areas, roll):
                 self.arrests += 1
                 self.log_message(f"Improper Disposal: Agent at ({agent.x}, {agent.y}) penalized")
+                if events:
+                    events.record(self.step_count, EventType.IMPROPER_DISPOSAL, [agent])
+        if events:
+            events.record_move(self.step_count, self.normal_agents)
 
         # Move and process proper disposers
-        for disposer in self.proper_disposers:
-            disposer.move(self.width, self.height)
-            if disposer.collect_garbage(self.garbage_items):
+        moves = self.random_offsets("proper_disposer", len(self.proper_disposers))
+        for disposer, (dx, dy) in zip(self.proper_disposers, moves):
+            disposer.move(self.width, self.height, dx, dy)
+            collected = disposer.collect_garbage(self.garbage_items)
+            if collected:
                 self.log_message(f"Garbage Collection: Disposer at ({disposer.x}, {disposer.y}) collected garbage")
+                if events:
+                    events.record(self.step_count, EventType.GARBAGE_COLLECTION, [collected])
+        if events:
+            events.record_move(self.step_count, self.proper_disposers)
 
         # Move and process police agents
-        for police in self.police_agents:
-            police.move(self.width, self.height)
-            new_arrests = police.check_arrest(self.improper_disposers)
-            if new_arrests > 0:
-                self.arrests += new_arrests
-                self.log_message(f"Arrest: Police agent at ({police.x}, {police.y}) arrested {new_arrests} ImproperDisposers")
+        moves = self.random_offsets("police", len(self.police_agents))
+        for police, (dx, dy) in zip(self.police_agents, moves):
+            police.move(self.width, self.height, dx, dy)
+            arrested = police.check_arrest(self.improper_disposers)
+            if arrested:
+                self.arrests += len(arrested)
+                self.log_message(f"Arrest: Police agent at ({police.x}, {police.y}) arrested {len(arrested)} ImproperDisposers")
+                if events:
+                    events.record(self.step_count, EventType.ARREST, arrested)
+        if events:
+            events.record_move(self.step_count, self.police_agents)
 
         # Move and process garbage collectors
-        for collector in self.garbage_collectors:
-            collector.move(self.width, self.height)
+        moves = self.random_offsets("garbage_collector", len(self.garbage_collectors))
+        for collector, (dx, dy) in zip(self.garbage_collectors, moves):
+            collector.move(self.width, self.height, dx, dy)
             target = collector.find_target(self.garbage_items)
             if target:
                 collector.move_to_target(target)
                 if collector.x == target.x and collector.y == target.y:
                     self.log_message(f"Garbage Removal: Collector at ({collector.x}, {collector.y}) removed garbage")
                     self.garbage_items.remove(target)
+                    if events:
+                        events.record(self.step_count, EventType.GARBAGE_REMOVAL, [target])
+        if events:
+            events.record_move(self.step_count, self.garbage_collectors)
 
         # # Process cameras
         # for camera in self.cameras:
@@ -329,10 +413,14 @@ class GarbageSimulation:
         #     if detected:
         #         self.log_message(f"Camera Detection: {len(detected)} illegal disposal agents detected")
         #     self.blackboard.extend(detected)
-        
+
+        if events:
+            events.flush()
         return True
 
 def main():
+    import pygame
+
     pygame.init()
 
     SCREEN_WIDTH = 1000
@@ -344,7 +432,8 @@ def main():
 
     simulation = GarbageSimulation(
         width=SCREEN_WIDTH // CELL_SIZE, 
-        height=SCREEN_HEIGHT // CELL_SIZE
+        height=SCREEN_HEIGHT // CELL_SIZE,
+        event_log='simulation_events.bin'
     )
 
     setup_button = Button(SCREEN_WIDTH - 200, 50, 180, 50, "Setup", GREEN)
@@ -369,7 +458,7 @@ def main():
                     simulation.create_agents()
                     step_count = 0
                     simulation.arrests = 0
-                    simulation.last_arrest_time = time.time()
+                    simulation.reset_convergence()
                     auto_step = False
                     
                     
@@ -432,6 +521,8 @@ def main():
 
         clock.tick(10)
 
+    if simulation.events:
+        simulation.events.close()
     pygame.quit()
 
 
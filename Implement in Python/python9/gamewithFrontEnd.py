@@ -1,5 +1,4 @@
 import random
-import pygame
 import numpy as np
 import logging
 from enum import Enum
@@ -22,13 +21,20 @@ class SimulationState(Enum):
 
 class Button:
     def __init__(self, x, y, width, height, text, color, text_color=BLACK):
+        import pygame
+
         self.rect = pygame.Rect(x, y, width, height)
         self.text = text
         self.color = color
         self.text_color = text_color
-        self.font = pygame.font.Font(None, 36)
+        # Created on first draw, so building a button doesn't load fonts
+        self.font = None
 
     def draw(self, screen):
+        import pygame
+
+        if self.font is None:
+            self.font = pygame.font.Font(None, 36)
         pygame.draw.rect(screen, self.color, self.rect)
         text_surface = self.font.render(self.text, True, self.text_color)
         text_rect = text_surface.get_rect(center=self.rect.center)
@@ -291,6 +297,8 @@ class GarbageSimulation:
         return True
 
 def main():
+    import pygame
+
     # Initialize Pygame
     pygame.init()
 
@@ -0,0 +1,96 @@
+import argparse
+
+from cache import ResultCache
+from game import GarbageSimulation, SimulationState
+from scenario import load_scenario, make_scenario
+
+
+def run(steps=200, width=100, height=60, seed=None, event_log=None, heatmaps=None, metrics_port=None,
+        scenario=None, two_phase=False, scheduled_travel=False, hold_steps=None):
+    """Run GarbageSimulation without a display and return its final metrics.
+
+    With heatmaps set, the per-cell heatmaps are saved to that .npz path.
+    With metrics_port set, live metrics are served on localhost while it runs.
+    scenario is a dict of make_scenario() overrides, its width and height
+    take precedence over the arguments. two_phase selects the intent and
+    resolve step of intents.py, scheduled_travel and hold_steps the timed
+    collector trips and arrest holds of GarbageSimulation.
+    """
+    if scenario:
+        width = scenario.get("width", width)
+        height = scenario.get("height", height)
+    simulation = GarbageSimulation(width=width, height=height, seed=seed,
+                                   event_log=event_log, log_file=None, heatmaps=bool(heatmaps),
+                                   scenario=make_scenario(scenario), two_phase=two_phase,
+                                   scheduled_travel=scheduled_travel, hold_steps=hold_steps)
+    simulation.create_agents()
+    simulation.state = SimulationState.RUNNING
+    server = None
+    if metrics_port is not None:
+        from metrics import serve_metrics
+
+        server = serve_metrics(simulation, port=metrics_port)
+    for _ in range(steps):
+        simulation.step()
+    if simulation.events:
+        simulation.events.close()
+    if simulation.heatmaps:
+        simulation.heatmaps.save(heatmaps)
+    if server:
+        server.stop()
+
+    return {
+        "steps": simulation.step_count,
+        "arrests": simulation.arrests,
+        "garbage": len(simulation.garbage_items),
+        "blackboard": len(simulation.blackboard),
+        "normal_agents": len(simulation.normal_agents),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the garbage simulation without a display")
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--height", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--event-log", default=None, help="write a binary event log to this path")
+    parser.add_argument("--heatmaps", default=None, help="save per-cell heatmaps to this .npz path")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve Prometheus-style metrics on this localhost port during the run")
+    parser.add_argument("--scenario", default=None, help="JSON scenario file, see scenario.load_scenario")
+    parser.add_argument("--two-phase", action="store_true", help="step in intent and resolve phases")
+    parser.add_argument("--scheduled-travel", action="store_true",
+                        help="schedule collector trips instead of stepping travelling collectors")
+    parser.add_argument("--hold-steps", type=int, default=None,
+                        help="release arrested agents after this many steps")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse the stored result of an identical seeded run")
+    args = parser.parse_args()
+    if args.two_phase and args.scheduled_travel:
+        parser.error("--scheduled-travel only applies to the agent-by-agent step, not --two-phase")
+
+    scenario = load_scenario(args.scenario) if args.scenario else None
+
+    if args.cache and not (args.event_log or args.heatmaps or args.metrics_port):
+        cache = ResultCache()
+        params = {"width": args.width, "height": args.height}
+        if scenario:
+            # Part of the cache key, so a changed scenario file is a new run
+            params["scenario"] = scenario
+        if args.two_phase:
+            params["two_phase"] = True
+        if args.scheduled_travel:
+            params["scheduled_travel"] = True
+        if args.hold_steps is not None:
+            params["hold_steps"] = args.hold_steps
+        metrics = cache.run(run, params, args.seed, args.steps)
+        cache.evict()
+    else:
+        metrics = run(args.steps, args.width, args.height, args.seed, args.event_log, args.heatmaps,
+                      args.metrics_port, scenario, args.two_phase, args.scheduled_travel, args.hold_steps)
+    print(" ".join(f"{name}={value}" for name, value in metrics.items()))
+
+
+if __name__ == "__main__":
+    main()
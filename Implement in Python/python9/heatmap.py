@@ -0,0 +1,68 @@
+import numpy as np
+
+from chunked import CHUNK_SIZE, ChunkedGrid
+from views import positions
+
+# Layers kept besides one visits layer per population
+EVENT_LAYERS = (
+    # Item-steps spent on each cell by garbage, added once per step
+    "dwell",
+    # Improper disposals, where normal agents got penalized
+    "disposals",
+    # Items taken by proper disposers or removed by collectors
+    "collections",
+    # Offenders arrested by police
+    "arrests",
+)
+
+
+class Heatmaps:
+    """Per-cell counters of where agents go and where things happen.
+
+    There is a "visits_<population>" layer per population, counting the
+    agents on each cell after every step, and the EVENT_LAYERS. The
+    simulation scatter-adds into them while it steps, one add per layer and
+    phase, so a heatmap of any run is available as it goes without
+    reading the log back. Layers are chunked grids over the columns
+    [x0, x0 + width), so large worlds only pay for the cells that are used.
+    """
+
+    def __init__(self, width, height, populations, x0=0, chunk_size=CHUNK_SIZE):
+        self.width = width
+        self.height = height
+        self.x0 = x0
+        self.layers = {name: ChunkedGrid(width, height, x0, chunk_size)
+                       for name in [f"visits_{p}" for p in populations] + list(EVENT_LAYERS)}
+
+    def __getitem__(self, name):
+        return self.layers[name]
+
+    def add(self, name, x, y, values=1):
+        """Scatter-add values to layer name at the cells (x, y)."""
+        if len(x):
+            self.layers[name].add(x, y, values)
+
+    def add_entities(self, name, entities):
+        """Count each of a list of agents or items on its cell."""
+        if entities:
+            self.layers[name].add(*positions(entities), 1)
+
+    def clear(self):
+        for grid in self.layers.values():
+            grid.clear()
+
+    def columns(self, x0, x1):
+        """Copy of the columns [x0, x1), for a world split into strips."""
+        part = Heatmaps.__new__(Heatmaps)
+        part.width = x1 - x0
+        part.height = self.height
+        part.x0 = x0
+        part.layers = {name: grid.columns(x0, x1) for name, grid in self.layers.items()}
+        return part
+
+    def to_arrays(self):
+        """Every layer as a dense (width, height) array."""
+        return {name: grid.to_dense() for name, grid in self.layers.items()}
+
+    def save(self, path):
+        np.savez_compressed(path, **self.to_arrays())
@@ -0,0 +1,53 @@
+from enum import IntEnum
+
+from eventlog import EventType, to_records
+
+
+class Hook(IntEnum):
+    # Before anything moves, and once the step is done, no events attached
+    STEP_BEGIN = 0
+    STEP_END = 1
+    # Events of one phase, as records with the event log's EVENT_DTYPE
+    IMPROPER_DISPOSAL = EventType.IMPROPER_DISPOSAL
+    GARBAGE_COLLECTION = EventType.GARBAGE_COLLECTION
+    GARBAGE_REMOVAL = EventType.GARBAGE_REMOVAL
+    ARREST = EventType.ARREST
+    CAMERA_DETECTION = EventType.CAMERA_DETECTION
+
+
+class Hooks:
+    """Observers of simulation events, called once per phase with all of its events.
+
+    An observer is called as observer(simulation, events), where events is
+    an array of records (step, type, agent, x, y) for the event hooks, empty
+    when nothing happened in the phase, and None for STEP_BEGIN and
+    STEP_END. Event hooks are emitted in phase order, each as its phase
+    ends. Only hooks with observers have an entry in self.observers, so
+    emitting to a hook nobody watches is one dict lookup and no records
+    are built.
+    """
+
+    def __init__(self):
+        self.observers = {}
+
+    def subscribe(self, hook, observer):
+        self.observers.setdefault(Hook(hook), []).append(observer)
+        return observer
+
+    def unsubscribe(self, hook, observer):
+        observers = self.observers.get(hook, [])
+        observers.remove(observer)
+        if not observers:
+            del self.observers[hook]
+
+    def __contains__(self, hook):
+        return hook in self.observers
+
+    def emit(self, hook, simulation, entities=None):
+        """Pass the entities of one phase to the observers of hook, as one batch."""
+        observers = self.observers.get(hook)
+        if not observers:
+            return
+        events = None if entities is None else to_records(simulation.step_count, hook, entities)
+        for observer in observers:
+            observer(simulation, events)
@@ -0,0 +1,230 @@
+import numpy as np
+
+from eventlog import EventType
+from hooks import Hook
+from vectorized import BLOCK_SIZE, rank_within_cell
+from views import positions
+
+# Random streams and lists of the walkers, in the order GarbageSimulation.step moves them
+MOVERS = [
+    ("normal", "normal_agents", "visits_normal"),
+    ("proper_disposer", "proper_disposers", "visits_disposer"),
+    ("police", "police_agents", "visits_police"),
+    ("garbage_collector", "garbage_collectors", "visits_collector"),
+]
+
+
+def unique_ids(entities):
+    return np.fromiter((entity.unique_id for entity in entities), dtype=np.int64, count=len(entities))
+
+
+class CellCounts:
+    """Number of entries per cell key, looked up for many keys at once."""
+
+    def __init__(self, keys):
+        self.cells, self.counts = np.unique(keys, return_counts=True)
+
+    def __call__(self, keys):
+        if not len(self.cells):
+            return np.zeros(len(keys), dtype=np.int64)
+        index = np.minimum(np.searchsorted(self.cells, keys), len(self.cells) - 1)
+        return np.where(self.cells[index] == keys, self.counts[index], 0)
+
+
+def propose_moves(simulation):
+    """Cells every walker intends to end its move on, and the normal agents' disposal rolls.
+
+    Random moves are drawn per population exactly as in the sequential step.
+    Collectors then head one cell towards the garbage item nearest to where
+    their random move took them, chosen among the items at the start of
+    the step. Returns the cells by stream name, the rolls and, for every
+    collector, the index of its target item (-1 for none).
+    """
+    width, height = simulation.width, simulation.height
+    cells = {}
+    rolls = None
+    for stream, list_name, _ in MOVERS:
+        agents = getattr(simulation, list_name)
+        xs, ys = positions(agents)
+        dx, dy = simulation.streams[stream].integers(-1, 2, size=(2, len(agents)))
+        if stream == "normal":
+            rolls = simulation.streams["normal"].random(len(agents))
+        cells[stream] = (np.clip(xs + dx, 0, width - 1), np.clip(ys + dy, 0, height - 1))
+
+    cx, cy = cells["garbage_collector"]
+    gx, gy = positions(simulation.garbage_items)
+    target = np.full(len(cx), -1, dtype=np.int64)
+    if len(gx):
+        for start in range(0, len(cx), BLOCK_SIZE):
+            dx = cx[start:start + BLOCK_SIZE, None] - gx
+            dy = cy[start:start + BLOCK_SIZE, None] - gy
+            # First of the closest items in list order, as GarbageCollector.find_target
+            target[start:start + BLOCK_SIZE] = (dx * dx + dy * dy).argmin(axis=1)
+        cells["garbage_collector"] = (cx + np.sign(gx[target] - cx), cy + np.sign(gy[target] - cy))
+    return cells, rolls, target
+
+
+def resolve_claims(keys, priority, ids, item_keys):
+    """Settle claims on garbage items, each item going to at most one claimant.
+
+    Claimants on a cell are served by priority, then by unique_id, one item
+    each while items last. Items on a cell are handed out in list order.
+    Returns the indices of the winning claimants and of the items they get,
+    pairwise.
+    """
+    if not len(keys) or not len(item_keys):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    order = np.lexsort((ids, priority))
+    rank = np.empty(len(keys), dtype=np.int64)
+    rank[order] = rank_within_cell(keys[order])
+    winners = np.flatnonzero(rank < CellCounts(item_keys)(keys))
+
+    item_rank = rank_within_cell(item_keys)
+    taken = np.flatnonzero(item_rank < CellCounts(keys[winners])(item_keys))
+    # The claimant of rank r on a cell gets the item of rank r on it
+    winners = winners[np.lexsort((rank[winners], keys[winners]))]
+    taken = taken[np.lexsort((item_rank[taken], item_keys[taken]))]
+    return winners, taken
+
+
+def step_two_phase(simulation):
+    """Advance a GarbageSimulation one step in intent and resolve phases.
+
+    Every agent first states what it intends to do against the same state:
+    walkers propose their moves, then, on the moved state, normal agents
+    their disposals, disposers and collectors claims on garbage items and
+    police the offenders sharing their cell. Intents only read the state,
+    so each group is computed for the whole population at once, and the
+    resolve phase then applies them in a fixed order: penalties, garbage
+    claims (disposers before collectors, lower unique_id first, so two
+    claimants of one item never both get it), arrests, camera detections.
+    Outcomes differ from the sequential step, where an agent already sees
+    what agents earlier in the loop did, but not the random draws.
+    """
+    simulation.step_count += 1
+    simulation._view = None
+    step = simulation.step_count
+    events = simulation.events
+    heatmaps = simulation.heatmaps
+    hooks = simulation.hooks
+    height = simulation.height
+    hooks.emit(Hook.STEP_BEGIN, simulation)
+    simulation.scheduler.run_until(step)
+
+    # Moves never conflict, a cell holds any number of agents
+    cells, rolls, target = propose_moves(simulation)
+    for stream, list_name, visits in MOVERS:
+        agents = getattr(simulation, list_name)
+        xs, ys = cells[stream]
+        for agent, x, y in zip(agents, xs.tolist(), ys.tolist()):
+            agent.x = x
+            agent.y = y
+        if events:
+            events.record_move(step, agents)
+        if heatmaps:
+            heatmaps.add_entities(visits, agents)
+
+    normals = simulation.normal_agents
+    disposers = simulation.proper_disposers
+    collectors = simulation.garbage_collectors
+    items = simulation.garbage_items
+    nx, ny = cells["normal"]
+    normal_keys = nx * height + ny
+    gx, gy = positions(items)
+    item_keys = gx * height + gy
+    items_at = CellCounts(item_keys)
+
+    # Disposal intents: every item on the cell is an independent 50% chance
+    ax, ay = positions(simulation.disposal_areas)
+    on_items = items_at(normal_keys)
+    penalized = np.flatnonzero((on_items > 0) & (rolls < 1 - 0.5 ** on_items)
+                               & ~np.isin(normal_keys, ax * height + ay))
+    penalized_agents = [normals[i] for i in penalized.tolist()]
+    for agent in penalized_agents:
+        agent.score -= 1
+    if penalized_agents:
+        simulation.log_message(f"Improper Disposal: {len(penalized_agents)} agents penalized")
+        if events:
+            events.record(step, EventType.IMPROPER_DISPOSAL, penalized_agents)
+    if heatmaps:
+        heatmaps.add_entities("disposals", penalized_agents)
+    hooks.emit(Hook.IMPROPER_DISPOSAL, simulation, penalized_agents)
+
+    # Claims on garbage: disposers on a cell with items, collectors reaching their target
+    px, py = cells["proper_disposer"]
+    disposer_keys = px * height + py
+    claiming = np.flatnonzero(items_at(disposer_keys) > 0)
+    cx, cy = cells["garbage_collector"]
+    reached = np.zeros(0, dtype=np.int64)
+    if len(items):
+        reached = np.flatnonzero((target >= 0) & (cx == gx[target]) & (cy == gy[target]))
+    keys = np.concatenate([disposer_keys[claiming], item_keys[target[reached]]])
+    priority = np.repeat([0, 1], [len(claiming), len(reached)])
+    ids = np.concatenate([unique_ids(disposers)[claiming], unique_ids(collectors)[reached]])
+    winners, taken = resolve_claims(keys, priority, ids, item_keys)
+
+    collections = []
+    removals = []
+    for winner, item in zip(winners.tolist(), taken.tolist()):
+        if winner < len(claiming):
+            disposers[claiming[winner]].score += 1
+            collections.append(items[item])
+        else:
+            removals.append(items[item])
+    if len(taken):
+        kept = np.ones(len(items), dtype=bool)
+        kept[taken] = False
+        items[:] = [item for item, keep in zip(items, kept.tolist()) if keep]
+    if collections:
+        simulation.log_message(f"Garbage Collection: disposers collected {len(collections)} items")
+        if events:
+            events.record(step, EventType.GARBAGE_COLLECTION, collections)
+    hooks.emit(Hook.GARBAGE_COLLECTION, simulation, collections)
+
+    # Arrests of offenders, after this step's penalties, sharing a cell with police
+    scores = np.fromiter((agent.score for agent in normals), dtype=np.int64, count=len(normals))
+    px, py = cells["police"]
+    arrested = (scores <= 0) & np.isin(normal_keys, px * height + py)
+    normals_before = list(normals)
+    arrested_agents = [normals[i] for i in np.flatnonzero(arrested).tolist()]
+    if arrested_agents:
+        normals[:] = [agent for agent, caught in zip(normals, arrested.tolist()) if not caught]
+        simulation.log_message(f"Arrest: police arrested {len(arrested_agents)} agents")
+        if events:
+            events.record(step, EventType.ARREST, arrested_agents)
+    if heatmaps:
+        heatmaps.add_entities("arrests", arrested_agents)
+    hooks.emit(Hook.ARREST, simulation, arrested_agents)
+    simulation.hold(arrested_agents)
+    simulation.arrests += len(penalized_agents) + len(arrested_agents)
+
+    if removals:
+        simulation.log_message(f"Garbage Removal: collectors removed {len(removals)} items")
+        if events:
+            events.record(step, EventType.GARBAGE_REMOVAL, removals)
+    if heatmaps:
+        heatmaps.add_entities("collections", collections + removals)
+    hooks.emit(Hook.GARBAGE_REMOVAL, simulation, removals)
+
+    # Cameras see the offenders left, in camera order like the sequential step
+    offenders = [normals_before[i] for i in np.flatnonzero((scores <= 0) & ~arrested).tolist()]
+    detections = []
+    if offenders and simulation.cameras:
+        ox, oy = positions(offenders)
+        kx, ky = positions(simulation.cameras)
+        limit = simulation.cameras[0].detection_range ** 2
+        seen = ((kx[:, None] - ox) ** 2 + (ky[:, None] - oy) ** 2) <= limit
+        detections = [offenders[i] for i in np.nonzero(seen)[1].tolist()]
+    if detections:
+        simulation.log_message(f"Camera Detection: {len(detections)} illegal disposal agents detected")
+        if events:
+            events.record(step, EventType.CAMERA_DETECTION, detections)
+    simulation.blackboard.extend(detections)
+    hooks.emit(Hook.CAMERA_DETECTION, simulation, detections)
+
+    if heatmaps:
+        heatmaps.add_entities("dwell", items)
+    if events:
+        events.flush()
+    hooks.emit(Hook.STEP_END, simulation)
+    return True
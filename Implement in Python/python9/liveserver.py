@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import base64
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import struct
+
+import numpy as np
+
+from eventlog import EventType
+from game import GarbageSimulation, SimulationState
+
+WEBSOCKET_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+CLIENT_PAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "garbage_simulation.html")
+
+# Messages sent to clients: a keyframe replaces the client's whole world,
+# a delta updates it. Both start with the same little-endian header.
+KEYFRAME = 1
+DELTA = 2
+HEADER = struct.Struct("<BIIIIBHHIII")
+ADDED_DTYPE = np.dtype([("id", "<i4"), ("kind", "u1"), ("x", "<u2"), ("y", "<u2")])
+MOVED_DTYPE = np.dtype([("id", "<i4"), ("x", "<u2"), ("y", "<u2")])
+
+# Deltas sent to a client before it gets a fresh keyframe
+KEYFRAME_INTERVAL = 100
+
+COMMANDS = ("setup", "start", "stop", "step", "speed")
+
+logger = logging.getLogger("liveserver")
+
+# Entity kinds use the event log's ADD_* codes
+ENTITY_LISTS = [
+    (EventType.ADD_DISPOSAL_AREA, "disposal_areas"),
+    (EventType.ADD_GARBAGE, "garbage_items"),
+    (EventType.ADD_NORMAL_AGENT, "normal_agents"),
+    (EventType.ADD_PROPER_DISPOSER, "proper_disposers"),
+    (EventType.ADD_POLICE_AGENT, "police_agents"),
+    (EventType.ADD_GARBAGE_COLLECTOR, "garbage_collectors"),
+    (EventType.ADD_CAMERA, "cameras"),
+]
+
+
+class Frame:
+    """Entities of one simulation state as arrays sorted by unique_id."""
+
+    def __init__(self, simulation, version):
+        self.version = version
+        ids, kinds, xs, ys = [], [], [], []
+        for kind, name in ENTITY_LISTS:
+            entities = getattr(simulation, name)
+            ids.extend(entity.unique_id for entity in entities)
+            kinds.extend([kind] * len(entities))
+            xs.extend(entity.x for entity in entities)
+            ys.extend(entity.y for entity in entities)
+        order = np.argsort(np.asarray(ids, dtype=np.int64), kind="stable")
+        self.ids = np.asarray(ids, dtype=np.int32)[order]
+        self.kind = np.asarray(kinds, dtype=np.uint8)[order]
+        self.x = np.asarray(xs, dtype=np.uint16)[order]
+        self.y = np.asarray(ys, dtype=np.uint16)[order]
+
+        self.header = (simulation.step_count, simulation.arrests, len(simulation.garbage_items),
+                       len(simulation.blackboard), simulation.state.value,
+                       simulation.width, simulation.height)
+
+    def encode_keyframe(self):
+        added = np.empty(len(self.ids), dtype=ADDED_DTYPE)
+        added["id"], added["kind"], added["x"], added["y"] = self.ids, self.kind, self.x, self.y
+        return HEADER.pack(KEYFRAME, *self.header, len(added), 0, 0) + added.tobytes()
+
+    def encode_delta(self, base):
+        """Changes from the frame base to this one, or None if a keyframe is smaller."""
+        known = np.isin(self.ids, base.ids, assume_unique=True)
+        removed = base.ids[~np.isin(base.ids, self.ids, assume_unique=True)]
+
+        common = np.flatnonzero(known)
+        before = np.searchsorted(base.ids, self.ids[common])
+        moved = common[(base.x[before] != self.x[common]) | (base.y[before] != self.y[common])]
+        new = np.flatnonzero(~known)
+        if len(new) * ADDED_DTYPE.itemsize + len(moved) * MOVED_DTYPE.itemsize + len(removed) * 4 \
+                >= len(self.ids) * ADDED_DTYPE.itemsize:
+            return None
+
+        added = np.empty(len(new), dtype=ADDED_DTYPE)
+        added["id"], added["kind"], added["x"], added["y"] = (
+            self.ids[new], self.kind[new], self.x[new], self.y[new])
+        moves = np.empty(len(moved), dtype=MOVED_DTYPE)
+        moves["id"], moves["x"], moves["y"] = self.ids[moved], self.x[moved], self.y[moved]
+        return (HEADER.pack(DELTA, *self.header, len(added), len(moves), len(removed))
+                + added.tobytes() + moves.tobytes() + removed.astype("<i4").tobytes())
+
+
+class WebSocket:
+    """Server side of one RFC 6455 connection."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def send(self, payload, opcode=0x2):
+        length = len(payload)
+        if length < 126:
+            header = struct.pack("!BB", 0x80 | opcode, length)
+        elif length < 1 << 16:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+        self.writer.write(header + payload)
+        # Waiting for the socket to drain paces the stream to the client
+        await self.writer.drain()
+
+    async def receive(self):
+        """Next text or binary message, None once the client has closed."""
+        message = b""
+        while True:
+            first, second = await self.reader.readexactly(2)
+            opcode = first & 0x0F
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack("!H", await self.reader.readexactly(2))
+            elif length == 127:
+                length, = struct.unpack("!Q", await self.reader.readexactly(8))
+            mask = await self.reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+            data = bytes(b ^ mask[i % 4] for i, b in enumerate(await self.reader.readexactly(length)))
+
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                await self.send(data, opcode=0xA)
+                continue
+            if opcode == 0xA:
+                continue
+            message += data
+            if first & 0x80:
+                return message
+
+
+class LiveServer:
+    """Serves the browser client and streams the simulation to it over WebSockets.
+
+    Every client gets a keyframe when it connects and then deltas against the
+    last frame it received. A client that is slow to read simply receives
+    fewer, larger deltas, since each one covers all steps since its last frame.
+    """
+
+    def __init__(self, simulation, steps_per_second=10):
+        self.simulation = simulation
+        self.steps_per_second = steps_per_second
+        self.version = 0
+        self.updated = asyncio.Condition()
+        self._frame = None
+
+    def frame(self):
+        """Frame of the current state, built at most once per version."""
+        if self._frame is None or self._frame.version != self.version:
+            self._frame = Frame(self.simulation, self.version)
+        return self._frame
+
+    async def publish(self):
+        async with self.updated:
+            self.version += 1
+            self.updated.notify_all()
+
+    async def run_simulation(self):
+        while True:
+            if self.simulation.state == SimulationState.RUNNING and self.simulation.step():
+                await self.publish()
+            await asyncio.sleep(1 / self.steps_per_second)
+
+    async def handle_command(self, message):
+        """Apply one command sent by a client, logging and ignoring malformed ones."""
+        try:
+            command = json.loads(message)
+            name = command["command"]
+            if name not in COMMANDS:
+                raise ValueError(f"unknown command {name!r}")
+            if name == "speed":
+                speed = int(command["value"])
+        except (ValueError, TypeError, KeyError, OverflowError) as error:
+            logger.warning("Ignoring client message %r: %s", message[:200], error)
+            return False
+
+        simulation = self.simulation
+        if name == "setup":
+            simulation.state = SimulationState.SETUP
+            simulation.create_agents()
+            simulation.arrests = 0
+        elif name == "start":
+            if simulation.state in (SimulationState.SETUP, SimulationState.STOPPED):
+                simulation.state = SimulationState.RUNNING
+        elif name == "stop":
+            simulation.state = SimulationState.STOPPED
+        elif name == "step":
+            if simulation.state in (SimulationState.RUNNING, SimulationState.STOPPED):
+                simulation.step()
+        elif name == "speed":
+            self.steps_per_second = max(1, speed)
+        await self.publish()
+        return True
+
+    async def stream(self, socket):
+        base = None
+        sent = 0
+        while True:
+            frame = self.frame()
+            message = None
+            if base is not None and sent % KEYFRAME_INTERVAL:
+                message = frame.encode_delta(base)
+            if message is None:
+                message = frame.encode_keyframe()
+            await socket.send(message)
+            base = frame
+            sent += 1
+            async with self.updated:
+                await self.updated.wait_for(lambda: self.version != base.version)
+
+    async def listen(self, socket):
+        while True:
+            message = await socket.receive()
+            if message is None:
+                return
+            await self.handle_command(message)
+
+    async def handle_connection(self, reader, writer):
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+            lines = request.decode("latin-1").split("\r\n")
+            path = lines[0].split(" ")[1]
+            headers = {}
+            for line in lines[1:]:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+
+            if headers.get("upgrade", "").lower() != "websocket":
+                await self.serve_page(writer, path)
+                return
+
+            accept = base64.b64encode(hashlib.sha1(headers["sec-websocket-key"].encode()
+                                                   + WEBSOCKET_GUID).digest())
+            writer.write(b"HTTP/1.1 101 Switching Protocols\r\n"
+                         b"Upgrade: websocket\r\nConnection: Upgrade\r\n"
+                         b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+            await writer.drain()
+
+            socket = WebSocket(reader, writer)
+            streaming = asyncio.ensure_future(self.stream(socket))
+            try:
+                await self.listen(socket)
+            finally:
+                streaming.cancel()
+                # Collect the stream's outcome, a send to a closed socket included
+                with contextlib.suppress(asyncio.CancelledError, ConnectionError):
+                    await streaming
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve_page(self, writer, path):
+        if path in ("/", "/index.html"):
+            with open(CLIENT_PAGE, "rb") as page:
+                body = page.read()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/html; charset=utf-8\r\n"
+                         b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body)
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n")
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8765):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Open http://{host}:{port}/ in a browser")
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.run_simulation())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream the garbage simulation to a browser")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--height", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    simulation = GarbageSimulation(width=args.width, height=args.height, seed=args.seed)
+    simulation.create_agents()
+    asyncio.run(LiveServer(simulation).serve(args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,150 @@
-from mesa import *
+from mesa import Agent, Model
 from mesa.space import MultiGrid
 from mesa.time import RandomActivation
-import pygame
 import random
 import numpy as np
 
+# Moore neighborhood offsets, in the order of the neighbor table's columns
+NEIGHBOR_OFFSETS = np.array([(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)])
+# Random neighbor choices drawn at a time
+MOVE_BATCH = 4096
+# Side of the garbage index buckets, in cells
+BUCKET_SIZE = 8
+# Nearest items each collector is matched against, the assignment is exact
+# as long as there are no more collectors than this
+MAX_CANDIDATES = 16
+
+def min_cost_assignment(cost):
+    """Column of each row minimizing the total cost, with no column used twice.
+
+    Hungarian method with potentials, O(rows^2 * columns), cost must have
+    at most as many rows as columns.
+    """
+    rows, columns = cost.shape
+    a = np.zeros((rows + 1, columns + 1))
+    a[1:, 1:] = cost
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    # Row matched to each column (0 for none) and the previous column on the augmenting path
+    match = np.zeros(columns + 1, dtype=np.int64)
+    way = np.zeros(columns + 1, dtype=np.int64)
+    for row in range(1, rows + 1):
+        match[0] = row
+        j0 = 0
+        minv = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            reduced = a[match[j0]] - u[match[j0]] - v
+            better = ~used & (reduced < minv)
+            minv[better] = reduced[better]
+            way[better] = j0
+            candidates = np.where(used, np.inf, minv)
+            j1 = int(candidates.argmin())
+            delta = candidates[j1]
+            u[match[used]] += delta
+            v[used] -= delta
+            minv[~used] -= delta
+            j0 = j1
+            if match[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            match[j0] = match[j1]
+            j0 = j1
+
+    assignment = np.empty(rows, dtype=np.int64)
+    matched = np.flatnonzero(match[1:])
+    assignment[match[matched + 1] - 1] = matched
+    return assignment
+
+class GarbageIndex:
+    """Garbage items bucketed by cell, for nearest-item queries.
+
+    Distances are Chebyshev, the number of steps a collector needs since it
+    moves diagonally, measured without wrapping because collectors don't
+    wrap around the torus either.
+    """
+
+    def __init__(self, items, width, height, bucket_size=BUCKET_SIZE):
+        self.items = items
+        self.bucket_size = bucket_size
+        self.buckets_x = -(-width // bucket_size)
+        self.buckets_y = -(-height // bucket_size)
+        cells = np.array([item.pos for item in items], dtype=np.int64).reshape(-1, 2)
+        self.x = cells[:, 0]
+        self.y = cells[:, 1]
+        keys = (self.x // bucket_size) * self.buckets_y + self.y // bucket_size
+        self.order = np.argsort(keys, kind="stable")
+        self.starts = np.searchsorted(keys[self.order], np.arange(self.buckets_x * self.buckets_y + 1))
+
+    def in_bucket(self, bx, by):
+        key = bx * self.buckets_y + by
+        return self.order[self.starts[key]:self.starts[key + 1]]
+
+    def nearest(self, pos, k):
+        """Indices of the k items closest to pos and their distances, closest first."""
+        x, y = pos
+        bx, by = x // self.bucket_size, y // self.bucket_size
+        found = []
+        radius = 0
+        while True:
+            # Buckets on the square ring at this radius around the one holding pos
+            for cx in range(max(0, bx - radius), min(self.buckets_x, bx + radius + 1)):
+                for cy in range(max(0, by - radius), min(self.buckets_y, by + radius + 1)):
+                    if max(abs(cx - bx), abs(cy - by)) == radius:
+                        found.append(self.in_bucket(cx, cy))
+            indices = np.concatenate(found)
+            distances = np.maximum(np.abs(self.x[indices] - x), np.abs(self.y[indices] - y))
+            # Items in buckets further out are more than radius buckets away
+            if len(indices) >= k:
+                closest = np.argsort(distances, kind="stable")[:k]
+                if distances[closest[-1]] <= radius * self.bucket_size:
+                    return indices[closest], distances[closest]
+            if radius >= max(self.buckets_x, self.buckets_y):
+                closest = np.argsort(distances, kind="stable")[:k]
+                return indices[closest], distances[closest]
+            radius += 1
 
 class Municipality(Agent):
     def __init__(self, unique_id, model):
         super().__init__(unique_id, model)
         self.color = (255, 165, 0)  # Orange
 
+    def assign_collectors(self):
+        """Give every collector a garbage item, minimizing the total distance with no item
+        assigned twice. Collectors left over once every item is taken get no target."""
+        collectors = self.model.collectors
+        items = list(self.model.garbage.values())
+        for collector in collectors:
+            collector.target = None
+        if not collectors or not items:
+            return
+
+        # Match each collector against its nearest items only, widening the
+        # lists until there are enough distinct items to go round, or all of them
+        index = GarbageIndex(items, self.model.width, self.model.height)
+        k = min(len(items), len(collectors), MAX_CANDIDATES)
+        while True:
+            nearest = [index.nearest(collector.pos, k) for collector in collectors]
+            candidates, column = np.unique(np.concatenate([indices for indices, _ in nearest]),
+                                           return_inverse=True)
+            if len(candidates) >= min(len(items), len(collectors)) or k == len(items):
+                break
+            k = min(len(items), 2 * k)
+        cost = np.full((len(collectors), len(candidates)), np.inf)
+        rows = np.repeat(np.arange(len(collectors)), k)
+        cost[rows, column] = np.concatenate([distances for _, distances in nearest])
+        # Pairs outside the nearest lists only get used when nothing else is left
+        cost[np.isinf(cost)] = 2 * (self.model.width + self.model.height)
+
+        if len(collectors) <= len(candidates):
+            for collector, item in zip(collectors, min_cost_assignment(cost)):
+                collector.target = items[candidates[item]]
+        else:
+            for item, collector in enumerate(min_cost_assignment(cost.T)):
+                collectors[collector].target = items[candidates[item]]
+
 class NormalAgent(Agent):
     def __init__(self, unique_id, model):
         super().__init__(unique_id, model)
@@ -18,6 +152,10 @@ class NormalAgent(Agent):
         self.color = (165, 42, 42)  # Brown
 
     def step(self):
+        # Agents arrested earlier in this step stay in the schedule until it ends
+        if self.model.is_removed(self):
+            return
+
         # Random movement
         self.move()
         
@@ -27,23 +165,19 @@ class NormalAgent(Agent):
                 self.improper_disposal()
 
     def move(self):
-        possible_steps = self.model.grid.get_neighborhood(
-            self.pos, moore=True, include_center=False
-        )
-        new_position = random.choice(possible_steps)
-        self.model.grid.move_agent(self, new_position)
+        self.model.grid.move_agent(self, self.model.random_neighbor(self.pos))
 
     def check_garbage_disposal(self):
         cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        return any(isinstance(agent, GarbageItem) for agent in cell_contents)
+        return any(isinstance(agent, GarbageItem) and not self.model.is_removed(agent)
+                   for agent in cell_contents)
 
     def improper_disposal(self):
         # Check if in proper disposal area
         if not self.is_proper_disposal_area():
             self.score -= 1
             if self.score <= 0:
-                self.model.schedule.remove(self)
-                self.model.grid.remove_agent(self)
+                self.model.remove(self)
                 self.model.arrests += 1
 
     def is_proper_disposal_area(self):
@@ -62,20 +196,16 @@ class ProperDisposer(Agent):
         
         # Check and dispose of garbage
         cell_contents = self.model.grid.get_cell_list_contents([self.pos])
-        garbage_items = [item for item in cell_contents if isinstance(item, GarbageItem)]
+        garbage_items = [item for item in cell_contents
+                         if isinstance(item, GarbageItem) and not self.model.is_removed(item)]
         
         if garbage_items:
             for item in garbage_items:
-                self.model.grid.remove_agent(item)
-                self.model.schedule.remove(item)
+                self.model.remove(item)
                 self.score += 1
 
     def move(self):
-        possible_steps = self.model.grid.get_neighborhood(
-            self.pos, moore=True, include_center=False
-        )
-        new_position = random.choice(possible_steps)
-        self.model.grid.move_agent(self, new_position)
+        self.model.grid.move_agent(self, self.model.random_neighbor(self.pos))
 
 class GarbageCollector(Agent):
     def __init__(self, unique_id, model):
@@ -84,12 +214,10 @@ class GarbageCollector(Agent):
         self.color = (0, 255, 0)  # Green
 
     def step(self):
-        # Find a target if no current target
-        if not self.target:
-            garbage_items = [agent for agent in self.model.schedule.agents 
-                             if isinstance(agent, GarbageItem)]
-            if garbage_items:
-                self.target = random.choice(garbage_items)
+        # Targets are assigned by the municipality at the start of the step,
+        # drop one that a disposer has collected since
+        if self.target and self.model.is_removed(self.target):
+            self.target = None
 
         # Move towards target
         if self.target:
@@ -105,8 +233,7 @@ class GarbageCollector(Agent):
 
             # Check if reached target
             if self.pos == self.target.pos:
-                self.model.grid.remove_agent(self.target)
-                self.model.schedule.remove(self.target)
+                self.model.remove(self.target)
                 self.target = None
 
 class PoliceAgent(Agent):
@@ -116,23 +243,19 @@ class PoliceAgent(Agent):
 
     def step(self):
         # Random movement
-        possible_steps = self.model.grid.get_neighborhood(
-            self.pos, moore=True, include_center=False
-        )
-        new_position = random.choice(possible_steps)
-        self.model.grid.move_agent(self, new_position)
+        self.model.grid.move_agent(self, self.model.random_neighbor(self.pos))
 
         # Check for agents with low score
         cell_contents = self.model.grid.get_cell_list_contents([self.pos])
         low_score_agents = [
             agent for agent in cell_contents 
             if isinstance(agent, NormalAgent) and agent.score <= 0
+            and not self.model.is_removed(agent)
         ]
 
         # Arrest low score agents
         for agent in low_score_agents:
-            self.model.grid.remove_agent(agent)
-            self.model.schedule.remove(agent)
+            self.model.remove(agent)
             self.model.arrests += 1
 
 class Camera(Agent):
@@ -149,6 +272,7 @@ class Camera(Agent):
         illegal_agents = [
             agent for agent in nearby_agents 
             if isinstance(agent, NormalAgent) and agent.score <= 0
+            and not self.model.is_removed(agent)
         ]
         
         if illegal_agents:
@@ -172,12 +296,30 @@ class WasteManagementModel(Model):
         # Initialize the current ID tracker
         self.current_id = 0
 
+        # Agents removed during a step, by unique_id, applied together at its end
+        self.pending_removals = {}
+
+        # Collectors, and garbage items still in the world by unique_id, for the municipality
+        self.collectors = []
+        self.garbage = {}
+
+        # Neighbors of every cell on the torus, row x * height + y holds the
+        # flat indices of its 8 Moore neighbors
+        x, y = np.divmod(np.arange(width * height), height)
+        self.neighbor_table = (((x[:, None] + NEIGHBOR_OFFSETS[:, 0]) % width) * height
+                               + (y[:, None] + NEIGHBOR_OFFSETS[:, 1]) % height)
+        # Seeded from random so random.seed still makes runs reproducible
+        self.move_rng = np.random.default_rng(random.getrandbits(64))
+        self.move_choices = []
+        self.move_index = 0
+
         # Create Municipality
         municipality = Municipality(self.next_id(), self)
         self.schedule.add(municipality)
         x = random.randint(0, width-1)
         y = random.randint(0, height-1)
         self.grid.place_agent(municipality, (x, y))
+        self.municipality = municipality
 
         # Create agents
         for _ in range(50):
@@ -197,6 +339,7 @@ class WasteManagementModel(Model):
         for _ in range(5):
             agent = GarbageCollector(self.next_id(), self)
             self.schedule.add(agent)
+            self.collectors.append(agent)
             x = random.randint(0, width-1)
             y = random.randint(0, height-1)
             self.grid.place_agent(agent, (x, y))
@@ -218,13 +361,48 @@ class WasteManagementModel(Model):
         for _ in range(20):
             agent = GarbageItem(self.next_id(), self)
             self.schedule.add(agent)
+            self.garbage[agent.unique_id] = agent
             x = random.randint(0, width-1)
             y = random.randint(0, height-1)
             self.grid.place_agent(agent, (x, y))
 
+    def step(self):
+        self.municipality.assign_collectors()
+        self.schedule.step()
+        self.apply_removals()
+
+    def random_neighbor(self, pos):
+        """A uniformly chosen Moore neighbor of pos on the torus."""
+        if self.move_index == len(self.move_choices):
+            self.move_choices = self.move_rng.integers(0, 8, size=MOVE_BATCH).tolist()
+            self.move_index = 0
+        choice = self.move_choices[self.move_index]
+        self.move_index += 1
+        x, y = pos
+        return divmod(self.neighbor_table.item(x * self.height + y, choice), self.height)
+
+    def remove(self, agent):
+        """Queue agent for removal at the end of the current step."""
+        self.pending_removals[agent.unique_id] = agent
+
+    def is_removed(self, agent):
+        """True for agents queued for removal or already gone from the grid."""
+        return agent.pos is None or agent.unique_id in self.pending_removals
+
+    def apply_removals(self):
+        for agent in self.pending_removals.values():
+            self.grid.remove_agent(agent)
+            self.schedule.remove(agent)
+            self.garbage.pop(agent.unique_id, None)
+        self.pending_removals.clear()
+
 # Pygame Visualization
 class WasteManagementVisualization:
     def __init__(self, model, width=800, height=800):
+        import pygame
+
+        from viewport import Viewport
+
         self.model = model
         pygame.init()
         self.width = width
@@ -232,39 +410,43 @@ class WasteManagementVisualization:
         self.screen = pygame.display.set_mode((width, height))
         pygame.display.set_caption("Waste Management Simulation")
         self.clock = pygame.time.Clock()
-        self.cell_width = width / model.width
-        self.cell_height = height / model.height
+        self.viewport = Viewport(model.width, model.height, width, height,
+                                 cell_size=min(width / model.width, height / model.height))
 
     def draw(self):
-        self.screen.fill((200, 200, 200))  # Light gray background
+        import pygame
 
-        # Draw grid lines
-        for x in range(0, self.width, int(self.cell_width)):
-            pygame.draw.line(self.screen, (100, 100, 100), (x, 0), (x, self.height))
-        for y in range(0, self.height, int(self.cell_height)):
-            pygame.draw.line(self.screen, (100, 100, 100), (0, y), (self.width, y))
+        self.screen.fill((200, 200, 200))  # Light gray background
 
-        # Draw agents
+        # Draw grid lines over the visible cells, skipped once cells are too small to see
+        if not self.viewport.aggregated:
+            x0, x1, y0, y1 = self.viewport.visible_cells()
+            for x in range(x0, x1 + 1):
+                screen_x, _ = self.viewport.to_screen(x, 0)
+                pygame.draw.line(self.screen, (100, 100, 100), (screen_x, 0), (screen_x, self.height))
+            for y in range(y0, y1 + 1):
+                _, screen_y = self.viewport.to_screen(0, y)
+                pygame.draw.line(self.screen, (100, 100, 100), (0, screen_y), (self.width, screen_y))
+
+        # Draw agents, grouped by color so each group is culled in one pass
+        cells_by_color = {}
         for agent in self.model.schedule.agents:
-            x, y = agent.pos
-            screen_x = int(x * self.cell_width + self.cell_width / 2)
-            screen_y = int(y * self.cell_height + self.cell_height / 2)
-            
-            pygame.draw.circle(
-                self.screen, 
-                agent.color, 
-                (screen_x, screen_y), 
-                int(min(self.cell_width, self.cell_height) / 3)
-            )
+            cells_by_color.setdefault(agent.color, []).append(agent.pos)
+        for color, cells in cells_by_color.items():
+            xs, ys = np.array(cells, dtype=np.int64).T
+            self.viewport.draw_cells(self.screen, xs, ys, color, shape="circle")
 
         pygame.display.flip()
 
     def run(self):
+        import pygame
+
         running = True
         while running:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     running = False
+                self.viewport.handle_event(event)
 
             # Run one step of the model
             self.model.step()
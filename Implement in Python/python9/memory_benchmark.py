@@ -0,0 +1,50 @@
+import argparse
+import gc
+import sys
+import tracemalloc
+
+import numpy as np
+
+from game import (Camera, DisposalArea, GarbageCollector, GarbageItem, NormalAgent,
+                  PoliceAgent, ProperDisposer)
+
+ENTITY_TYPES = [NormalAgent, ProperDisposer, PoliceAgent, GarbageCollector, Camera,
+                GarbageItem, DisposalArea]
+
+
+def bytes_per_entity(entity_type, count, width=1000, height=1000, seed=0):
+    """Traced bytes per entity for count entities held in a list, as the simulation holds them."""
+    rng = np.random.default_rng(seed)
+    # Positions come out of the streams as Python ints, like in create_agents
+    xs = rng.integers(0, width, size=count).tolist()
+    ys = rng.integers(0, height, size=count).tolist()
+
+    gc.collect()
+    tracemalloc.start()
+    entities = []
+    for unique_id, (x, y) in enumerate(zip(xs, ys)):
+        entity = entity_type(x, y)
+        entity.unique_id = unique_id
+        entities.append(entity)
+    # x and y ints were allocated before tracing, count them as part of the entity
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ints = sum(sys.getsizeof(value) for value in (xs[0], ys[0]))
+    return current / count + ints, sys.getsizeof(entities[0])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per entity of the object engine")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'type':<18}{'count':>10}{'instance':>10}{'bytes/entity':>14}")
+    for count in args.counts:
+        for entity_type in ENTITY_TYPES:
+            per_entity, instance = bytes_per_entity(entity_type, count)
+            print(f"{entity_type.__name__:<18}{count:>10}{instance:>10}{per_entity:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from hooks import Hook
+
+# Phase ending with each event hook, in the order GarbageSimulation.step runs them
+PHASES = [
+    (Hook.IMPROPER_DISPOSAL, "normal"),
+    (Hook.GARBAGE_COLLECTION, "disposer"),
+    (Hook.ARREST, "police"),
+    (Hook.GARBAGE_REMOVAL, "collector"),
+    (Hook.CAMERA_DETECTION, "camera"),
+]
+
+# The same hooks in the two-phase step, where every walker has moved and the
+# disposals are resolved by the time the first of them fires
+TWO_PHASE_PHASES = [
+    (Hook.IMPROPER_DISPOSAL, "moves"),
+    (Hook.GARBAGE_COLLECTION, "claims"),
+    (Hook.ARREST, "arrests"),
+    (Hook.GARBAGE_REMOVAL, "removals"),
+    (Hook.CAMERA_DETECTION, "camera"),
+]
+
+# Weight of the newest step in the smoothed step rate
+RATE_SMOOTHING = 0.1
+
+
+def resident_memory():
+    """Current and peak resident set size of this process, in bytes (0 where unknown)."""
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        return 0, 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No procfs (e.g. macOS, where ru_maxrss is already in bytes)
+        peak //= 1024
+        current = peak
+    return current, peak
+
+
+class SimulationMetrics:
+    """Counters and gauges of a GarbageSimulation, updated through its hooks.
+
+    Everything is measured on the simulation thread by the observers and
+    published at the end of each step as a new snapshot dict, which
+    replaces the previous one in a single assignment. Readers on other
+    threads only ever see a complete snapshot and never take a lock the
+    simulation waits on. Phases are those of the step the simulation runs,
+    PHASES or, for two_phase, TWO_PHASE_PHASES.
+    """
+
+    def __init__(self, simulation):
+        self.simulation = simulation
+        self.snapshot = {}
+        self.steps = 0
+        self.phases = TWO_PHASE_PHASES if simulation.two_phase else PHASES
+        self.phase_seconds = {name: 0.0 for _, name in self.phases}
+        self.step_seconds = 0.0
+        self.step_rate = 0.0
+        # Counted here, simulation.arrests goes back to 0 on setup
+        self.arrests_total = 0
+        self._last_arrests = simulation.arrests
+        self._phase_start = None
+        self._step_start = None
+        self._last_end = None
+
+        simulation.hooks.subscribe(Hook.STEP_BEGIN, self.step_begin)
+        for hook, name in self.phases:
+            simulation.hooks.subscribe(hook, self._phase_observer(name))
+        simulation.hooks.subscribe(Hook.STEP_END, self.step_end)
+
+    def step_begin(self, simulation, events):
+        # Arrests only grow during a step, a drop means a setup since the last one
+        self._last_arrests = min(self._last_arrests, simulation.arrests)
+        self._step_start = self._phase_start = time.perf_counter()
+
+    def _phase_observer(self, name):
+        def phase_end(simulation, events):
+            now = time.perf_counter()
+            self.phase_seconds[name] += now - self._phase_start
+            self._phase_start = now
+        return phase_end
+
+    def step_end(self, simulation, events):
+        now = time.perf_counter()
+        self.steps += 1
+        self.step_seconds = now - self._step_start
+        if self._last_end is not None:
+            # Wall time between steps, so pauses and UI time lower the rate too
+            rate = 1 / max(now - self._last_end, 1e-9)
+            self.step_rate = (rate if not self.step_rate
+                              else RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.step_rate)
+        self._last_end = now
+        self.arrests_total += simulation.arrests - self._last_arrests
+        self._last_arrests = simulation.arrests
+
+        self.snapshot = {
+            "steps": self.steps,
+            "step": simulation.step_count,
+            "step_rate": self.step_rate,
+            "step_seconds": self.step_seconds,
+            "phase_seconds": dict(self.phase_seconds),
+            "arrests": self.arrests_total,
+            "garbage": len(simulation.garbage_items),
+            "blackboard": len(simulation.blackboard),
+            "normal_agents": len(simulation.normal_agents),
+        }
+
+    def render(self):
+        """Latest snapshot, and the memory read now, in the Prometheus text format."""
+        snapshot = self.snapshot
+        current, peak = resident_memory()
+        lines = []
+        described = set()
+
+        def metric(name, kind, help_text, value, labels=None):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+            label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+            lines.append(f"{name}{label_text} {value}")
+
+        if snapshot:
+            metric("simulation_steps_total", "counter", "Steps run since metrics were attached.",
+                   snapshot["steps"])
+            metric("simulation_step", "gauge", "Current step of the simulation.", snapshot["step"])
+            metric("simulation_step_rate", "gauge", "Smoothed steps per second of wall time.",
+                   f"{snapshot['step_rate']:.6g}")
+            metric("simulation_step_seconds", "gauge", "Duration of the last step.",
+                   f"{snapshot['step_seconds']:.6g}")
+            for phase, seconds in snapshot["phase_seconds"].items():
+                metric("simulation_phase_seconds_total", "counter", "Time spent in each phase of the step.",
+                       f"{seconds:.6g}", {"phase": phase})
+            metric("simulation_arrests_total", "counter", "Arrests and penalties since metrics were attached.",
+                   snapshot["arrests"])
+            metric("simulation_garbage_items", "gauge", "Garbage items in the world.", snapshot["garbage"])
+            metric("simulation_blackboard_size", "gauge", "Camera detections on the blackboard.",
+                   snapshot["blackboard"])
+            metric("simulation_normal_agents", "gauge", "Normal agents not yet arrested.",
+                   snapshot["normal_agents"])
+        metric("process_resident_memory_bytes", "gauge", "Resident memory of the process.", current)
+        metric("process_peak_resident_memory_bytes", "gauge", "Peak resident memory of the process.", peak)
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves SimulationMetrics at http://host:port/metrics from a daemon thread.
+
+    Binds to localhost by default. Requests are answered from the latest
+    snapshot, so a scrape costs the simulation thread nothing.
+    """
+
+    def __init__(self, metrics, host="127.0.0.1", port=9108):
+        self.metrics = metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Keep scrapes out of stderr
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics", daemon=True)
+
+    @property
+    def address(self):
+        return self.server.server_address
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve_metrics(simulation, host="127.0.0.1", port=9108):
+    """Attach metrics to simulation and serve them in the background, returns the server."""
+    return MetricsServer(SimulationMetrics(simulation), host, port).start()
@@ -0,0 +1,123 @@
+import argparse
+import math
+import multiprocessing
+
+import numpy as np
+
+from rng import RandomStreams
+from vectorized import build_world
+
+# Inclusive ranges candidates are drawn from
+SEARCH_SPACE = {
+    "police": (0, 30),
+    "camera": (0, 40),
+    "detection_range": (1, 10),
+    "collector": (1, 20),
+}
+
+# Loss per unit of each outcome, negative for outcomes we want more of.
+# Penalties only happen when normals step on garbage left lying around,
+# so they count against an allocation rather than for it
+WEIGHTS = {
+    "garbage": 1.0,
+    "police_arrests": -1.0,
+    "penalties": 0.1,
+    "blackboard": -0.05,
+}
+
+# Loss per agent deployed, cameras also pay per cell of detection range
+COSTS = {
+    "police": 1.0,
+    "camera": 0.5,
+    "collector": 1.0,
+    "detection_range": 0.05,
+}
+
+
+def cost(candidate):
+    return (COSTS["police"] * candidate["police"]
+            + COSTS["collector"] * candidate["collector"]
+            + candidate["camera"] * (COSTS["camera"] + COSTS["detection_range"] * candidate["detection_range"]))
+
+
+def evaluate(task):
+    """Loss of one headless run of a candidate allocation, task is (candidate, seed, settings)."""
+    candidate, seed, settings = task
+    counts = dict(settings.get("counts", {}), police=candidate["police"],
+                  camera=candidate["camera"], collector=candidate["collector"])
+    world = build_world(settings["width"], settings["height"], counts, RandomStreams(seed),
+                        candidate["detection_range"])
+    for _ in range(settings["steps"]):
+        world.step()
+    outcomes = {"garbage": world.garbage_count, "police_arrests": world.police_arrests,
+                "penalties": world.penalties, "blackboard": world.blackboard_size}
+    return sum(WEIGHTS[name] * value for name, value in outcomes.items()) + cost(candidate)
+
+
+def sample_candidates(count, seed=0, space=SEARCH_SPACE):
+    rng = np.random.default_rng(seed)
+    return [{name: int(rng.integers(low, high + 1)) for name, (low, high) in space.items()}
+            for _ in range(count)]
+
+
+def successive_halving(candidates, settings, min_replicas=2, eta=3, max_replicas=54, processes=None):
+    """Keep the best 1/eta of the candidates, with eta times more replicas, until one is left.
+
+    Every candidate is run on the same seeds (common random numbers), and a
+    surviving candidate keeps the runs it already has, so each rung only adds
+    the new replicas. Rungs are evaluated in parallel worker processes.
+    Returns the best candidate, its mean loss, the rungs as (replicas,
+    candidates, mean losses) and the number of simulations run.
+    """
+    losses = [[] for _ in candidates]
+    alive = list(range(len(candidates)))
+    replicas = min_replicas
+    rungs = []
+    simulations = 0
+
+    with multiprocessing.Pool(processes) as pool:
+        while True:
+            tasks = [(candidates[i], seed, settings) for i in alive for seed in range(len(losses[i]), replicas)]
+            owners = [i for i in alive for _ in range(len(losses[i]), replicas)]
+            for owner, loss in zip(owners, pool.map(evaluate, tasks)):
+                losses[owner].append(loss)
+            simulations += len(tasks)
+
+            means = [float(np.mean(losses[i])) for i in alive]
+            rungs.append((replicas, [candidates[i] for i in alive], means))
+            order = np.argsort(means)
+            if len(alive) == 1 or replicas * eta > max_replicas:
+                best = alive[order[0]]
+                return candidates[best], means[order[0]], rungs, simulations
+            alive = [alive[k] for k in order[:max(1, math.ceil(len(alive) / eta))]]
+            replicas *= eta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search police, camera, detection range and collector allocations")
+    parser.add_argument("--candidates", type=int, default=81)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--min-replicas", type=int, default=2)
+    parser.add_argument("--max-replicas", type=int, default=54)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--height", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    settings = {"width": args.width, "height": args.height, "steps": args.steps}
+    candidates = sample_candidates(args.candidates, args.seed)
+    best, loss, rungs, simulations = successive_halving(candidates, settings, args.min_replicas,
+                                                        args.eta, args.max_replicas, args.processes)
+
+    for replicas, survivors, means in rungs:
+        print(f"{len(survivors)} candidates x {replicas} replicas, best loss {min(means):.2f}")
+    print(f"Best: {best} with loss {loss:.2f}")
+    final_replicas = rungs[-1][0]
+    print(f"{simulations} simulations, against {len(candidates) * final_replicas} "
+          f"to run every candidate with {final_replicas} replicas")
+
+
+if __name__ == "__main__":
+    main()
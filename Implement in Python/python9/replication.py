@@ -0,0 +1,141 @@
+import argparse
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+Estimate = namedtuple("Estimate", ["mean", "half_width", "replicas"])
+
+# Fewest replicas a stopping decision is made on, so that t_quantile has
+# the 3 degrees of freedom it is accurate from
+MIN_REPLICAS = 4
+
+
+def t_quantile(p, dof):
+    """Quantile p of Student's t with dof degrees of freedom.
+
+    Cornish-Fisher expansion around the normal quantile, within about 1%
+    from 3 degrees of freedom up, which is plenty for stopping decisions.
+    """
+    z = NormalDist().inv_cdf(p)
+    return (z + (z ** 3 + z) / (4 * dof)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * dof ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * dof ** 3))
+
+
+def estimate(samples, confidence=0.95):
+    """Mean of samples and the half width of its t confidence interval."""
+    samples = np.asarray(samples, dtype=float)
+    n = len(samples)
+    if n < 2:
+        return Estimate(float(samples.mean()) if n else float("nan"), float("inf"), n)
+    half_width = t_quantile((1 + confidence) / 2, n - 1) * samples.std(ddof=1) / np.sqrt(n)
+    return Estimate(float(samples.mean()), float(half_width), n)
+
+
+class SequentialReplication:
+    """Adds replicas of a run until the confidence intervals of its outputs are narrow enough.
+
+    function(seed=..., steps=..., **params) returns a dict that includes the
+    outputs. Replica i always uses seed base_seed + i, so configurations
+    compared with compare() see common random numbers: the same placement
+    and per-population streams replica by replica, and the stopping rule is
+    applied to the paired differences from the baseline, whose variance is
+    usually much lower than that of either configuration. An interval is
+    narrow enough once its half width is at most half_width, or at most
+    relative_half_width times the magnitude of the mean. Results go through
+    cache (a ResultCache) when one is given.
+    """
+
+    def __init__(self, function, steps, outputs, half_width=None, relative_half_width=None,
+                 confidence=0.95, min_replicas=5, max_replicas=200, base_seed=0, cache=None):
+        if half_width is None and relative_half_width is None:
+            raise ValueError("Give half_width, relative_half_width or both")
+        self.function = function
+        self.steps = steps
+        self.outputs = list(outputs)
+        self.half_width = half_width
+        self.relative_half_width = relative_half_width
+        self.confidence = confidence
+        self.min_replicas = max(MIN_REPLICAS, min_replicas)
+        self.max_replicas = max_replicas
+        self.base_seed = base_seed
+        self.cache = cache
+
+    def replicate(self, params, replica):
+        seed = self.base_seed + replica
+        if self.cache is not None:
+            return self.cache.run(self.function, params, seed, self.steps)
+        return self.function(seed=seed, steps=self.steps, **params)
+
+    def precise(self, estimates):
+        for e in estimates:
+            target = max(self.half_width or 0.0, (self.relative_half_width or 0.0) * abs(e.mean))
+            if e.half_width > target:
+                return False
+        return True
+
+    def estimate(self, params):
+        """Estimates of every output of one configuration."""
+        samples = {output: [] for output in self.outputs}
+        for replica in range(self.max_replicas):
+            result = self.replicate(params, replica)
+            for output in self.outputs:
+                samples[output].append(result[output])
+            estimates = {output: estimate(values, self.confidence) for output, values in samples.items()}
+            if replica + 1 >= self.min_replicas and self.precise(estimates.values()):
+                break
+        return estimates
+
+    def compare(self, configurations, baseline):
+        """Estimates of every configuration, and of their differences from the baseline one.
+
+        configurations maps names to parameter dicts. Replicas are added to all
+        configurations together until every difference is precise enough.
+        """
+        samples = {name: {output: [] for output in self.outputs} for name in configurations}
+        for replica in range(self.max_replicas):
+            for name, params in configurations.items():
+                result = self.replicate(params, replica)
+                for output in self.outputs:
+                    samples[name][output].append(result[output])
+
+            differences = {
+                name: {output: estimate(np.subtract(values, samples[baseline][output]), self.confidence)
+                       for output, values in outputs.items()}
+                for name, outputs in samples.items() if name != baseline
+            }
+            if replica + 1 >= self.min_replicas and all(
+                    self.precise(outputs.values()) for outputs in differences.values()):
+                break
+
+        estimates = {
+            name: {output: estimate(values, self.confidence) for output, values in outputs.items()}
+            for name, outputs in samples.items()
+        }
+        return estimates, differences
+
+
+def main():
+    from headless import run
+
+    parser = argparse.ArgumentParser(description="Estimate mean outputs of the simulation to a target precision")
+    parser.add_argument("--width", type=int, default=100)
+    parser.add_argument("--height", type=int, default=60)
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--outputs", nargs="+", default=["arrests", "garbage"])
+    parser.add_argument("--half-width", type=float, default=0.5)
+    parser.add_argument("--relative-half-width", type=float, default=0.1)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--max-replicas", type=int, default=200)
+    args = parser.parse_args()
+
+    replication = SequentialReplication(run, args.steps, args.outputs, args.half_width,
+                                        args.relative_half_width, args.confidence,
+                                        max_replicas=args.max_replicas)
+    for output, e in replication.estimate({"width": args.width, "height": args.height}).items():
+        print(f"{output}: {e.mean:.3f} +/- {e.half_width:.3f} ({e.replicas} replicas)")
+
+
+if __name__ == "__main__":
+    main()
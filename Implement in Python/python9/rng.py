@@ -0,0 +1,45 @@
+import zlib
+
+import numpy as np
+
+
+class RandomStreams:
+    """Independent numpy generators keyed by name, all derived from one master seed.
+
+    Each stream is seeded from the master seed and a hash of its name, so a
+    population draws the same numbers no matter which other streams exist or
+    in which order they are first used. The state of every stream can be
+    saved and restored to resume a run exactly.
+    """
+
+    def __init__(self, seed=None, prefix=""):
+        # Keep the entropy so an unseeded run can still be reproduced
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.prefix = prefix
+        self._streams = {}
+
+    def __getitem__(self, name):
+        stream = self._streams.get(name)
+        if stream is None:
+            key = zlib.crc32((self.prefix + name).encode())
+            stream = np.random.default_rng(np.random.SeedSequence(self.seed, spawn_key=(key,)))
+            self._streams[name] = stream
+        return stream
+
+    def child(self, prefix):
+        """Streams for a sub-part of the run (e.g. one shard), disjoint from these."""
+        return RandomStreams(self.seed, f"{self.prefix}{prefix}/")
+
+    def get_state(self):
+        return {
+            "seed": self.seed,
+            "prefix": self.prefix,
+            "streams": {name: stream.bit_generator.state for name, stream in self._streams.items()},
+        }
+
+    def set_state(self, state):
+        self.seed = state["seed"]
+        self.prefix = state["prefix"]
+        self._streams = {}
+        for name, stream_state in state["streams"].items():
+            self[name].bit_generator.state = stream_state
@@ -0,0 +1,130 @@
+import copy
+import gc
+import json
+from contextlib import contextmanager
+
+import numpy as np
+
+# Entities placed by a scenario, in creation (and unique_id) order
+ENTITIES = ("normal", "disposer", "police", "collector", "camera", "garbage", "disposal_area")
+
+# What GarbageSimulation.create_agents used to hardcode
+DEFAULT_SCENARIO = {
+    "normal": {"count": 50},
+    "disposer": {"count": 10},
+    "police": {"count": 5},
+    "collector": {"count": 5},
+    "camera": {"count": 10},
+    "garbage": {"count": 20},
+    "disposal_area": {"layout": "grid", "spacing": 10},
+}
+
+
+def load_scenario(path):
+    """Read a scenario from a JSON file.
+
+    The file maps entity names (ENTITIES) to placements, and may give the
+    world "width" and "height". A placement has a "layout" and its
+    options, entities it leaves out keep their DEFAULT_SCENARIO placement:
+
+        uniform   count cells drawn uniformly, optionally inside
+                  "region": [x0, y0, x1, y1]
+        clusters  count cells around "centers", either a list of [x, y]
+                  or a number of uniformly drawn centers, with normal
+                  offsets of standard deviation "spread"
+        grid      every cell of a lattice with "spacing" (a number or
+                  [sx, sy]) starting at "offset" [ox, oy]
+        cells     the listed "cells", [[x, y], ...]
+    """
+    with open(path) as file:
+        scenario = json.load(file)
+    return make_scenario(scenario)
+
+
+def make_scenario(overrides=None):
+    """DEFAULT_SCENARIO with the placements and world size in overrides."""
+    scenario = copy.deepcopy(DEFAULT_SCENARIO)
+    for name, value in (overrides or {}).items():
+        if name in ("width", "height"):
+            scenario[name] = int(value)
+        elif name in ENTITIES:
+            scenario[name] = dict(value)
+        else:
+            raise ValueError(f"Unknown scenario entry: {name}")
+    for name in ENTITIES:
+        layout = scenario[name].get("layout", "uniform")
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown layout for {name}: {layout}")
+    return scenario
+
+
+def _uniform(placement, width, height, rng):
+    x0, y0, x1, y1 = placement.get("region", (0, 0, width, height))
+    count = placement["count"]
+    return rng.integers(x0, x1, size=count), rng.integers(y0, y1, size=count)
+
+
+def _clusters(placement, width, height, rng):
+    centers = placement.get("centers", 1)
+    if np.ndim(centers) == 0:
+        centers = np.stack([rng.integers(0, width, size=centers), rng.integers(0, height, size=centers)], axis=1)
+    centers = np.asarray(centers, dtype=np.int64).reshape(-1, 2)
+    count = placement["count"]
+    chosen = centers[rng.integers(0, len(centers), size=count)]
+    offsets = np.rint(rng.normal(0, placement.get("spread", 5), size=(count, 2))).astype(np.int64)
+    return (np.clip(chosen[:, 0] + offsets[:, 0], 0, width - 1),
+            np.clip(chosen[:, 1] + offsets[:, 1], 0, height - 1))
+
+
+def _grid(placement, width, height, rng):
+    sx, sy = np.broadcast_to(placement.get("spacing", 10), 2)
+    ox, oy = placement.get("offset", (0, 0))
+    xs, ys = np.meshgrid(np.arange(ox, width, sx), np.arange(oy, height, sy), indexing="ij")
+    return xs.ravel(), ys.ravel()
+
+
+def _cells(placement, width, height, rng):
+    cells = np.asarray(placement.get("cells", []), dtype=np.int64).reshape(-1, 2)
+    inside = (cells[:, 0] >= 0) & (cells[:, 0] < width) & (cells[:, 1] >= 0) & (cells[:, 1] < height)
+    if not inside.all():
+        raise ValueError(f"Scenario cells outside the {width} x {height} world")
+    return cells[:, 0], cells[:, 1]
+
+
+LAYOUTS = {
+    "uniform": _uniform,
+    "clusters": _clusters,
+    "grid": _grid,
+    "cells": _cells,
+}
+
+
+def place(scenario, width, height, rng):
+    """Cells of every entity of the scenario, as (xs, ys) arrays by entity name.
+
+    Entities are placed in ENTITIES order from one generator, so a seed
+    gives the same world every time.
+    """
+    return {name: LAYOUTS[scenario[name].get("layout", "uniform")](scenario[name], width, height, rng)
+            for name in ENTITIES}
+
+
+@contextmanager
+def paused_gc():
+    """Hold off the cyclic garbage collector while building many long-lived objects.
+
+    Each of its passes walks every tracked object, and the allocations of
+    a bulk build would trigger one every few hundred objects.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def spawn(cls, xs, ys, first_id):
+    """cls(x, y, unique_id) for every cell, with consecutive ids from first_id."""
+    return list(map(cls, xs.tolist(), ys.tolist(), range(first_id, first_id + len(xs))))
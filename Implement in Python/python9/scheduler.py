@@ -0,0 +1,44 @@
+import heapq
+import itertools
+
+
+class Scheduler:
+    """Timed events that run alongside the step loop.
+
+    An activity with a known duration is scheduled once, as a call due at
+    some step, instead of being checked every step. run_until(step) calls
+    everything due by then in time order, events due at the same step in
+    the order they were scheduled. Cancelled events stay in the heap and
+    are skipped when they come up.
+    """
+
+    def __init__(self):
+        self.queue = []
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, time, action, *args):
+        """Call action(*args) at step time, returns a handle for cancel()."""
+        entry = [time, next(self.counter), action, args]
+        heapq.heappush(self.queue, entry)
+        return entry
+
+    def cancel(self, entry):
+        entry[2] = None
+
+    @property
+    def next_time(self):
+        return self.queue[0][0] if self.queue else None
+
+    def run_until(self, time):
+        """Run every event due at or before time, returns how many ran."""
+        ran = 0
+        queue = self.queue
+        while queue and queue[0][0] <= time:
+            _, _, action, args = heapq.heappop(queue)
+            if action is not None:
+                action(*args)
+                ran += 1
+        return ran
@@ -0,0 +1,213 @@
+import argparse
+import multiprocessing
+import time
+
+import numpy as np
+
+from rng import RandomStreams
+from vectorized import (DEFAULT_COUNTS, DETECTION_RANGE, POPULATIONS, Population,
+                        build_world)
+
+
+def _handle(world, command, payload):
+    if command == "move":
+        return world.move_phase()
+    if command == "interact":
+        world.immigrate(payload)
+        return world.interact_phase(), world.edge_offenders()
+    if command == "detect":
+        return world.detect_phase(*payload)
+    if command == "snapshot":
+        return world
+    raise ValueError(f"Unknown shard command: {command}")
+
+
+def _worker(conn, world):
+    while True:
+        command, payload = conn.recv()
+        if command == "close":
+            break
+        conn.send(_handle(world, command, payload))
+    conn.close()
+
+
+class LocalShard:
+    """Steps a strip in the calling process."""
+
+    def __init__(self, world):
+        self.world = world
+        self.result = None
+
+    def send(self, command, payload=None):
+        self.result = _handle(self.world, command, payload)
+
+    def receive(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class ProcessShard:
+    """Steps a strip in a worker process, driven over a pipe."""
+
+    def __init__(self, world, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker, args=(child, world), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, command, payload=None):
+        self.conn.send((command, payload))
+
+    def receive(self):
+        return self.conn.recv()
+
+    def close(self):
+        self.conn.send(("close", None))
+        self.process.join()
+        self.conn.close()
+
+
+class ShardedSimulation:
+    """Runs the vectorized world split into vertical strips, one per shard.
+
+    Agents that cross a strip boundary are handed to the owning shard after
+    the move phase, and offenders within camera range of a boundary are sent
+    to the neighbouring shards as a halo before detection. Each shard draws
+    from its own per-population streams derived from the seed, so a run is
+    reproducible for a given seed and shard count whether or not worker
+    processes are used. fast_forward is passed on to ArrayWorld.
+    """
+
+    def __init__(self, width=100, height=60, shards=4, seed=None, counts=None,
+                 detection_range=DETECTION_RANGE, processes=True, track_cells=False,
+                 fast_forward=0):
+        if not 1 <= shards <= width:
+            raise ValueError("shards must be between 1 and the world width")
+        self.width = width
+        self.height = height
+        self.detection_range = detection_range
+        self.counts = dict(DEFAULT_COUNTS, **(counts or {}))
+        self.bounds = np.linspace(0, width, shards + 1).astype(np.int64)
+
+        self.streams = RandomStreams(seed)
+        world = build_world(width, height, self.counts, self.streams, detection_range, track_cells,
+                            fast_forward)
+        strips = world.split_strips(self.bounds,
+                                    [self.streams.child(f"shard{i}") for i in range(shards)])
+
+        if processes and shards > 1:
+            context = multiprocessing.get_context()
+            self.shards = [ProcessShard(strip, context) for strip in strips]
+        else:
+            self.shards = [LocalShard(strip) for strip in strips]
+
+        # Simulation tracking
+        self.step_count = 0
+        self.arrests = 0
+        self.blackboard_size = 0
+        self.garbage_count = world.garbage_count
+
+    def owner(self, x):
+        return np.searchsorted(self.bounds, x, side="right") - 1
+
+    def step(self):
+        for shard in self.shards:
+            shard.send("move")
+        emigrants = [shard.receive() for shard in self.shards]
+
+        for shard, immigrants in zip(self.shards, self._route(emigrants)):
+            shard.send("interact", immigrants)
+        results = [shard.receive() for shard in self.shards]
+        stats = [result[0] for result in results]
+
+        for shard, halo in zip(self.shards, self._halos([result[1] for result in results])):
+            shard.send("detect", halo)
+        detected = sum(shard.receive() for shard in self.shards)
+
+        self.step_count += 1
+        self.arrests += sum(s["penalties"] + s["arrests"] for s in stats)
+        self.garbage_count = sum(s["garbage"] for s in stats)
+        self.blackboard_size += detected
+        return True
+
+    def run(self, steps, convergence=None):
+        """Step up to steps times, stopping early once the detector reports convergence."""
+        for _ in range(steps):
+            arrests = self.arrests
+            self.step()
+            if convergence is not None and convergence.update(
+                    arrest_rate=self.arrests - arrests, garbage_level=self.garbage_count):
+                break
+
+    def snapshot(self):
+        """Return a copy of every strip's ArrayWorld."""
+        for shard in self.shards:
+            shard.send("snapshot")
+        return [shard.receive() for shard in self.shards]
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _route(self, emigrants):
+        """Group the agents that left their strips by the shard that now owns them."""
+        incoming = [{} for _ in self.shards]
+        for name in POPULATIONS:
+            movers = Population.concat([shard_emigrants[name] for shard_emigrants in emigrants])
+            owners = self.owner(movers.x)
+            for index, immigrants in enumerate(incoming):
+                immigrants[name] = movers.select(owners == index)
+        return incoming
+
+    def _halos(self, edges):
+        """Offenders from other strips that lie within camera range of each strip."""
+        halos = []
+        for index, (x0, x1) in enumerate(zip(self.bounds[:-1], self.bounds[1:])):
+            hx, hy = [], []
+            for other, (ox, oy) in enumerate(edges):
+                if other == index:
+                    continue
+                near = (ox >= x0 - self.detection_range) & (ox < x1 + self.detection_range)
+                hx.append(ox[near])
+                hy.append(oy[near])
+            halos.append((np.concatenate(hx or [[]]), np.concatenate(hy or [[]])))
+        return halos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the sharded garbage simulation headless")
+    parser.add_argument("--width", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=1000)
+    parser.add_argument("--shards", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--steps", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--normal-agents", type=int, default=DEFAULT_COUNTS["normal"])
+    parser.add_argument("--garbage", type=int, default=DEFAULT_COUNTS["garbage"])
+    parser.add_argument("--fast-forward", type=int, default=0,
+                        help="steps isolated walkers may take at once (0 to simulate every step)")
+    args = parser.parse_args()
+
+    counts = {"normal": args.normal_agents, "garbage": args.garbage}
+    with ShardedSimulation(args.width, args.height, args.shards, args.seed, counts,
+                           fast_forward=args.fast_forward) as simulation:
+        start = time.perf_counter()
+        simulation.run(args.steps)
+        elapsed = time.perf_counter() - start
+
+    print(f"Steps: {simulation.step_count} in {elapsed:.2f}s "
+          f"({simulation.step_count / elapsed:.1f} steps/s)")
+    print(f"Arrests: {simulation.arrests}")
+    print(f"Garbage Items: {simulation.garbage_count}")
+    print(f"Blackboard: {simulation.blackboard_size}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Modules a headless run must not load
+UI_MODULES = ("pygame", "mesa", "viewport")
+
+# Seconds the headless entry point may add to a bare interpreter start
+STARTUP_BUDGET = 0.2
+
+
+def time_startup(code, runs):
+    """Wall time of runs fresh interpreters executing code."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-c", code], cwd=HERE)
+        times.append(time.perf_counter() - start)
+        if result.returncode:
+            raise SystemExit(f"{code!r} failed with exit code {result.returncode}")
+    return times
+
+
+def measure(module="headless", runs=10):
+    """Median startup cost of importing module on top of a bare interpreter, in seconds."""
+    check = f"import sys, {module}; sys.exit(any(name in sys.modules for name in {UI_MODULES!r}))"
+    try:
+        time_startup(check, 1)
+    except SystemExit:
+        raise SystemExit(f"importing {module} loads one of {', '.join(UI_MODULES)}")
+
+    baseline = statistics.median(time_startup("pass", runs))
+    loaded = statistics.median(time_startup(f"import {module}", runs))
+    return baseline, loaded - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the startup time of the headless entry point")
+    parser.add_argument("--module", default="headless")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET)
+    args = parser.parse_args()
+
+    baseline, cost = measure(args.module, args.runs)
+    print(f"Interpreter start: {baseline * 1000:.0f} ms")
+    print(f"import {args.module}: {cost * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    if cost > args.budget:
+        raise SystemExit(f"import {args.module} is over budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+import argparse
+
+import numpy as np
+
+from ensemble import EnsembleSimulation
+from vectorized import DEFAULT_COUNTS, DETECTION_RANGE, DISPOSAL_SPACING, INITIAL_SCORES
+
+OUTPUTS = ("garbage", "arrests", "blackboard", "normal_agents")
+
+# Coefficients fitted by calibrate(), the starting point of a new fit
+DEFAULT_COEFFICIENTS = {
+    # Scales encounters between walkers and garbage, below 1 when garbage
+    # near a walker has just been taken
+    "mixing": 1.0,
+    # Scales the penalty rate of normals already penalized, which tend to
+    # still be next to the garbage that got them penalized. Uniform mixing
+    # still leaves too few offenders, so the blackboard comes out low
+    "persistence": 1.0,
+    # Steps a collector needs per unit of mean distance to the nearest item
+    "travel": 1.0,
+}
+
+# Range calibrate() keeps each coefficient in. Penalized normals are at least
+# as likely as others to be penalized again, and a model with garbage
+# encounters or collector travel scaled far from 1 no longer means anything
+COEFFICIENT_BOUNDS = {
+    "mixing": (0.1, 2.0),
+    "persistence": (1.0, 10.0),
+    "travel": (0.1, 10.0),
+}
+
+
+def _offsets_in_range(detection_range):
+    """Offsets (dx, dy) of the square around a cell, and which of them are within each range."""
+    r = int(np.max(detection_range))
+    dx, dy = np.meshgrid(np.arange(-r, r + 1), np.arange(-r, r + 1))
+    dx, dy = dx.ravel(), dy.ravel()
+    return dx, dy, (dx * dx + dy * dy)[:, None] <= np.square(np.ravel(detection_range))
+
+
+def cells_in_range(detection_range):
+    """Cells within Euclidean distance detection_range of a cell, itself included."""
+    _, _, inside = _offsets_in_range(detection_range)
+    return inside.sum(axis=0).reshape(np.shape(detection_range))
+
+
+def coverage(detection_range, width, height):
+    """Share of the in-range cells of a camera that lie inside the world, on average
+    over the cells the camera can be on."""
+    dx, dy, inside = _offsets_in_range(detection_range)
+    # Offset (dx, dy) stays inside from (width - |dx|) * (height - |dy|) of the cells
+    share = (width - np.abs(dx)) * (height - np.abs(dy)) / (width * height)
+    return ((share[:, None] * inside).sum(axis=0) / inside.sum(axis=0)).reshape(np.shape(detection_range))
+
+
+class MeanFieldModel:
+    """Expected-value dynamics of the garbage simulation.
+
+    Tracks the expected garbage, normal agents by score, improper disposers
+    (as in gameIncrease.py, one item each per step), arrests and blackboard
+    entries, assuming agents are spread uniformly over the world. Each step
+    applies the phases of GarbageSimulation.step in order, with rates taken
+    from the same counts and detection_range plus a few coefficients that
+    calibrate() fits against agent runs. Every count may be an array, all
+    scenarios then advance together.
+
+    The improper disposer terms are not calibrated: EnsembleSimulation has
+    no improper disposers to fit them against.
+    """
+
+    def __init__(self, width=100, height=60, counts=None, detection_range=DETECTION_RANGE,
+                 improper_disposers=0, coefficients=None):
+        self.width = width
+        self.height = height
+        self.area = width * height
+        self.counts = dict(DEFAULT_COUNTS, **(counts or {}))
+        self.detection_range = detection_range
+        self.improper_disposers = improper_disposers
+        self.coefficients = dict(DEFAULT_COEFFICIENTS, **(coefficients or {}))
+
+    def run(self, steps):
+        """Expected outputs after every step, arrays shaped (steps + 1, *scenarios)."""
+        counts = {name: np.asarray(value, dtype=float) for name, value in self.counts.items()}
+        mixing = self.coefficients["mixing"]
+        persistence = self.coefficients["persistence"]
+        travel = self.coefficients["travel"]
+        area = self.area
+
+        # Normals by score, index s for score s, index 0 for offenders
+        start = INITIAL_SCORES["normal"]
+        shape = np.broadcast(*counts.values(), np.asarray(self.detection_range),
+                             np.asarray(self.improper_disposers)).shape
+        scores = np.zeros((start + 1,) + shape)
+        scores[start] = counts["normal"]
+        garbage = np.broadcast_to(counts["garbage"], shape).astype(float)
+        improper = np.broadcast_to(np.asarray(self.improper_disposers, dtype=float), shape).copy()
+        arrests = np.zeros(shape)
+        blackboard = np.zeros(shape)
+
+        # Chance that a cell holds at least one of the police agents
+        police_cover = 1 - (1 - 1 / area) ** counts["police"]
+        outside_disposal = 1 - 1 / DISPOSAL_SPACING ** 2
+        watched = (counts["camera"] * cells_in_range(self.detection_range)
+                   * coverage(self.detection_range, self.width, self.height) / area)
+
+        history = {output: [] for output in OUTPUTS}
+
+        def record():
+            history["garbage"].append(garbage.copy())
+            history["arrests"].append(arrests.copy())
+            history["blackboard"].append(blackboard.copy())
+            history["normal_agents"].append(scores.sum(axis=0))
+
+        record()
+        for _ in range(steps):
+            # Improper disposers drop an item each, police arrest some of them
+            garbage = garbage + improper
+            arrested = improper * police_cover
+            improper = improper - arrested
+            arrests = arrests + arrested
+
+            # Normals on garbage: each item is a 50% chance, items per cell are Poisson
+            density = garbage / area
+            penalty = mixing * (1 - np.exp(-density / 2)) * outside_disposal
+            rates = np.stack([np.minimum(penalty * persistence, 1)] * start + [penalty])
+            moved = scores[1:] * rates[1:]
+            penalties = (scores * rates).sum(axis=0)
+            scores[1:] -= moved
+            scores[:-1] += moved
+            arrests = arrests + penalties
+
+            # Disposers on garbage take an item each
+            collected = np.minimum(garbage, counts["disposer"] * mixing * (1 - np.exp(-density)))
+            garbage = garbage - collected
+
+            # Police arrest offenders sharing their cell
+            arrested = scores[0] * police_cover
+            scores[0] -= arrested
+            arrests = arrests + arrested
+
+            # Collectors walk to the nearest item, half the typical spacing away
+            with np.errstate(divide="ignore"):
+                distance = 0.5 * np.sqrt(area / garbage)
+            removed = np.minimum(garbage, counts["collector"] / (1 + travel * distance))
+            garbage = garbage - removed
+
+            # Cameras see the offenders within range
+            blackboard = blackboard + scores[0] * watched
+            record()
+
+        return {output: np.stack(values) for output, values in history.items()}
+
+
+def sample_runs(scenarios, steps, replicas=16, width=100, height=60, seed=0):
+    """Mean outputs of agent runs, one dict of (steps + 1,) arrays per scenario."""
+    samples = []
+    for index, scenario in enumerate(scenarios):
+        simulation = EnsembleSimulation(replicas, width, height, seed=seed + index,
+                                        counts=scenario.get("counts"),
+                                        detection_range=scenario.get("detection_range", DETECTION_RANGE))
+        history = {output: [] for output in OUTPUTS}
+        for step in range(steps + 1):
+            if step:
+                simulation.step()
+            for output, values in simulation.metrics().items():
+                history[output].append(values.mean())
+        samples.append({output: np.asarray(values) for output, values in history.items()})
+    return samples
+
+
+def error_report(scenarios, samples, coefficients, width=100, height=60):
+    """RMSE and final relative error of each output, over all scenarios."""
+    report = {}
+    predictions = [MeanFieldModel(width, height, scenario.get("counts"),
+                                  scenario.get("detection_range", DETECTION_RANGE),
+                                  coefficients=coefficients).run(len(sample["garbage"]) - 1)
+                   for scenario, sample in zip(scenarios, samples)]
+    for output in OUTPUTS:
+        errors = np.concatenate([p[output] - s[output] for p, s in zip(predictions, samples)])
+        final = [abs(p[output][-1] - s[output][-1]) / max(abs(s[output][-1]), 1)
+                 for p, s in zip(predictions, samples)]
+        report[output] = {"rmse": float(np.sqrt(np.mean(errors ** 2))), "final_relative": float(np.max(final))}
+    return report
+
+
+def _loss(coefficients, scenarios, samples, width, height):
+    loss = 0.0
+    for scenario, sample in zip(scenarios, samples):
+        prediction = MeanFieldModel(width, height, scenario.get("counts"),
+                                    scenario.get("detection_range", DETECTION_RANGE),
+                                    coefficients=coefficients).run(len(sample["garbage"]) - 1)
+        for output in OUTPUTS:
+            scale = max(np.abs(sample[output]).max(), 1)
+            loss += np.mean(((prediction[output] - sample[output]) / scale) ** 2)
+    return loss
+
+
+def nelder_mead(f, x0, step=0.5, iterations=200, tolerance=1e-8):
+    """Minimize f from x0 with the Nelder-Mead simplex method."""
+    simplex = [np.asarray(x0, dtype=float)]
+    for i in range(len(x0)):
+        vertex = simplex[0].copy()
+        vertex[i] += step
+        simplex.append(vertex)
+    values = [f(x) for x in simplex]
+
+    for _ in range(iterations):
+        order = np.argsort(values)
+        simplex = [simplex[i] for i in order]
+        values = [values[i] for i in order]
+        if values[-1] - values[0] < tolerance:
+            break
+        centroid = np.mean(simplex[:-1], axis=0)
+        reflected = centroid + (centroid - simplex[-1])
+        reflected_value = f(reflected)
+        if reflected_value < values[0]:
+            expanded = centroid + 2 * (centroid - simplex[-1])
+            expanded_value = f(expanded)
+            simplex[-1], values[-1] = ((expanded, expanded_value) if expanded_value < reflected_value
+                                       else (reflected, reflected_value))
+        elif reflected_value < values[-2]:
+            simplex[-1], values[-1] = reflected, reflected_value
+        else:
+            contracted = centroid + 0.5 * (simplex[-1] - centroid)
+            contracted_value = f(contracted)
+            if contracted_value < values[-1]:
+                simplex[-1], values[-1] = contracted, contracted_value
+            else:
+                # Shrink towards the best vertex
+                simplex = [simplex[0]] + [simplex[0] + 0.5 * (x - simplex[0]) for x in simplex[1:]]
+                values = [values[0]] + [f(x) for x in simplex[1:]]
+    best = int(np.argmin(values))
+    return simplex[best], values[best]
+
+
+def calibrate(scenarios, steps=200, replicas=16, width=100, height=60, seed=0):
+    """Fit the coefficients to sampled agent runs of the scenarios.
+
+    scenarios is a list of dicts with optional "counts" and "detection_range".
+    Coefficients are kept within COEFFICIENT_BOUNDS.
+    Returns the coefficients and the error report of the fitted model.
+    """
+    samples = sample_runs(scenarios, steps, replicas, width, height, seed)
+    names = list(DEFAULT_COEFFICIENTS)
+    low, high = np.array([COEFFICIENT_BOUNDS[name] for name in names]).T
+
+    def bounded(log_values):
+        return np.clip(np.exp(log_values), low, high)
+
+    def loss(log_values):
+        return _loss(dict(zip(names, bounded(log_values))), scenarios, samples, width, height)
+
+    best, _ = nelder_mead(loss, np.log([DEFAULT_COEFFICIENTS[name] for name in names]))
+    coefficients = dict(zip(names, bounded(best).tolist()))
+    return coefficients, error_report(scenarios, samples, coefficients, width, height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the mean-field surrogate against agent runs")
+    parser.add_argument("--steps", type=int, default=200)
+    parser.add_argument("--replicas", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    scenarios = [
+        {},
+        {"counts": {"police": 20, "camera": 30}},
+        {"counts": {"garbage": 100, "collector": 2}},
+        {"counts": {"normal": 200, "disposer": 2}, "detection_range": 10},
+    ]
+    coefficients, report = calibrate(scenarios, args.steps, args.replicas, seed=args.seed)
+    print("Coefficients: " + ", ".join(f"{name}={value:.3f}" for name, value in coefficients.items()))
+    for output, errors in report.items():
+        print(f"{output}: rmse {errors['rmse']:.3f}, final relative error {errors['final_relative']:.1%}")
+    print("improper disposers: not calibrated, the ensemble runs have none")
+
+
+if __name__ == "__main__":
+    main()
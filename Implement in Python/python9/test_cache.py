@@ -0,0 +1,53 @@
+import os
+import time
+
+import numpy as np
+
+from cache import ResultCache
+
+calls = []
+
+
+def simulate(seed, steps, size=10):
+    calls.append((seed, steps, size))
+    return {"arrests": (seed or 0) * steps, "series": np.arange(size, dtype=np.int64)}
+
+
+def test_results_are_computed_once_per_key(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    calls.clear()
+    first = cache.run(simulate, {"size": 4}, seed=3, steps=7)
+    again = cache.run(simulate, {"size": 4}, seed=3, steps=7)
+    assert calls == [(3, 7, 4)]
+    assert again["arrests"] == first["arrests"] == 21
+    assert again["series"].tolist() == [0, 1, 2, 3]
+
+    cache.run(simulate, {"size": 5}, seed=3, steps=7)
+    cache.run(simulate, {"size": 4}, seed=4, steps=7)
+    cache.run(simulate, {"size": 4}, seed=None, steps=7)
+    cache.run(simulate, {"size": 4}, seed=None, steps=7)
+    assert len(calls) == 5
+
+
+def age(cache, key, seconds):
+    stamp = time.time() - seconds
+    os.utime(cache.path(key), (stamp, stamp))
+
+
+def test_evict_drops_expired_then_least_recently_used(tmp_path):
+    cache = ResultCache(str(tmp_path), max_age=3600)
+    keys = [cache.key(simulate, {}, seed, 1) for seed in range(4)]
+    for seed, key in enumerate(keys):
+        cache.put(key, simulate(seed, 1, size=1000))
+    size = os.path.getsize(cache.path(keys[0]))
+
+    age(cache, keys[0], 7200)
+    for index, key in enumerate(keys[1:]):
+        age(cache, key, 300 - 100 * index)
+    # Reading the oldest of the rest makes it the most recently used
+    assert cache.get(keys[1]) is not None
+
+    cache.max_bytes = 2 * size
+    cache.evict()
+    assert [os.path.exists(cache.path(key)) for key in keys] == [False, True, False, True]
+    assert cache.get(keys[2]) is None
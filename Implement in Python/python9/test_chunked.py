@@ -0,0 +1,51 @@
+import numpy as np
+
+from chunked import ChunkedGrid
+
+
+def test_chunked_grid_matches_a_dense_grid():
+    rng = np.random.default_rng(0)
+    width, height, x0 = 50, 37, 20
+    grid = ChunkedGrid(width, height, x0, chunk_size=8)
+    dense = np.zeros((width, height), dtype=np.int32)
+    for _ in range(30):
+        count = int(rng.integers(1, 40))
+        x = rng.integers(x0, x0 + width, count)
+        y = rng.integers(0, height, count)
+        values = rng.integers(-3, 4, count).astype(np.int32)
+        grid.add(x, y, values)
+        np.add.at(dense, (x - x0, y), values)
+
+        assert np.array_equal(grid.to_dense(), dense)
+        assert grid.sum() == dense.sum()
+        assert np.array_equal(grid.get(x, y), dense[x - x0, y])
+        nx, ny = grid.nonzero()
+        assert sorted(zip(nx.tolist(), ny.tolist())) == sorted(
+            (int(i) + x0, int(j)) for i, j in zip(*np.nonzero(dense)))
+
+
+def test_release_empty_returns_chunks_for_reuse():
+    grid = ChunkedGrid(64, 64, chunk_size=16)
+    grid.add(np.array([0, 40, 63]), np.array([0, 40, 63]))
+    assert grid.active_chunks == 3
+    grid.add(np.array([40]), np.array([40]), -1)
+    grid.release_empty()
+    assert grid.active_chunks == 2
+    assert grid.get(np.array([40]), np.array([40])).tolist() == [0]
+
+    pool_size = len(grid.pool)
+    grid.add(np.array([20]), np.array([50]), 5)
+    assert len(grid.pool) == pool_size
+    assert grid.get(np.array([20, 0, 63]), np.array([50, 0, 63])).tolist() == [5, 1, 1]
+
+
+def test_columns_copies_a_strip():
+    rng = np.random.default_rng(1)
+    grid = ChunkedGrid(40, 20, chunk_size=8)
+    x, y = rng.integers(0, 40, 200), rng.integers(0, 20, 200)
+    grid.add(x, y)
+    part = grid.columns(10, 25)
+    assert part.x0 == 10
+    assert np.array_equal(part.to_dense(), grid.to_dense()[10:25])
+    grid.clear()
+    assert grid.sum() == 0 and part.sum() > 0
@@ -0,0 +1,28 @@
+import numpy as np
+
+from ensemble import EnsembleSimulation
+
+
+def history(replicas, seed=2):
+    simulation = EnsembleSimulation(replicas, 40, 30, seed=seed,
+                                    counts={"normal": 100, "garbage": 200, "police": 20})
+    steps = []
+    for _ in range(60):
+        simulation.step()
+        steps.append(simulation.metrics())
+    return {name: np.stack([metrics[name] for metrics in steps]) for name in steps[0]}
+
+
+def test_replica_does_not_depend_on_the_ensemble_size():
+    small = history(2)
+    large = history(5)
+    assert small["arrests"][-1].sum() > 0
+    for name in small:
+        assert np.array_equal(small[name], large[name][:, :2])
+
+
+def test_replicas_are_independent_runs():
+    runs = history(4)
+    assert len({tuple(column) for column in runs["garbage"].T}) > 1
+    assert np.all(np.diff(runs["arrests"], axis=0) >= 0)
+    assert np.all(np.diff(runs["garbage"], axis=0) <= 0)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from eventlog import EVENT_DTYPE, EventLog, EventLogWriter, EventType, Replay, to_records
+from game import GarbageSimulation, SimulationState
+from liveserver import ENTITY_LISTS
+from scenario import make_scenario
+
+
+class Entity:
+    def __init__(self, unique_id, x, y):
+        self.unique_id = unique_id
+        self.x = x
+        self.y = y
+
+
+def cells(entities):
+    return sorted((entity.x, entity.y) for entity in entities)
+
+
+def test_records_round_trip(tmp_path):
+    path = tmp_path / "events.bin"
+    writer = EventLogWriter(path, 30, 20)
+    writer.record(0, EventType.ADD_GARBAGE, [Entity(0, 1, 2), Entity(1, 29, 19)])
+    writer.record(1, EventType.MOVE, [])
+    writer.record_move(1, [Entity(2, 5, 6)])
+    writer.close()
+
+    log = EventLog(path)
+    assert (log.width, log.height, len(log), log.last_step) == (30, 20, 3, 1)
+    assert log.events.dtype == EVENT_DTYPE
+    assert log.events.tolist() == [(0, EventType.ADD_GARBAGE, 0, 1, 2),
+                                   (0, EventType.ADD_GARBAGE, 1, 29, 19),
+                                   (1, EventType.MOVE, 2, 5, 6)]
+    assert log.counts()[EventType.ADD_GARBAGE] == 2
+    assert log.per_step(EventType.MOVE).tolist() == [0, 1]
+    assert to_records(1, EventType.MOVE, [Entity(2, 5, 6)]).tobytes() == log.events[2:].tobytes()
+
+
+def test_empty_and_foreign_files(tmp_path):
+    path = tmp_path / "events.bin"
+    EventLogWriter(path, 10, 10).close()
+    assert len(EventLog(path)) == 0
+
+    foreign = tmp_path / "other.bin"
+    foreign.write_bytes(b"not an event log")
+    with pytest.raises(ValueError):
+        EventLog(foreign)
+
+
+@pytest.mark.parametrize("options", [{}, {"two_phase": True}, {"scheduled_travel": True, "hold_steps": 5}])
+def test_replay_matches_the_simulation(tmp_path, options):
+    path = tmp_path / "events.bin"
+    # Garbage everywhere and many police, so there are arrests (and releases) to replay
+    scenario = make_scenario({"garbage": {"count": 400}, "police": {"count": 40}})
+    simulation = GarbageSimulation(width=40, height=30, seed=7, event_log=str(path), log_file=None,
+                                   scenario=scenario, **options)
+    simulation.create_agents()
+    simulation.state = SimulationState.RUNNING
+
+    def state():
+        simulation.sync_trips()
+        return {kind: cells(getattr(simulation, name)) for kind, name in ENTITY_LISTS}
+
+    states = [state()]
+    for _ in range(60):
+        simulation.step()
+        states.append(state())
+    simulation.events.close()
+
+    log = EventLog(path)
+    assert log.counts()[EventType.ARREST] > 0
+    replay = Replay(log)
+    for step, expected in enumerate(states):
+        replay.seek(step)
+        for kind, _ in ENTITY_LISTS:
+            xs, ys = replay.positions(kind)
+            assert sorted(zip(xs.tolist(), ys.tolist())) == expected[kind]
+    # Seeking backwards replays from the start
+    replay.seek(10)
+    assert sorted(zip(*map(np.ndarray.tolist, replay.positions(EventType.ADD_GARBAGE)))) \
+        == states[10][EventType.ADD_GARBAGE]
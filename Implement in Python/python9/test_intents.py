@@ -0,0 +1,62 @@
+from collections import defaultdict
+
+import numpy as np
+
+from game import GarbageSimulation, SimulationState
+from hooks import Hook
+from intents import CellCounts, resolve_claims
+from scenario import make_scenario
+
+
+def reference_claims(keys, priority, ids, item_keys):
+    """resolve_claims written as the loop it replaces."""
+    items = defaultdict(list)
+    for index, key in enumerate(item_keys):
+        items[key].append(index)
+    pairs = []
+    for claimant in sorted(range(len(keys)), key=lambda i: (priority[i], ids[i])):
+        if items[keys[claimant]]:
+            pairs.append((claimant, items[keys[claimant]].pop(0)))
+    return sorted(pairs)
+
+
+def test_cell_counts():
+    counts = CellCounts(np.array([4, 1, 4, 9]))
+    assert counts(np.array([4, 9, 5, 0, 10])).tolist() == [2, 1, 0, 0, 0]
+    assert CellCounts(np.array([], dtype=np.int64))(np.array([3])).tolist() == [0]
+
+
+def test_resolve_claims_matches_the_sequential_rule():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        claimants = int(rng.integers(0, 12))
+        keys = rng.integers(0, 4, size=claimants)
+        priority = rng.integers(0, 2, size=claimants)
+        ids = rng.permutation(100)[:claimants]
+        item_keys = rng.integers(0, 4, size=int(rng.integers(0, 10)))
+        winners, taken = resolve_claims(keys, priority, ids, item_keys)
+        assert len(set(taken.tolist())) == len(taken)
+        assert np.array_equal(keys[winners], item_keys[taken])
+        assert sorted(zip(winners.tolist(), taken.tolist())) == reference_claims(keys, priority, ids, item_keys)
+
+
+def test_two_phase_steps_are_reproducible_and_take_each_item_once():
+    def run():
+        scenario = make_scenario({"garbage": {"count": 300}, "disposer": {"count": 60},
+                                  "collector": {"count": 30}})
+        simulation = GarbageSimulation(width=30, height=20, seed=9, log_file=None, scenario=scenario,
+                                       two_phase=True)
+        simulation.create_agents()
+        simulation.state = SimulationState.RUNNING
+        taken = []
+        for hook in (Hook.GARBAGE_COLLECTION, Hook.GARBAGE_REMOVAL):
+            simulation.hooks.subscribe(hook, lambda simulation, events: taken.extend(events["agent"].tolist()))
+        garbage = [len(simulation.garbage_items)]
+        for _ in range(40):
+            simulation.step()
+            garbage.append(len(simulation.garbage_items))
+        return taken, garbage, simulation.arrests
+
+    taken, garbage, arrests = run()
+    assert len(taken) == len(set(taken)) == garbage[0] - garbage[-1] > 0
+    assert run() == (taken, garbage, arrests)
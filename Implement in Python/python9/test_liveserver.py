@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import gc
+import json
+import os
+import struct
+
+import numpy as np
+
+from game import GarbageSimulation
+from liveserver import ADDED_DTYPE, DELTA, HEADER, KEYFRAME, MOVED_DTYPE, Frame, LiveServer
+
+
+def apply_message(entities, message):
+    """Update entities {id: (kind, x, y)} with a keyframe or delta, as the browser client does."""
+    kind, *header, added, moved, removed = HEADER.unpack_from(message)
+    assert kind in (KEYFRAME, DELTA)
+    if kind == KEYFRAME:
+        entities.clear()
+    offset = HEADER.size
+    for entity in np.frombuffer(message, ADDED_DTYPE, added, offset).tolist():
+        entities[entity[0]] = entity[1:]
+    offset += added * ADDED_DTYPE.itemsize
+    for id_, x, y in np.frombuffer(message, MOVED_DTYPE, moved, offset).tolist():
+        entities[id_] = (entities[id_][0], x, y)
+    offset += moved * MOVED_DTYPE.itemsize
+    for id_ in np.frombuffer(message, "<i4", removed, offset).tolist():
+        del entities[id_]
+    assert offset + removed * 4 == len(message)
+    return kind, header
+
+
+def state(simulation):
+    frame = Frame(simulation, 0)
+    return dict(zip(frame.ids.tolist(), zip(frame.kind.tolist(), frame.x.tolist(), frame.y.tolist())))
+
+
+class RecordingSocket:
+    def __init__(self):
+        self.messages = []
+
+    async def send(self, payload):
+        self.messages.append(payload)
+
+
+def test_decoded_stream_matches_the_simulation():
+    async def scenario():
+        simulation = GarbageSimulation(width=40, height=30, seed=5, log_file=None)
+        simulation.create_agents()
+        server = LiveServer(simulation)
+        socket = RecordingSocket()
+        streaming = asyncio.ensure_future(server.stream(socket))
+        entities = {}
+        kinds = []
+
+        async def check():
+            await asyncio.sleep(0)
+            kind, header = apply_message(entities, socket.messages[-1])
+            kinds.append(kind)
+            assert entities == state(simulation)
+            assert header[0] == simulation.step_count
+
+        await check()
+        for command in ["start", "step", "step", "stop", "step", "setup", "start", "step"]:
+            assert await server.handle_command(json.dumps({"command": command}))
+            await check()
+        streaming.cancel()
+        return kinds
+
+    kinds = asyncio.run(scenario())
+    assert kinds[0] == KEYFRAME
+    assert DELTA in kinds
+
+
+def test_malformed_commands_are_ignored():
+    async def scenario():
+        simulation = GarbageSimulation(width=20, height=20, seed=1, log_file=None)
+        simulation.create_agents()
+        server = LiveServer(simulation)
+        for message in [b"not json", b"[1]", b"{}", b'{"command": "fly"}',
+                        b'{"command": "speed"}', b'{"command": "speed", "value": "fast"}',
+                        b'{"command": "speed", "value": 1e400}']:
+            assert not await server.handle_command(message)
+        assert server.version == 0
+        assert await server.handle_command(b'{"command": "speed", "value": 25}')
+        return server.steps_per_second
+
+    assert asyncio.run(scenario()) == 25
+
+
+def masked_frame(payload, opcode=0x1):
+    mask = os.urandom(4)
+    data = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return struct.pack("!BB", 0x80 | opcode, 0x80 | len(payload)) + mask + data
+
+
+def test_bad_message_and_disconnect_leave_no_errors():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda loop, context: errors.append(context))
+
+        simulation = GarbageSimulation(width=20, height=20, seed=1, log_file=None)
+        simulation.create_agents()
+        server = LiveServer(simulation)
+        listener = await asyncio.start_server(server.handle_connection, "127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        key = base64.b64encode(os.urandom(16))
+        writer.write(b"GET /ws HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Key: " + key + b"\r\n\r\n")
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(masked_frame(b"{broken"))
+        writer.write(masked_frame(b'{"command": "step"}'))
+        await writer.drain()
+        # The keyframe, then the connection still answers a valid command
+        for _ in range(2):
+            first, second = await reader.readexactly(2)
+            length = second & 0x7F
+            if length == 126:
+                length, = struct.unpack("!H", await reader.readexactly(2))
+            await reader.readexactly(length)
+
+        writer.close()
+        await writer.wait_closed()
+        # Frames published around the disconnect go to a closing socket
+        for _ in range(3):
+            await server.publish()
+            await asyncio.sleep(0.05)
+        gc.collect()
+        listener.close()
+        await listener.wait_closed()
+        return errors
+
+    assert asyncio.run(scenario()) == []
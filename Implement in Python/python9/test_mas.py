@@ -0,0 +1,46 @@
+import itertools
+import random
+
+import numpy as np
+
+from mas import GarbageItem, WasteManagementModel, min_cost_assignment
+
+
+def brute_force_cost(cost):
+    rows, columns = cost.shape
+    return min(cost[np.arange(rows), list(columns_used)].sum()
+               for columns_used in itertools.permutations(range(columns), rows))
+
+
+def test_min_cost_assignment_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        rows = int(rng.integers(1, 6))
+        columns = int(rng.integers(rows, 7))
+        cost = rng.integers(0, 20, size=(rows, columns)).astype(float)
+        assignment = min_cost_assignment(cost)
+        assert len(set(assignment.tolist())) == rows
+        assert cost[np.arange(rows), assignment].sum() == brute_force_cost(cost)
+
+
+def test_every_collector_gets_a_target_while_items_remain():
+    random.seed(0)
+    model = WasteManagementModel(60, 60)
+    # 45 collectors on one cell, more than any of them has candidate items
+    for collector in model.collectors:
+        model.grid.move_agent(collector, (30, 30))
+    while len(model.collectors) < 45:
+        collector = type(model.collectors[0])(model.next_id(), model)
+        model.schedule.add(collector)
+        model.collectors.append(collector)
+        model.grid.place_agent(collector, (30, 30))
+    while len(model.garbage) < 220:
+        item = GarbageItem(model.next_id(), model)
+        model.schedule.add(item)
+        model.garbage[item.unique_id] = item
+        model.grid.place_agent(item, (random.randrange(60), random.randrange(60)))
+
+    model.municipality.assign_collectors()
+    targets = [collector.target for collector in model.collectors]
+    assert all(target is not None for target in targets)
+    assert len({target.unique_id for target in targets}) == 45
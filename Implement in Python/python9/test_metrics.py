@@ -0,0 +1,36 @@
+from game import GarbageSimulation, SimulationState
+from metrics import SimulationMetrics
+
+
+def running_simulation(seed, two_phase=False):
+    simulation = GarbageSimulation(width=30, height=30, seed=seed, log_file=None, two_phase=two_phase)
+    simulation.create_agents()
+    simulation.state = SimulationState.RUNNING
+    return simulation
+
+
+def test_arrests_total_survives_setup():
+    simulation = running_simulation(4)
+    metrics = SimulationMetrics(simulation)
+    counted = 0
+    totals = []
+    for _ in range(3):
+        for _ in range(150):
+            simulation.step()
+            totals.append(metrics.snapshot["arrests"])
+        counted += simulation.arrests
+        # What the Setup button and the live server's setup command do
+        simulation.create_agents()
+        simulation.arrests = 0
+    assert counted > 0
+    assert totals == sorted(totals)
+    assert metrics.snapshot["arrests"] == counted
+    assert f"simulation_arrests_total {counted}\n" in metrics.render()
+
+
+def test_phases_follow_the_step_mode():
+    for two_phase, phase in [(False, "normal"), (True, "moves")]:
+        simulation = running_simulation(1, two_phase)
+        metrics = SimulationMetrics(simulation)
+        simulation.step()
+        assert phase in metrics.snapshot["phase_seconds"]
@@ -0,0 +1,43 @@
+import pytest
+
+from optimizer import SEARCH_SPACE, cost, evaluate, sample_candidates, successive_halving
+from rng import RandomStreams
+from vectorized import build_world
+
+SETTINGS = {"width": 30, "height": 20, "steps": 30}
+
+
+def test_candidates_lie_in_the_search_space():
+    candidates = sample_candidates(50, seed=1)
+    assert candidates == sample_candidates(50, seed=1)
+    for candidate in candidates:
+        for name, (low, high) in SEARCH_SPACE.items():
+            assert low <= candidate[name] <= high
+
+
+def test_loss_rewards_police_arrests_and_charges_penalties():
+    candidate = {"police": 10, "camera": 4, "detection_range": 3, "collector": 2}
+    counts = {"police": 10, "camera": 4, "collector": 2}
+    world = build_world(30, 20, counts, RandomStreams(5), 3)
+    for _ in range(SETTINGS["steps"]):
+        world.step()
+    assert world.arrests == world.penalties + world.police_arrests
+    expected = (world.garbage_count - world.police_arrests + 0.1 * world.penalties
+                - 0.05 * world.blackboard_size + cost(candidate))
+    assert evaluate((candidate, 5, SETTINGS)) == pytest.approx(expected)
+    # Common random numbers: a seed always gives the same run
+    assert evaluate((candidate, 5, SETTINGS)) == evaluate((candidate, 5, SETTINGS))
+
+
+def test_successive_halving_rungs():
+    candidates = sample_candidates(9, seed=2)
+    best, loss, rungs, simulations = successive_halving(candidates, SETTINGS, min_replicas=2, eta=3,
+                                                        max_replicas=18, processes=2)
+    assert [(replicas, len(survivors)) for replicas, survivors, _ in rungs] == [(2, 9), (6, 3), (18, 1)]
+    # Survivors keep their runs, each rung only adds the new replicas
+    assert simulations == 9 * 2 + 3 * 4 + 1 * 12
+    for (_, survivors, means), (_, next_survivors, _) in zip(rungs, rungs[1:]):
+        ranked = [candidate for _, candidate in sorted(zip(means, survivors), key=lambda pair: pair[0])]
+        assert next_survivors == ranked[:len(next_survivors)]
+    assert best == rungs[-1][1][0]
+    assert loss == pytest.approx(sum(evaluate((best, seed, SETTINGS)) for seed in range(18)) / 18)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from replication import MIN_REPLICAS, SequentialReplication, estimate, t_quantile
+
+
+@pytest.mark.parametrize("dof, exact", [(3, 3.1824), (4, 2.7764), (10, 2.2281), (30, 2.0423)])
+def test_t_quantile_within_one_percent(dof, exact):
+    assert t_quantile(0.975, dof) == pytest.approx(exact, rel=0.01)
+
+
+def test_estimate():
+    e = estimate([1.0, 2.0, 3.0, 4.0, 5.0])
+    assert e.mean == 3.0 and e.replicas == 5
+    assert e.half_width == pytest.approx(t_quantile(0.975, 4) * np.sqrt(2.5) / np.sqrt(5))
+    assert estimate([7.0]).half_width == float("inf")
+
+
+def noisy(seed, steps, level=10.0, spread=1.0):
+    rng = np.random.default_rng(seed)
+    return {"output": level + spread * rng.normal()}
+
+
+def test_stops_once_precise_and_never_before_min_replicas():
+    constant = SequentialReplication(noisy, 1, ["output"], half_width=0.1, min_replicas=2)
+    assert constant.min_replicas == MIN_REPLICAS
+    assert constant.estimate({"spread": 0.0})["output"].replicas == MIN_REPLICAS
+
+    replication = SequentialReplication(noisy, 1, ["output"], half_width=0.5, max_replicas=500)
+    e = replication.estimate({})["output"]
+    assert MIN_REPLICAS < e.replicas < 500
+    assert e.half_width <= 0.5
+    # One replica fewer would not have been precise enough
+    fewer = estimate([noisy(seed, 1)["output"] for seed in range(e.replicas - 1)])
+    assert fewer.half_width > 0.5
+
+    capped = SequentialReplication(noisy, 1, ["output"], half_width=1e-6, max_replicas=20)
+    assert capped.estimate({})["output"].replicas == 20
+
+
+def test_compare_stops_on_paired_differences():
+    # Same seeds on both sides, so the difference of the shifted runs has no variance
+    replication = SequentialReplication(noisy, 1, ["output"], half_width=0.01, max_replicas=200)
+    estimates, differences = replication.compare({"base": {}, "shifted": {"level": 12.0}}, "base")
+    assert differences["shifted"]["output"].mean == pytest.approx(2.0)
+    assert differences["shifted"]["output"].replicas == replication.min_replicas
+    assert estimates["base"]["output"].half_width > 0.01
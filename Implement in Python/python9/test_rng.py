@@ -0,0 +1,52 @@
+from game import GarbageSimulation, SimulationState
+from rng import RandomStreams
+from views import SIMULATION_LISTS
+
+
+def test_streams_do_not_depend_on_each_other():
+    first = RandomStreams(11)
+    first["police"].random(1000)
+    second = RandomStreams(11)
+    assert first["normal"].random(5).tolist() == second["normal"].random(5).tolist()
+    assert RandomStreams(11)["normal"].random(5).tolist() != RandomStreams(12)["normal"].random(5).tolist()
+
+
+def test_children_are_disjoint():
+    streams = RandomStreams(11)
+    draws = [streams["normal"].random(5).tolist(),
+             streams.child("shard0")["normal"].random(5).tolist(),
+             streams.child("shard1")["normal"].random(5).tolist()]
+    assert len({tuple(draw) for draw in draws}) == 3
+    assert draws[1] == RandomStreams(11).child("shard0")["normal"].random(5).tolist()
+
+
+def running_simulation(seed):
+    simulation = GarbageSimulation(width=40, height=30, seed=seed, log_file=None)
+    simulation.create_agents()
+    simulation.state = SimulationState.RUNNING
+    return simulation
+
+
+def state(simulation):
+    return ([[(entity.unique_id, entity.x, entity.y) for entity in getattr(simulation, name)]
+             for _, name in SIMULATION_LISTS]
+            + [[(item.x, item.y) for item in simulation.garbage_items], simulation.arrests])
+
+
+def test_restored_stream_state_continues_the_run():
+    original = running_simulation(5)
+    copy = running_simulation(5)
+    for _ in range(20):
+        original.step()
+        copy.step()
+    assert state(original) == state(copy)
+
+    saved = original.get_rng_state()
+    for _ in range(10):
+        original.step()
+    # Throw the copy's streams off, then restore them
+    copy.streams["normal"].random(100)
+    copy.set_rng_state(saved)
+    for _ in range(10):
+        copy.step()
+    assert state(original) == state(copy)
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pytest
+
+from scenario import DEFAULT_SCENARIO, ENTITIES, load_scenario, make_scenario, place
+
+
+def test_same_seed_places_the_same_world():
+    scenario = make_scenario({"garbage": {"layout": "clusters", "count": 60, "centers": 3, "spread": 4}})
+    first = place(scenario, 80, 60, np.random.default_rng(9))
+    second = place(scenario, 80, 60, np.random.default_rng(9))
+    for name in ENTITIES:
+        assert np.array_equal(first[name][0], second[name][0])
+        assert np.array_equal(first[name][1], second[name][1])
+
+
+def test_layouts_stay_inside_the_world():
+    scenario = make_scenario({
+        "normal": {"layout": "uniform", "count": 30, "region": [10, 5, 20, 15]},
+        "garbage": {"layout": "clusters", "count": 100, "centers": [[0, 0], [79, 59]], "spread": 10},
+        "camera": {"layout": "cells", "cells": [[1, 2], [3, 4]]},
+        "disposal_area": {"layout": "grid", "spacing": [20, 30], "offset": [5, 5]},
+    })
+    cells = place(scenario, 80, 60, np.random.default_rng(0))
+    for name in ENTITIES:
+        xs, ys = cells[name]
+        assert ((xs >= 0) & (xs < 80) & (ys >= 0) & (ys < 60)).all()
+    xs, ys = cells["normal"]
+    assert len(xs) == 30 and ((xs >= 10) & (xs < 20) & (ys >= 5) & (ys < 15)).all()
+    assert list(zip(*cells["camera"])) == [(1, 2), (3, 4)]
+    assert sorted(zip(*cells["disposal_area"])) == [(5, 5), (5, 35), (25, 5), (25, 35),
+                                                    (45, 5), (45, 35), (65, 5), (65, 35)]
+
+
+def test_defaults_fill_missing_entities(tmp_path):
+    path = tmp_path / "scenario.json"
+    path.write_text(json.dumps({"width": 30, "police": {"count": 2}}))
+    scenario = load_scenario(path)
+    assert scenario["width"] == 30
+    assert scenario["police"] == {"count": 2}
+    assert scenario["normal"] == DEFAULT_SCENARIO["normal"]
+
+
+@pytest.mark.parametrize("overrides", [
+    {"trees": {"count": 1}},
+    {"garbage": {"layout": "spiral", "count": 1}},
+])
+def test_unknown_entries_are_rejected(overrides):
+    with pytest.raises(ValueError):
+        make_scenario(overrides)
+
+
+def test_cells_outside_the_world_are_rejected():
+    scenario = make_scenario({"camera": {"layout": "cells", "cells": [[5, 60]]}})
+    with pytest.raises(ValueError):
+        place(scenario, 80, 60, np.random.default_rng(0))
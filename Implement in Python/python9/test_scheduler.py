@@ -0,0 +1,97 @@
+import pytest
+
+from game import GarbageSimulation, SimulationState
+from hooks import Hook
+from scenario import make_scenario
+from scheduler import Scheduler
+
+
+def test_events_run_in_time_then_schedule_order():
+    scheduler = Scheduler()
+    ran = []
+    scheduler.schedule(5, ran.append, "b")
+    scheduler.schedule(2, ran.append, "a")
+    cancelled = scheduler.schedule(3, ran.append, "cancelled")
+    scheduler.schedule(5, ran.append, "c")
+    scheduler.schedule(9, ran.append, "late")
+    scheduler.cancel(cancelled)
+    assert scheduler.next_time == 2
+
+    assert scheduler.run_until(5) == 3
+    assert ran == ["a", "b", "c"]
+    assert scheduler.next_time == 9
+    assert scheduler.run_until(8) == 0
+
+
+def test_events_scheduled_while_running_run_if_due():
+    scheduler = Scheduler()
+    ran = []
+    scheduler.schedule(1, lambda: scheduler.schedule(1, ran.append, "follow-up"))
+    scheduler.schedule(1, ran.append, "first")
+    assert scheduler.run_until(1) == 3
+    assert ran == ["first", "follow-up"]
+    assert len(scheduler) == 0 and scheduler.next_time is None
+
+
+def running_simulation(collectors=20, **options):
+    scenario = make_scenario({"garbage": {"count": 300}, "police": {"count": 30},
+                              "collector": {"count": collectors}})
+    simulation = GarbageSimulation(width=40, height=30, seed=6, log_file=None, scenario=scenario, **options)
+    simulation.create_agents()
+    simulation.state = SimulationState.RUNNING
+    return simulation
+
+
+def test_arrested_agents_come_back_after_hold_steps():
+    # Garbage left lying around long enough for normals to become offenders
+    simulation = running_simulation(collectors=1, hold_steps=7)
+    arrested_at = {}
+    simulation.hooks.subscribe(Hook.ARREST, lambda simulation, events: arrested_at.update(
+        (agent, simulation.step_count) for agent in events["agent"].tolist()))
+    released = []
+    for _ in range(80):
+        before = {agent.unique_id for agent in simulation.normal_agents}
+        simulation.step()
+        released.extend((agent.unique_id, agent.score, simulation.step_count)
+                        for agent in simulation.normal_agents if agent.unique_id not in before)
+    assert released
+    for unique_id, score, step in released:
+        # Released at the start of the step, before the agent can be penalized again
+        assert step == arrested_at[unique_id] + 7
+        assert score >= 4
+
+
+def test_scheduled_trips_claim_each_item_once_and_move_like_stepped_collectors():
+    simulation = running_simulation(scheduled_travel=True)
+    removed = []
+    simulation.hooks.subscribe(Hook.GARBAGE_REMOVAL, lambda simulation, events: removed.extend(
+        events["agent"].tolist()))
+    previous = {collector: (collector.x, collector.y) for collector in simulation.garbage_collectors}
+    for _ in range(150):
+        simulation.step()
+        simulation.sync_trips()
+        assert len(set(simulation.claimed)) == len(simulation.claimed) == len(simulation.trips)
+        for item, collector in simulation.claimed.items():
+            assert collector.target is item
+        # A random move, then one cell towards the target
+        for collector, (x, y) in previous.items():
+            assert max(abs(collector.x - x), abs(collector.y - y)) <= 2
+        previous = {collector: (collector.x, collector.y) for collector in simulation.garbage_collectors}
+    assert len(removed) == len(set(removed)) > 0
+
+
+def test_scheduled_travel_is_reproducible():
+    def run():
+        simulation = running_simulation(scheduled_travel=True, hold_steps=5)
+        for _ in range(100):
+            simulation.step()
+        simulation.sync_trips()
+        return ([(c.x, c.y) for c in simulation.garbage_collectors], len(simulation.garbage_items),
+                simulation.arrests)
+
+    assert run() == run()
+
+
+def test_two_phase_rejects_scheduled_travel():
+    with pytest.raises(ValueError):
+        GarbageSimulation(two_phase=True, scheduled_travel=True, log_file=None)
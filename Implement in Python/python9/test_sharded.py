@@ -0,0 +1,43 @@
+import numpy as np
+
+from sharded import ShardedSimulation
+from vectorized import POPULATIONS
+
+
+def final_state(processes, seed=3, shards=3):
+    with ShardedSimulation(60, 40, shards, seed, counts={"normal": 300, "garbage": 400},
+                           processes=processes) as simulation:
+        simulation.run(40)
+        strips = simulation.snapshot()
+        totals = (simulation.arrests, simulation.garbage_count, simulation.blackboard_size)
+    populations = {}
+    for name in POPULATIONS:
+        ids = np.concatenate([strip.all_populations()[name].ids for strip in strips])
+        x = np.concatenate([strip.all_populations()[name].x for strip in strips])
+        y = np.concatenate([strip.all_populations()[name].y for strip in strips])
+        order = np.argsort(ids)
+        populations[name] = (ids[order].tolist(), x[order].tolist(), y[order].tolist())
+    return totals, populations, strips
+
+
+def test_worker_processes_give_the_same_run():
+    local_totals, local_populations, _ = final_state(processes=False)
+    process_totals, process_populations, _ = final_state(processes=True)
+    assert local_totals == process_totals
+    assert local_populations == process_populations
+
+
+def test_agents_stay_in_their_strips():
+    (arrests, _, _), populations, strips = final_state(processes=False)
+    assert arrests > 0
+    for strip in strips:
+        for population in strip.all_populations().values():
+            assert np.all(strip.owns(population.x))
+    # Only normal agents ever leave the world, by arrest
+    for name, count in [("disposer", 10), ("police", 5), ("collector", 5)]:
+        assert len(populations[name][0]) == count
+
+
+def test_seed_and_shard_count_fix_the_run():
+    assert final_state(False, seed=3)[:2] == final_state(False, seed=3)[:2]
+    assert final_state(False, seed=3)[1] != final_state(False, seed=4)[1]
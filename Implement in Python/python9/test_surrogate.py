@@ -0,0 +1,33 @@
+import numpy as np
+
+from surrogate import COEFFICIENT_BOUNDS, MeanFieldModel, calibrate, cells_in_range, coverage
+
+
+def test_cells_in_range():
+    assert cells_in_range(0) == 1
+    assert cells_in_range(1) == 5
+    assert cells_in_range(np.array([1, 5])).tolist() == [5, 81]
+
+
+def test_coverage_is_a_share():
+    shares = coverage(np.arange(0, 12), 100, 60)
+    assert shares[0] == 1
+    assert np.all(np.diff(shares) < 0) and np.all(shares > 0)
+    assert coverage(5, 10 ** 6, 10 ** 6) > 0.9999
+
+
+def test_calibrated_coefficients_stay_in_bounds():
+    # Few short runs, where an unbounded fit drifts to degenerate values
+    for seed in range(2):
+        coefficients, report = calibrate([{}, {"counts": {"garbage": 100, "collector": 2}}],
+                                         steps=50, replicas=2, seed=seed)
+        for name, (low, high) in COEFFICIENT_BOUNDS.items():
+            assert low <= coefficients[name] <= high
+        assert set(report) == {"garbage", "arrests", "blackboard", "normal_agents"}
+
+
+def test_scenarios_advance_together():
+    together = MeanFieldModel(counts={"garbage": np.array([20, 100])}).run(30)
+    alone = MeanFieldModel(counts={"garbage": 100}).run(30)
+    for output, values in alone.items():
+        assert np.allclose(together[output][:, 1], values)
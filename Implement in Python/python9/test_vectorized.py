@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from rng import RandomStreams
+from vectorized import build_world
+
+COUNTS = {"normal": 400, "disposer": 20, "police": 100, "garbage": 600}
+
+
+def run(fast_forward, steps=120, seed=4):
+    world = build_world(120, 90, COUNTS, RandomStreams(seed), fast_forward=fast_forward)
+    history = [world.step() for _ in range(steps)]
+    return world, history
+
+
+def state(world):
+    populations = {}
+    for name, pop in world.all_populations().items():
+        order = np.argsort(pop.ids)
+        populations[name] = (pop.ids[order].tolist(), pop.x[order].tolist(),
+                             pop.y[order].tolist(), pop.score[order].tolist())
+    return populations, world.arrests, world.garbage_count, world.blackboard_size
+
+
+def test_fast_forward_off_is_the_plain_run():
+    plain, plain_history = run(0)
+    single, single_history = run(1)
+    assert state(plain) == state(single)
+    assert plain_history == single_history
+
+
+@pytest.mark.parametrize("fast_forward", [2, 5])
+def test_fast_forward_keeps_every_agent(fast_forward):
+    start = build_world(120, 90, COUNTS, RandomStreams(4)).agent_count
+    world, _ = run(fast_forward)
+    assert world.police_arrests and any(len(pop) for pop in world.frozen.values())
+    # Agents only leave the map by being arrested
+    assert world.agent_count + world.police_arrests == start
+    for pop in world.all_populations().values():
+        assert ((pop.x >= 0) & (pop.x < world.width) & (pop.y >= 0) & (pop.y < world.height)).all()
+        assert len(np.unique(pop.ids)) == len(pop)
+
+
+def test_fast_forward_is_reproducible():
+    assert state(run(5)[0]) == state(run(5)[0])
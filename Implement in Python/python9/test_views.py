@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from game import GarbageSimulation
+from rng import RandomStreams
+from vectorized import build_world
+from views import SCORED
+
+
+def simulation_view():
+    simulation = GarbageSimulation(width=40, height=30, seed=2, log_file=None)
+    simulation.create_agents()
+    return simulation, simulation.view()
+
+
+def world_view():
+    world = build_world(40, 30, streams=RandomStreams(2))
+    for _ in range(5):
+        world.step()
+    return world, world.view()
+
+
+@pytest.mark.parametrize("make", [simulation_view, world_view])
+def test_views_have_the_same_columns_in_both_engines(make):
+    _, view = make()
+    assert set(view.populations) == {"normal", "disposer", "police", "collector", "camera"}
+    for name, columns in view.populations.items():
+        expected = {"ids", "x", "y", "score"} if name in SCORED else {"ids", "x", "y"}
+        assert set(columns) == expected
+        assert len({len(column) for column in columns.values()}) == 1
+    assert set(view.garbage) == {"x", "y", "count"}
+
+
+@pytest.mark.parametrize("make", [simulation_view, world_view])
+def test_views_are_read_only(make):
+    _, view = make()
+    for columns in [*view.populations.values(), view.garbage]:
+        for column in columns.values():
+            with pytest.raises(ValueError):
+                column[...] = 0
+
+
+def test_simulation_view_matches_its_objects():
+    simulation, view = simulation_view()
+    normals = view["normal"]
+    assert normals["ids"].tolist() == [agent.unique_id for agent in simulation.normal_agents]
+    assert list(zip(normals["x"].tolist(), normals["y"].tolist())) == [
+        (agent.x, agent.y) for agent in simulation.normal_agents]
+    assert view.garbage["count"].sum() == len(simulation.garbage_items)
+
+
+def test_world_view_shares_the_world_arrays():
+    world, view = world_view()
+    assert np.shares_memory(view["normal"]["x"], world.populations["normal"].x)
+    assert view.garbage["count"].sum() == world.garbage_count
@@ -0,0 +1,435 @@
+import numpy as np
+
+from chunked import CHUNK_SIZE, ChunkedGrid
+from heatmap import Heatmaps
+from rng import RandomStreams
+from views import StateView
+
+# Random walkers in the order they are moved and resolved each step
+POPULATIONS = ("normal", "disposer", "police", "collector")
+
+# Walkers that only interact through garbage or offenders and so can be
+# fast-forwarded while none are near (collectors head for garbage instead)
+JUMPERS = ("normal", "disposer", "police")
+
+# Same populations as GarbageSimulation.create_agents
+DEFAULT_COUNTS = {
+    "normal": 50,
+    "disposer": 10,
+    "police": 5,
+    "collector": 5,
+    "camera": 10,
+    "garbage": 20,
+}
+
+INITIAL_SCORES = {
+    "normal": 5,
+    "disposer": 0,
+    "police": 5,
+    "collector": 5,
+    "camera": 5,
+}
+
+DETECTION_RANGE = 5
+DISPOSAL_SPACING = 10
+
+# Rows of the distance matrices built at once when matching agents to targets
+BLOCK_SIZE = 1024
+
+# Steps between returning emptied garbage chunks to the pool
+RELEASE_INTERVAL = 100
+
+
+def is_disposal_area(x, y):
+    """Disposal areas sit on every 10th cell in both directions."""
+    return (x % DISPOSAL_SPACING == 0) & (y % DISPOSAL_SPACING == 0)
+
+
+def disposal_areas_in(x0, x1, y0, y1):
+    """Disposal area cells inside [x0, x1) x [y0, y1), computed instead of stored."""
+    xs = np.arange(-(-x0 // DISPOSAL_SPACING) * DISPOSAL_SPACING, x1, DISPOSAL_SPACING)
+    ys = np.arange(-(-y0 // DISPOSAL_SPACING) * DISPOSAL_SPACING, y1, DISPOSAL_SPACING)
+    grid_x, grid_y = np.meshgrid(xs, ys, indexing="ij")
+    return grid_x.ravel(), grid_y.ravel()
+
+
+def near_any(x, y, px, py, radius):
+    """Which cells (x, y) may have a point (px, py) within Chebyshev distance radius.
+
+    Points are binned into radius-sized tiles and a cell is flagged when its
+    own tile or one next to it holds a point, so every point within radius
+    is caught (and some a little further away).
+    """
+    if not len(x) or not len(px):
+        return np.zeros(len(x), dtype=bool)
+    # Tile rows per column, with room for the -1 and +1 neighbours of the edge tiles
+    stride = int(max(np.max(y), np.max(py))) // radius + 3
+    tiles = np.unique(px.astype(np.int64) // radius * stride + py // radius)
+    offsets = np.array([dx * stride + dy for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+    covered = np.unique((tiles[:, None] + offsets).ravel())
+    return np.isin(x.astype(np.int64) // radius * stride + y // radius, covered)
+
+
+def rank_within_cell(keys):
+    """Position of each entry among the entries sharing its key (0 for the first)."""
+    keys = np.asarray(keys)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    index = np.arange(len(keys))
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = sorted_keys[1:] != sorted_keys[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, index, 0))
+    ranks = np.empty(len(keys), dtype=np.int64)
+    ranks[order] = index - group_start
+    return ranks
+
+
+class Population:
+    """Struct-of-arrays storage for one agent type."""
+
+    def __init__(self, ids, x, y, score):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.x = np.asarray(x, dtype=np.int32)
+        self.y = np.asarray(y, dtype=np.int32)
+        self.score = np.asarray(score, dtype=np.int32)
+
+    @classmethod
+    def empty(cls):
+        return cls([], [], [], [])
+
+    @classmethod
+    def concat(cls, parts):
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        return cls(
+            np.concatenate([part.ids for part in parts]),
+            np.concatenate([part.x for part in parts]),
+            np.concatenate([part.y for part in parts]),
+            np.concatenate([part.score for part in parts]),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def select(self, mask):
+        return Population(self.ids[mask], self.x[mask], self.y[mask], self.score[mask])
+
+    def split(self, mask):
+        """Remove the entries selected by mask and return them."""
+        taken = self.select(mask)
+        kept = ~mask
+        self.ids = self.ids[kept]
+        self.x = self.x[kept]
+        self.y = self.y[kept]
+        self.score = self.score[kept]
+        return taken
+
+
+class ArrayWorld:
+    """Vectorized state of the columns [x0, x1) of a width x height world.
+
+    A step runs in three phases so that a world split into strips only has
+    to synchronise twice: every walker moves (agents leaving the strip are
+    handed to their new owner), then disposals, pick-ups, arrests and
+    collections are resolved cell by cell, then cameras look at offenders
+    in the strip and in the halo received from neighbouring strips.
+
+    Per-cell data lives in chunked grids, so a large and mostly empty map
+    only allocates memory where there is garbage or, with track_cells,
+    where agents are or have been.
+
+    With fast_forward=k, every k steps the normal agents, disposers and
+    police agents that provably can't interact during the next k steps take
+    all k of them at once, as a displacement drawn from the k-step walk, and
+    are set aside in frozen until the next such step. Garbage is never added
+    during a run, so that holds for normals with a positive score and
+    disposers that have no garbage within k cells, and for police with no
+    normal that could become an offender within 2k cells, all far enough
+    from the walls and strip edges that clipping and other strips don't come
+    into it. Frozen agents cost nothing in the steps they sit out. Visits
+    counted with track_cells or heatmaps see them at their landing cell.
+
+    With heatmaps, visits per population, garbage dwell, disposals,
+    collections and arrests are accumulated per cell in self.heatmaps.
+    """
+
+    def __init__(self, width, height, x0=0, x1=None, streams=None,
+                 detection_range=DETECTION_RANGE, track_cells=False, chunk_size=CHUNK_SIZE,
+                 fast_forward=0, heatmaps=False):
+        self.width = width
+        self.height = height
+        self.x0 = x0
+        self.x1 = width if x1 is None else x1
+        self.streams = streams if streams is not None else RandomStreams()
+        self.detection_range = detection_range
+        self.fast_forward = fast_forward
+
+        self.populations = {name: Population.empty() for name in POPULATIONS}
+        # Fast-forwarded agents, already at where they will be at the next jump step
+        self.frozen = {name: Population.empty() for name in JUMPERS}
+        self.cameras = Population.empty()
+        self.chunk_size = chunk_size
+        self.garbage = ChunkedGrid(self.x1 - self.x0, height, x0, chunk_size)
+
+        # Walkers per cell and cumulative visits, only kept with track_cells
+        self.track_cells = track_cells
+        self.occupancy = ChunkedGrid(self.x1 - self.x0, height, x0, chunk_size)
+        self.visits = ChunkedGrid(self.x1 - self.x0, height, x0, chunk_size)
+        self.heatmaps = Heatmaps(self.x1 - self.x0, height, POPULATIONS, x0, chunk_size) if heatmaps else None
+
+        # Simulation tracking, arrests counts penalties and police arrests
+        # together like GarbageSimulation does
+        self.step_count = 0
+        self.arrests = 0
+        self.penalties = 0
+        self.police_arrests = 0
+        self.blackboard_size = 0
+
+    def owns(self, x):
+        return (x >= self.x0) & (x < self.x1)
+
+    def add_garbage(self, x, y):
+        self.garbage.add(x, y, 1)
+
+    @property
+    def garbage_count(self):
+        return int(self.garbage.sum())
+
+    @property
+    def agent_count(self):
+        return (sum(len(pop) for pop in self.populations.values())
+                + sum(len(pop) for pop in self.frozen.values()))
+
+    def all_populations(self):
+        """Every walker population, frozen agents included."""
+        if not any(len(pop) for pop in self.frozen.values()):
+            return self.populations
+        return {name: Population.concat([pop, self.frozen.get(name, Population.empty())])
+                for name, pop in self.populations.items()}
+
+    def move_phase(self):
+        """Move every random walker one cell and return the agents that left the strip."""
+        emigrants = {}
+        if self.fast_forward > 1 and self.step_count % self.fast_forward == 0:
+            self._fast_forward()
+        for name in POPULATIONS:
+            pop = self.populations[name]
+            delta = self.streams[name].integers(-1, 2, size=(2, len(pop)), dtype=np.int32)
+            pop.x = np.clip(pop.x + delta[0], 0, self.width - 1)
+            pop.y = np.clip(pop.y + delta[1], 0, self.height - 1)
+            emigrants[name] = pop.split(~self.owns(pop.x))
+        return emigrants
+
+    def immigrate(self, immigrants):
+        for name, pop in immigrants.items():
+            self.populations[name] = Population.concat([self.populations[name], pop])
+
+    def interact_phase(self):
+        """Resolve disposals, pick-ups, arrests and collections inside the strip."""
+        self.step_count += 1
+        if self.track_cells:
+            self._track_cells()
+        penalties = self._check_improper_disposal()
+        collected = self._collect_garbage()
+        arrested = self._check_arrests()
+        removed = self._remove_garbage()
+        self.arrests += penalties + len(arrested)
+        self.penalties += penalties
+        self.police_arrests += len(arrested)
+        if self.heatmaps:
+            self._accumulate_heatmaps(arrested)
+        if self.step_count % RELEASE_INTERVAL == 0:
+            self.garbage.release_empty()
+        return {
+            "penalties": penalties,
+            "arrests": len(arrested),
+            "collected": collected,
+            "removed": removed,
+            "garbage": self.garbage_count,
+        }
+
+    def edge_offenders(self):
+        """Offenders close enough to the strip edges to be seen by a neighbour's camera."""
+        normals = self.populations["normal"]
+        edge = ((normals.x < self.x0 + self.detection_range)
+                | (normals.x >= self.x1 - self.detection_range))
+        mask = edge & (normals.score <= 0)
+        return normals.x[mask], normals.y[mask]
+
+    def detect_phase(self, halo_x=(), halo_y=()):
+        """Count offenders within range of each camera, halo included."""
+        normals = self.populations["normal"]
+        offenders = normals.score <= 0
+        ox = np.concatenate([normals.x[offenders], np.asarray(halo_x, dtype=np.int32)])
+        oy = np.concatenate([normals.y[offenders], np.asarray(halo_y, dtype=np.int32)])
+
+        detected = 0
+        if len(ox) and len(self.cameras):
+            limit = self.detection_range ** 2
+            for start in range(0, len(self.cameras), BLOCK_SIZE):
+                cx = self.cameras.x[start:start + BLOCK_SIZE, None]
+                cy = self.cameras.y[start:start + BLOCK_SIZE, None]
+                detected += int((((cx - ox) ** 2 + (cy - oy) ** 2) <= limit).sum())
+        self.blackboard_size += detected
+        return detected
+
+    def view(self):
+        """Read-only views of the population arrays, valid until the next phase replaces them."""
+        return StateView.of_world(self)
+
+    def step(self):
+        """Advance a world that is not split into strips by one step."""
+        self.immigrate(self.move_phase())
+        stats = self.interact_phase()
+        stats["detected"] = self.detect_phase()
+        return stats
+
+    def split_strips(self, bounds, streams):
+        """Cut the world into strips [bounds[i], bounds[i + 1]), each with its own streams."""
+        strips = []
+        for x0, x1, strip_streams in zip(bounds[:-1], bounds[1:], streams):
+            strip = ArrayWorld(self.width, self.height, x0, x1, strip_streams,
+                               self.detection_range, self.track_cells, self.chunk_size,
+                               self.fast_forward)
+            if self.heatmaps:
+                strip.heatmaps = self.heatmaps.columns(x0, x1)
+            for name, pop in self.all_populations().items():
+                strip.populations[name] = pop.select(strip.owns(pop.x))
+            strip.cameras = self.cameras.select(strip.owns(self.cameras.x))
+            strip.garbage = self.garbage.columns(x0, x1)
+            strip.visits = self.visits.columns(x0, x1)
+            strips.append(strip)
+        return strips
+
+    def _fast_forward(self):
+        """Bring back the agents frozen k steps ago and freeze the ones that can jump now."""
+        for name, frozen in self.frozen.items():
+            self.populations[name] = Population.concat([self.populations[name], frozen])
+            self.frozen[name] = Population.empty()
+
+        k = self.fast_forward
+        garbage_cells = self.garbage.nonzero()
+        for name in JUMPERS:
+            pop = self.populations[name]
+            # Police must also stay clear of offenders in the neighbouring strips
+            margin = 2 * k if name == "police" else k
+            clear = ((pop.x >= self.x0 + margin) & (pop.x < self.x1 - margin)
+                     & (pop.y >= k) & (pop.y < self.height - k))
+            if name == "police":
+                # A score drops by at most one per step, so only these can offend in time
+                normals = self.populations["normal"]
+                suspects = normals.score <= k
+                clear &= ~near_any(pop.x, pop.y, normals.x[suspects], normals.y[suspects], 2 * k)
+            else:
+                if name == "normal":
+                    clear &= pop.score > 0
+                clear &= ~near_any(pop.x, pop.y, *garbage_cells, k)
+
+            jumpers = pop.split(clear)
+            # How many of the k steps went -1, 0 and +1, on each axis
+            counts = self.streams[name].multinomial(k, [1 / 3, 1 / 3, 1 / 3], size=(2, len(jumpers)))
+            jumpers.x = jumpers.x + (counts[0, :, 2] - counts[0, :, 0]).astype(np.int32)
+            jumpers.y = jumpers.y + (counts[1, :, 2] - counts[1, :, 0]).astype(np.int32)
+            self.frozen[name] = jumpers
+
+    def _track_cells(self):
+        walkers = Population.concat([*self.populations.values(), *self.frozen.values()])
+        self.occupancy.clear()
+        self.occupancy.add(walkers.x, walkers.y, 1)
+        self.visits.add(walkers.x, walkers.y, 1)
+
+    def _accumulate_heatmaps(self, arrested):
+        for name, pop in self.all_populations().items():
+            self.heatmaps.add(f"visits_{name}", pop.x, pop.y)
+        self.heatmaps.add("arrests", arrested.x, arrested.y)
+        gx, gy = self.garbage.nonzero()
+        self.heatmaps.add("dwell", gx, gy, self.garbage.get(gx, gy))
+
+    def _check_improper_disposal(self):
+        normals = self.populations["normal"]
+        items = self.garbage.get(normals.x, normals.y)
+        # Every item on the cell is an independent 50% chance, as in NormalAgent
+        roll = self.streams["normal"].random(len(normals))
+        penalized = ((items > 0) & (roll < 1 - 0.5 ** items)
+                     & ~is_disposal_area(normals.x, normals.y))
+        normals.score[penalized] -= 1
+        if self.heatmaps:
+            self.heatmaps.add("disposals", normals.x[penalized], normals.y[penalized])
+        return int(penalized.sum())
+
+    def _collect_garbage(self):
+        disposers = self.populations["disposer"]
+        items = self.garbage.get(disposers.x, disposers.y)
+        on_garbage = np.flatnonzero(items > 0)
+        # Disposers sharing a cell take its items in array order
+        rank = rank_within_cell(disposers.x[on_garbage].astype(np.int64) * self.height
+                                + disposers.y[on_garbage])
+        taken = on_garbage[rank < items[on_garbage]]
+        self.garbage.add(disposers.x[taken], disposers.y[taken], -1)
+        if self.heatmaps:
+            self.heatmaps.add("collections", disposers.x[taken], disposers.y[taken])
+        disposers.score[taken] += 1
+        return len(taken)
+
+    def _check_arrests(self):
+        normals = self.populations["normal"]
+        police = self.populations["police"]
+        police_cells = police.x.astype(np.int64) * self.height + police.y
+        normal_cells = normals.x.astype(np.int64) * self.height + normals.y
+        caught = (normals.score <= 0) & np.isin(normal_cells, police_cells)
+        return normals.split(caught)
+
+    def _remove_garbage(self):
+        collectors = self.populations["collector"]
+        if not len(collectors):
+            return 0
+        gx, gy = self.garbage.nonzero()
+        if not len(gx):
+            return 0
+
+        # Head for the closest garbage cell in the strip
+        target = np.empty(len(collectors), dtype=np.int64)
+        for start in range(0, len(collectors), BLOCK_SIZE):
+            dx = collectors.x[start:start + BLOCK_SIZE, None] - gx
+            dy = collectors.y[start:start + BLOCK_SIZE, None] - gy
+            target[start:start + BLOCK_SIZE] = (dx * dx + dy * dy).argmin(axis=1)
+        tx = gx[target]
+        ty = gy[target]
+        collectors.x = collectors.x + np.sign(tx - collectors.x).astype(np.int32)
+        collectors.y = collectors.y + np.sign(ty - collectors.y).astype(np.int32)
+
+        reached = np.flatnonzero((collectors.x == tx) & (collectors.y == ty))
+        rank = rank_within_cell(tx[reached] * self.height + ty[reached])
+        removed = reached[rank < self.garbage.get(tx[reached], ty[reached])]
+        self.garbage.add(tx[removed], ty[removed], -1)
+        if self.heatmaps:
+            self.heatmaps.add("collections", tx[removed], ty[removed])
+        return len(removed)
+
+
+def build_world(width, height, counts=None, streams=None, detection_range=DETECTION_RANGE,
+                track_cells=False, fast_forward=0, heatmaps=False):
+    """Place the populations of create_agents uniformly at random."""
+    counts = dict(DEFAULT_COUNTS, **(counts or {}))
+    streams = streams if streams is not None else RandomStreams()
+    world = ArrayWorld(width, height, streams=streams, detection_range=detection_range,
+                       track_cells=track_cells, fast_forward=fast_forward, heatmaps=heatmaps)
+    rng = streams["placement"]
+
+    next_id = 0
+    for name in POPULATIONS + ("camera",):
+        n = counts[name]
+        x = rng.integers(0, width, size=n)
+        y = rng.integers(0, height, size=n)
+        pop = Population(np.arange(next_id, next_id + n), x, y,
+                         np.full(n, INITIAL_SCORES[name]))
+        next_id += n
+        if name == "camera":
+            world.cameras = pop
+        else:
+            world.populations[name] = pop
+
+    world.add_garbage(rng.integers(0, width, size=counts["garbage"]),
+                      rng.integers(0, height, size=counts["garbage"]))
+    return world
@@ -0,0 +1,174 @@
+import math
+
+import numpy as np
+
+# Below this many pixels per cell entities are drawn as per-block densities
+LOD_CELL_PIXELS = 3
+# Size of a density block on screen
+BLOCK_PIXELS = 8
+
+ZOOM_STEP = 1.25
+PAN_PIXELS = 40
+
+
+class Viewport:
+    """Pannable, zoomable window onto the world.
+
+    Only entities inside the visible cells are drawn. Once a cell is smaller
+    than a few pixels, entities are counted per block of cells and each block
+    is drawn once, shaded by how many entities it holds, so the cost of a
+    frame follows the screen size rather than the world size.
+    """
+
+    def __init__(self, world_width, world_height, screen_width, screen_height,
+                 cell_size=10, max_cell_size=40):
+        self.world_width = world_width
+        self.world_height = world_height
+        self.screen_width = screen_width
+        self.screen_height = screen_height
+        self.initial_cell_size = cell_size
+        # Zooming out stops once the whole world fits on screen twice over
+        self.min_cell_size = min(cell_size, min(screen_width / world_width,
+                                                screen_height / world_height) / 2)
+        self.max_cell_size = max_cell_size
+        self.dragging = False
+        self.reset()
+
+    def reset(self):
+        self.cell_size = self.initial_cell_size
+        # World coordinates shown at the top-left corner of the screen
+        self.offset_x = 0.0
+        self.offset_y = 0.0
+
+    @property
+    def aggregated(self):
+        return self.cell_size < LOD_CELL_PIXELS
+
+    def to_world(self, px, py):
+        return self.offset_x + px / self.cell_size, self.offset_y + py / self.cell_size
+
+    def to_screen(self, x, y):
+        return (x - self.offset_x) * self.cell_size, (y - self.offset_y) * self.cell_size
+
+    def zoom(self, factor, anchor=None):
+        """Scale the view, keeping the world point under anchor (screen pixels) in place."""
+        ax, ay = anchor if anchor is not None else (self.screen_width / 2, self.screen_height / 2)
+        wx, wy = self.to_world(ax, ay)
+        self.cell_size = min(self.max_cell_size, max(self.min_cell_size, self.cell_size * factor))
+        self.offset_x = wx - ax / self.cell_size
+        self.offset_y = wy - ay / self.cell_size
+        self._clamp()
+
+    def pan(self, dx, dy):
+        """Move the view by a number of screen pixels."""
+        self.offset_x -= dx / self.cell_size
+        self.offset_y -= dy / self.cell_size
+        self._clamp()
+
+    def _clamp(self):
+        # Keep at least half of the screen over the world
+        view_width = self.screen_width / self.cell_size
+        view_height = self.screen_height / self.cell_size
+        self.offset_x = min(max(self.offset_x, -view_width / 2), self.world_width - view_width / 2)
+        self.offset_y = min(max(self.offset_y, -view_height / 2), self.world_height - view_height / 2)
+
+    def visible_cells(self):
+        """Range of cells [x0, x1) x [y0, y1) that is at least partly on screen."""
+        x0 = max(0, math.floor(self.offset_x))
+        y0 = max(0, math.floor(self.offset_y))
+        x1 = min(self.world_width, math.ceil(self.offset_x + self.screen_width / self.cell_size))
+        y1 = min(self.world_height, math.ceil(self.offset_y + self.screen_height / self.cell_size))
+        return x0, x1, y0, y1
+
+    def handle_event(self, event):
+        """Zoom with the mouse wheel, pan with the right button or arrow keys, 0 resets."""
+        import pygame
+
+        if event.type == pygame.MOUSEWHEEL:
+            self.zoom(ZOOM_STEP ** event.y, pygame.mouse.get_pos())
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+            self.dragging = True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 3:
+            self.dragging = False
+        elif event.type == pygame.MOUSEMOTION and self.dragging:
+            self.pan(*event.rel)
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_LEFT:
+                self.pan(PAN_PIXELS, 0)
+            elif event.key == pygame.K_RIGHT:
+                self.pan(-PAN_PIXELS, 0)
+            elif event.key == pygame.K_UP:
+                self.pan(0, PAN_PIXELS)
+            elif event.key == pygame.K_DOWN:
+                self.pan(0, -PAN_PIXELS)
+            elif event.key == pygame.K_0:
+                self.reset()
+
+    def draw_cells(self, screen, xs, ys, color, shape="rect"):
+        """Draw entities at cells (xs, ys) as rects, triangles or circles."""
+        import pygame
+
+        if self.aggregated:
+            self.draw_density(screen, xs, ys, color)
+            return
+
+        x0, x1, y0, y1 = self.visible_cells()
+        inside = (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+        px, py = self.to_screen(xs[inside], ys[inside])
+        size = self.cell_size
+        for x, y in zip(px.tolist(), py.tolist()):
+            if shape == "triangle":
+                pygame.draw.polygon(screen, color, [(x + size / 2, y), (x, y + size), (x + size, y + size)])
+            elif shape == "circle":
+                pygame.draw.circle(screen, color, (int(x + size / 2), int(y + size / 2)), max(1, int(size / 3)))
+            else:
+                pygame.draw.rect(screen, color, (int(x), int(y), math.ceil(size), math.ceil(size)))
+
+    def draw_density(self, screen, xs, ys, color):
+        """Draw one shaded square per block of cells holding at least one entity."""
+        import pygame
+
+        block = max(1, math.ceil(BLOCK_PIXELS / self.cell_size))
+        x0, x1, y0, y1 = self.visible_cells()
+        inside = (xs >= x0) & (xs < x1) & (ys >= y0) & (ys < y1)
+        blocks_y = -(-(y1 - y0) // block)
+        keys = ((xs[inside] - x0) // block) * blocks_y + (ys[inside] - y0) // block
+        counts = np.bincount(keys, minlength=1)
+        occupied = np.flatnonzero(counts)
+        if not len(occupied):
+            return
+
+        # Brightness grows with the log of the count, relative to the busiest block
+        shade = 0.3 + 0.7 * np.log1p(counts[occupied]) / np.log1p(counts[occupied].max())
+        bx, by = np.divmod(occupied, blocks_y)
+        px, py = self.to_screen(x0 + bx * block, y0 + by * block)
+        side = math.ceil(block * self.cell_size)
+        for x, y, s in zip(px.tolist(), py.tolist(), shade.tolist()):
+            pygame.draw.rect(screen, tuple(int(c * s) for c in color), (int(x), int(y), side, side))
+
+    def draw_heatmap(self, screen, values, color, max_alpha=180):
+        """Blend a (world_width, world_height) array of counts over the visible cells.
+
+        Cells are tinted with color, more opaque the higher the log of their
+        count relative to the highest visible one. The visible part is drawn
+        as one small surface scaled up to the screen.
+        """
+        import pygame
+
+        x0, x1, y0, y1 = self.visible_cells()
+        if x1 <= x0 or y1 <= y0:
+            return
+        visible = values[x0:x1, y0:y1]
+        peak = visible.max()
+        if peak <= 0:
+            return
+
+        alpha = (max_alpha * np.log1p(np.maximum(visible, 0)) / np.log1p(peak)).astype(np.uint8)
+        surface = pygame.Surface((x1 - x0, y1 - y0), pygame.SRCALPHA)
+        surface.fill(color)
+        pixels = pygame.surfarray.pixels_alpha(surface)
+        pixels[...] = alpha
+        del pixels
+        px, py = self.to_screen(x0, y0)
+        size = (math.ceil((x1 - x0) * self.cell_size), math.ceil((y1 - y0) * self.cell_size))
+        screen.blit(pygame.transform.scale(surface, size), (int(px), int(py)))
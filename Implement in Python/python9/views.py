@@ -0,0 +1,109 @@
+from operator import attrgetter
+
+import numpy as np
+
+# Population names used by the views, shared with the vectorized engine,
+# and the GarbageSimulation lists they are read from
+SIMULATION_LISTS = [
+    ("normal", "normal_agents"),
+    ("disposer", "proper_disposers"),
+    ("police", "police_agents"),
+    ("collector", "garbage_collectors"),
+    ("camera", "cameras"),
+]
+
+# Populations whose agents keep a score, the others have no "score" column
+SCORED = {"normal", "disposer"}
+
+
+def readonly(array):
+    """View of array that can't be written through."""
+    view = array.view()
+    view.flags.writeable = False
+    return view
+
+
+def _column(entities, name, dtype):
+    return np.fromiter(map(attrgetter(name), entities), dtype=dtype, count=len(entities))
+
+
+def positions(entities):
+    """x and y of a list of agents or items as arrays."""
+    return _column(entities, "x", np.int64), _column(entities, "y", np.int64)
+
+
+class StateView:
+    """Read-only NumPy arrays of a simulation at one step.
+
+    populations maps a population name to a dict of equal-length arrays
+    ("ids", "x", "y" and, for the SCORED populations, "score"). garbage holds
+    the cells with garbage ("x", "y") and the number of items on each
+    ("count"). A view is only valid until the simulation steps again.
+    """
+
+    def __init__(self, step, populations, garbage):
+        self.step = step
+        self.populations = populations
+        self.garbage = garbage
+
+    def __getitem__(self, name):
+        return self.populations[name]
+
+    def __iter__(self):
+        return iter(self.populations)
+
+    def to_arrow(self, name):
+        """Population name (or "garbage") as a pyarrow RecordBatch, sharing the arrays' memory."""
+        import pyarrow
+
+        columns = self.garbage if name == "garbage" else self.populations[name]
+        return pyarrow.record_batch(list(columns.values()), names=list(columns))
+
+    @classmethod
+    def of_simulation(cls, simulation):
+        """Arrays of a GarbageSimulation, read once from its objects."""
+        populations = {}
+        for name, list_name in SIMULATION_LISTS:
+            entities = getattr(simulation, list_name)
+            columns = {
+                "ids": _column(entities, "unique_id", np.int64),
+                "x": _column(entities, "x", np.int32),
+                "y": _column(entities, "y", np.int32),
+            }
+            if name in SCORED:
+                columns["score"] = _column(entities, "score", np.int32)
+            populations[name] = {key: readonly(column) for key, column in columns.items()}
+
+        items = simulation.garbage_items
+        cells = (_column(items, "x", np.int64) * simulation.height + _column(items, "y", np.int64))
+        cells, count = np.unique(cells, return_counts=True)
+        x, y = np.divmod(cells, simulation.height)
+        garbage = {
+            "x": readonly(x.astype(np.int32)),
+            "y": readonly(y.astype(np.int32)),
+            "count": readonly(count.astype(np.int32)),
+        }
+        return cls(simulation.step_count, populations, garbage)
+
+    @classmethod
+    def of_world(cls, world):
+        """Views of an ArrayWorld's own arrays, nothing is copied but the garbage cells
+        (and the populations, while some agents are fast-forwarded)."""
+        populations = {}
+        for name, population in [*world.all_populations().items(), ("camera", world.cameras)]:
+            columns = {
+                "ids": readonly(population.ids),
+                "x": readonly(population.x),
+                "y": readonly(population.y),
+            }
+            if name in SCORED:
+                columns["score"] = readonly(population.score)
+            populations[name] = columns
+
+        x, y = world.garbage.nonzero()
+        garbage = {
+            "x": readonly(x.astype(np.int32)),
+            "y": readonly(y.astype(np.int32)),
+            "count": readonly(world.garbage.get(x, y)),
+        }
+        return cls(world.step_count, populations, garbage)